@@ -0,0 +1,99 @@
+"""Elección automática de modelo y resolución de inferencia.
+
+El modo "auto" mide, con los primeros segundos del video y en esta máquina,
+cuántos frames por segundo infiere cada combinación de variante del modelo
+(heavy, full, lite) y lado máximo de la imagen, y elige la más precisa que
+alcanza el objetivo de fps. Las combinaciones se prueban de la más precisa a
+la más rápida y la calibración termina en la primera que cumple, así que en
+una máquina rápida sólo se mide heavy.
+
+Sólo se mide la inferencia: en el pipeline las demás etapas corren en
+paralelo con ella, de modo que es la que limita los fps.
+"""
+import time
+
+import cv2
+
+from skeleton_core import MODEL_VARIANTS, create_landmarker, downscale, ensure_model, load_mediapipe, open_video
+
+# Lados máximos a probar para cada variante; None = resolución original
+DEFAULT_SIDES = (None, 960, 640)
+
+
+def calibration_frames(video_path, seconds=3.0, max_frames=90):
+    """Primeros frames del video en RGB, y sus fps"""
+    cap, _, fps, _, _ = open_video(video_path)
+    frames = []
+    try:
+        limit = min(max_frames, max(1, int(seconds * (fps or 30))))
+        while len(frames) < limit:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+    finally:
+        cap.release()
+    return frames, fps or 30
+
+
+def measure_inference_fps(model_path, frames, fps, confidence=0.5, max_side=None, warmup=5):
+    """Frames por segundo de inferencia de un modelo sobre `frames` (sin contar el calentamiento)"""
+    mp = load_mediapipe()[0]
+    landmarker = create_landmarker(model_path, confidence)
+    try:
+        start = None
+        for index, frame in enumerate(frames):
+            if index == min(warmup, len(frames) - 1):
+                start = time.perf_counter()
+            image = mp.Image(image_format=mp.ImageFormat.SRGB, data=downscale(frame, max_side))
+            landmarker.detect_for_video(image, int((index * 1000) / fps))
+        measured = len(frames) - min(warmup, len(frames) - 1)
+        elapsed = time.perf_counter() - start
+    finally:
+        landmarker.close()
+    return measured / elapsed if elapsed > 0 else float("inf")
+
+
+def candidates(frame_size, variants=MODEL_VARIANTS, sides=DEFAULT_SIDES):
+    """Combinaciones (variante, lado máximo) de la más precisa a la más rápida"""
+    largest = max(frame_size)
+    useful_sides = [side for side in sides if side is None or side < largest]
+    order = sorted(variants, key=MODEL_VARIANTS.index, reverse=True)
+    return [(variant, side) for variant in order for side in useful_sides]
+
+
+def autotune(video_path, target_fps=None, confidence=0.5, variants=MODEL_VARIANTS, sides=DEFAULT_SIDES,
+             seconds=3.0, on_status=None):
+    """Elige variante y lado máximo de inferencia para `video_path`.
+
+    `target_fps` por defecto son los fps del video (tiempo real). Devuelve un
+    dict con "variant", "max_side", "fps" (inferencia medida), "target_fps" y
+    "measurements" [(variante, lado, fps)]. Si ninguna combinación alcanza el
+    objetivo se elige la más rápida.
+    """
+    frames, video_fps = calibration_frames(video_path, seconds)
+    if not frames:
+        raise IOError(f"No se pudieron leer frames de calibración: {video_path}")
+    target_fps = target_fps or video_fps
+
+    measurements = []
+    for variant, side in candidates(frames[0].shape[:2], variants, sides):
+        try:
+            # Puede tener que descargarlo: que se vea en el estado y no sólo "Calibrando"
+            model_path = ensure_model(variant, on_status)
+        except FileNotFoundError:
+            # Sin red (modo offline) sólo se calibran las variantes disponibles
+            continue
+        if on_status is not None:
+            on_status(f"Calibrando {variant} ({side or 'original'})...")
+        fps = measure_inference_fps(model_path, frames, video_fps, confidence, side)
+        measurements.append((variant, side, fps))
+        if fps >= target_fps:
+            break
+
+    if not measurements:
+        raise FileNotFoundError("No hay ninguna variante del modelo disponible para calibrar")
+    meeting = [m for m in measurements if m[2] >= target_fps]
+    variant, side, fps = meeting[0] if meeting else max(measurements, key=lambda m: m[2])
+    return {"variant": variant, "max_side": side, "fps": fps, "target_fps": target_fps,
+            "measurements": measurements}
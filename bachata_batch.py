@@ -0,0 +1,358 @@
+"""Procesamiento por lotes sin interfaz gráfica.
+
+Procesa directorios, globs o archivos de video repartiéndolos entre varios
+procesos; cada proceso mantiene un único PoseLandmarker para todos sus videos.
+Con --segments, cada video largo se divide además en segmentos que se procesan
+en paralelo y se vuelven a unir (ver video_segments.py).
+
+Ejemplo:
+    python bachata_batch.py clases/ "ensayos/**/*.mp4" -o salida -j 4
+    python bachata_batch.py social_90min.mp4 -j 8 --segments 8
+    python bachata_batch.py clases/ -o datos --no-video --export parquet
+    python bachata_batch.py clase_4k.mp4 --codec h264 --output-max-side 1920
+"""
+import argparse
+import atexit
+import glob
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import multiprocessing
+
+from autotune import autotune
+from landmark_cache import DEFAULT_CACHE_DIR, LandmarkCache
+from landmark_export import EXPORT_FORMATS, export_path_for, open_exporter
+from landmark_store import LandmarkStoreWriter, store_path_for
+from landmarker_pool import LandmarkerPool
+import model_store
+from movement_analytics import AnalyticsOptions, write_report
+from perf_stats import PipelineStats
+from skeleton_core import (DEFAULT_MODEL_VARIANT, MODEL_VARIANTS, SKELETON_COLORS, VIDEO_EXTENSIONS,
+                           ensure_model, inference_helpers, open_video, process_video_file)
+from video_output import CODECS, DEFAULT_CODEC, OutputOptions
+from video_segments import find_keyframes, plan_segments, process_segment, stitch_segments
+
+# Estado por proceso de trabajo
+_landmarker_pool = None
+_landmarker_settings = None
+_cache = None
+_cache_settings = None
+_inference_options = {}
+
+
+def collect_videos(inputs):
+    """Expande directorios y globs a una lista ordenada de videos sin repetidos"""
+    videos = []
+    for item in inputs:
+        if os.path.isdir(item):
+            candidates = [os.path.join(item, name) for name in sorted(os.listdir(item))]
+        elif os.path.exists(item):
+            candidates = [item]
+        else:
+            candidates = sorted(glob.glob(item, recursive=True))
+
+        for path in candidates:
+            if os.path.isfile(path) and path.lower().endswith(VIDEO_EXTENSIONS):
+                videos.append(os.path.abspath(path))
+    return list(dict.fromkeys(videos))
+
+
+def output_path_for(video_path, output_dir, suffix, taken, extension=".mp4"):
+    """Ruta de salida `<nombre><sufijo><extensión>`, sin repetir nombres dentro del lote"""
+    stem = os.path.splitext(os.path.basename(video_path))[0]
+    directory = output_dir or os.path.dirname(video_path)
+    candidate = os.path.join(directory, f"{stem}{suffix}{extension}")
+    counter = 2
+    while candidate in taken:
+        candidate = os.path.join(directory, f"{stem}{suffix}_{counter}{extension}")
+        counter += 1
+    taken.add(candidate)
+    return candidate
+
+
+def _init_worker(model_path, confidence, cache_dir, cache_max_bytes, inference_options):
+    global _landmarker_pool, _landmarker_settings, _cache, _cache_settings, _inference_options
+    # Un landmarker por proceso, reutilizado entre videos (el pool lleva los timestamps)
+    _landmarker_settings = (model_path, confidence, inference_options["num_poses"])
+    _landmarker_pool = LandmarkerPool(max_idle=1)
+    _landmarker_pool.warm(*_landmarker_settings)
+    _inference_options = inference_options
+    atexit.register(_landmarker_pool.close)
+    if cache_dir:
+        _cache = LandmarkCache(cache_dir, cache_max_bytes)
+        _cache_settings = (model_path, confidence)
+
+
+def _process_one(video_path, output_path, color, store_path, trace_path=None, export_paths=(),
+                 write_video=True, output_options=None, analytics_path=None, analytics_options=None):
+    start = time.perf_counter()
+    stats = PipelineStats(trace=True) if trace_path else None
+    try:
+        helpers, extra = inference_helpers(**_inference_options)
+        cache_key = _cache.key_for(video_path, *_cache_settings, extra=extra) if _cache else None
+        # Sin video de salida el pipeline no dibuja ni codifica: sólo produce landmarks
+        frames, _, from_cache = process_video_file(
+            video_path, output_path=output_path if write_video else None, color=color,
+            cache=_cache, cache_key=cache_key, store_path=store_path,
+            make_landmarker=lambda: _landmarker_pool.acquire(*_landmarker_settings),
+            stats=stats, export_paths=export_paths, output_options=output_options, analytics_path=analytics_path,
+            analytics_options=analytics_options, **helpers)
+        if trace_path:
+            stats.write_chrome_trace(trace_path)
+    except Exception as e:
+        return video_path, output_path, 0, time.perf_counter() - start, str(e)
+    if not write_video:
+        output_path = ", ".join(path for path in (store_path, *export_paths, analytics_path) if path)
+    if from_cache:
+        output_path += " (landmarks en caché)"
+    return video_path, output_path, frames, time.perf_counter() - start, None
+
+
+def _process_segment_job(video_path, segment, segment_path, color, output_options=None):
+    helpers, _ = inference_helpers(**_inference_options)
+    with _landmarker_pool.acquire(*_landmarker_settings) as landmarker:
+        return process_segment(video_path, segment, landmarker, segment_path, color,
+                               output_options=output_options, **helpers)
+
+
+def process_segmented(executor, video_path, output_path, color, store_path, num_segments, warmup_s,
+                      export_paths=(), output_options=None, analytics_path=None, analytics_options=None):
+    """Reparte un video en segmentos entre los procesos del pool y une el resultado"""
+    start = time.perf_counter()
+    try:
+        cap, total_frames, fps, width, height = open_video(video_path)
+        cap.release()
+        if total_frames <= 0:
+            # Sin cantidad de frames no hay dónde cortar: procesar el video entero en un proceso
+            return executor.submit(_process_one, video_path, output_path, color, store_path, None,
+                                   export_paths, True, output_options, analytics_path,
+                                   analytics_options).result()
+        keyframes = find_keyframes(video_path, fps)
+        segments = plan_segments(total_frames, num_segments, round(warmup_s * fps), keyframes)
+
+        work_dir = tempfile.mkdtemp(prefix=".segmentos_", dir=os.path.dirname(output_path) or ".")
+        try:
+            extension = output_options.extension if output_options is not None else ".mp4"
+            segment_paths = [os.path.join(work_dir, f"segment_{segment.index:03d}{extension}")
+                             for segment in segments]
+            futures = [executor.submit(_process_segment_job, video_path, segment, path, color,
+                                       output_options)
+                       for segment, path in zip(segments, segment_paths)]
+            results = [future.result() for future in futures]
+
+            stitch_segments(segment_paths, output_path, fps, width, height, output_options)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+        frames = sum(len(landmarks) for landmarks, _ in results)
+        num_people = results[0][0].shape[1] if results else 1
+        if store_path:
+            with LandmarkStoreWriter(store_path, num_people=num_people,
+                                     fps=fps, width=width, height=height) as store:
+                for landmarks, timestamps in results:
+                    store.extend(timestamps, landmarks)
+        for path in export_paths:
+            with open_exporter(path, num_people=num_people, fps=fps) as exporter:
+                for landmarks, timestamps in results:
+                    exporter.extend(timestamps, landmarks)
+        if analytics_path:
+            analytics_options = analytics_options or AnalyticsOptions()
+            with analytics_options.analyzer(fps, width, height, num_people) as analyzer:
+                for landmarks, timestamps in results:
+                    analyzer.extend(timestamps, landmarks)
+            write_report(analyzer, analytics_path, analytics_options)
+    except Exception as e:
+        return video_path, output_path, 0, time.perf_counter() - start, str(e)
+    return video_path, output_path, frames, time.perf_counter() - start, None
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Detector de esqueletos para bachata (modo lote)")
+    parser.add_argument("inputs", nargs="+", help="Videos, directorios o patrones glob")
+    parser.add_argument("-o", "--output-dir", help="Directorio de salida (por defecto, junto a cada video)")
+    parser.add_argument("-j", "--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help="Número de procesos en paralelo")
+    parser.add_argument("--suffix", default="_esqueleto", help="Sufijo del archivo de salida")
+    parser.add_argument("--overwrite", action="store_true", help="Sobrescribir salidas existentes")
+    parser.add_argument("--model-variant", default=DEFAULT_MODEL_VARIANT, choices=MODEL_VARIANTS + ("auto",),
+                        help="Variante del modelo; 'auto' calibra con el primer video y elige la más "
+                             "precisa que alcanza --target-fps")
+    parser.add_argument("--model", help="Ruta de un modelo .task propio (reemplaza --model-variant)")
+    parser.add_argument("--model-dir", default=model_store.DEFAULT_MODEL_DIR,
+                        help="Directorio compartido de modelos descargados")
+    parser.add_argument("--model-mirror",
+                        help="Directorio precargado o URL base de donde obtener los modelos")
+    parser.add_argument("--offline", action="store_true",
+                        help="No descargar modelos de internet (sólo --model-dir y --model-mirror)")
+    parser.add_argument("--target-fps", type=float,
+                        help="fps de inferencia buscados en modo auto (por defecto, los del video)")
+    parser.add_argument("--inference-max-side", "--roi-max-side", type=int,
+                        help="Reducir la imagen enviada a inferencia (el frame o el recorte de --roi) "
+                             "a este lado máximo (px)")
+    parser.add_argument("--confidence", type=float, default=0.5, help="Confianza de detección")
+    parser.add_argument("--color", default="default", choices=sorted(SKELETON_COLORS),
+                        help="Color del esqueleto")
+    parser.add_argument("--segments", type=int, default=1,
+                        help="Dividir cada video en N segmentos procesados en paralelo")
+    parser.add_argument("--warmup", type=float, default=1.0,
+                        help="Segundos de calentamiento del tracker antes de cada segmento")
+    parser.add_argument("--infer-every", type=int, default=1,
+                        help="Inferir cada N frames e interpolar el resto")
+    parser.add_argument("--adaptive-skip", action="store_true",
+                        help="Ajustar el salto de inferencia según el movimiento")
+    parser.add_argument("--num-poses", type=int, default=1,
+                        help="Bailarines a detectar, con ID estable por persona (2 para una pareja; sin --segments)")
+    parser.add_argument("--roi", action="store_true",
+                        help="Inferir sobre un recorte alrededor de los bailarines")
+    parser.add_argument("--roi-padding", type=float, default=0.3,
+                        help="Margen del recorte relativo al tamaño del esqueleto")
+    parser.add_argument("--no-smooth", action="store_true",
+                        help="No suavizar los landmarks (el filtro One-Euro está activado por defecto)")
+    parser.add_argument("--no-landmarks", action="store_true",
+                        help="No guardar el store de landmarks (<salida>.landmarks) junto al video")
+    parser.add_argument("--export", action="append", choices=EXPORT_FORMATS, default=[],
+                        help="Exportar los landmarks a <salida>.jsonl/.csv/.parquet (repetible)")
+    parser.add_argument("--no-video", action="store_true",
+                        help="No dibujar ni codificar el video: sólo landmarks (store y --export)")
+    parser.add_argument("--analytics", action="store_true",
+                        help="Guardar métricas de movimiento (pasos, vueltas, cadera...) en <salida>.analytics.json")
+    parser.add_argument("--bpm", type=float,
+                        help="Tempo de la música, para medir los pasos contra el tiempo (con --analytics)")
+    parser.add_argument("--first-beat-ms", type=float, default=0.0,
+                        help="Momento del primer tiempo de la música en ms (con --bpm)")
+    parser.add_argument("--codec", default=DEFAULT_CODEC, choices=sorted(CODECS),
+                        help="Códec del video de salida (h264, hevc, vp9, prores... usan ffmpeg)")
+    parser.add_argument("--output-scale", type=float, default=1.0,
+                        help="Escala del video de salida (0.5 = mitad de ancho y alto)")
+    parser.add_argument("--output-max-side", type=int, help="Lado máximo del video de salida (px)")
+    parser.add_argument("--overlay", action="store_true",
+                        help="Escribir sólo el esqueleto sobre fondo transparente (con --codec vp9 o prores)")
+    parser.add_argument("--trace", action="store_true",
+                        help="Guardar tiempos por etapa en <salida>.trace.json (formato Chrome trace; sin --segments)")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Directorio de la caché de landmarks")
+    parser.add_argument("--cache-max-gb", type=float, default=2.0, help="Tamaño máximo de la caché")
+    parser.add_argument("--no-cache", action="store_true", help="No leer ni guardar landmarks en caché")
+    return parser.parse_args(argv)
+
+
+def inference_options(args):
+    return {"infer_every": args.infer_every, "adaptive_skip": args.adaptive_skip,
+            "num_poses": max(1, args.num_poses), "roi": args.roi,
+            "roi_padding": args.roi_padding,
+            "inference_max_side": args.inference_max_side, "smooth": not args.no_smooth}
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    videos = collect_videos(args.inputs)
+    if not videos:
+        print("❌ No se encontraron videos")
+        return 1
+
+    if args.no_video and args.segments > 1:
+        print("❌ --no-video no se puede combinar con --segments")
+        return 1
+    if args.num_poses > 1 and args.segments > 1:
+        # Cada segmento tendría su propio tracker: la pareja podría cambiar de ID (y de color) en cada corte
+        print("❌ --num-poses mayor que 1 no se puede combinar con --segments")
+        return 1
+    if args.no_video and args.no_landmarks and not args.export and not args.analytics:
+        print("❌ Con --no-video y --no-landmarks no queda nada que guardar (usar --export o --analytics)")
+        return 1
+    export_formats = list(dict.fromkeys(args.export))
+    try:
+        output_options = OutputOptions(args.codec, args.output_scale, args.output_max_side, args.overlay)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+
+    model_store.configure(args.model_dir, args.model_mirror, args.offline or None)
+    if args.model_variant == "auto" and not args.model:
+        print(f"⏳ Calibrando modelo con {os.path.basename(videos[0])}...")
+        tuned = autotune(videos[0], args.target_fps, args.confidence,
+                         on_status=lambda text: print(f"⏳ {text}"))
+        args.model_variant = tuned["variant"]
+        args.inference_max_side = args.inference_max_side or tuned["max_side"]
+        print(f"✅ Modelo {tuned['variant']} a {tuned['max_side'] or 'resolución original'}: "
+              f"{tuned['fps']:.1f} fps de inferencia (objetivo {tuned['target_fps']:.1f})")
+    if not args.model:
+        args.model = ensure_model(args.model_variant, on_status=lambda text: print(f"⏳ {text}"))
+    elif not os.path.exists(args.model):
+        print(f"❌ No existe el modelo: {args.model}")
+        return 1
+
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    jobs = []
+    taken = set()
+    for video_path in videos:
+        output_path = output_path_for(video_path, args.output_dir, args.suffix, taken, output_options.extension)
+        store_path = None if args.no_landmarks else store_path_for(output_path)
+        export_paths = [export_path_for(output_path, fmt) for fmt in export_formats]
+        analytics_path = export_path_for(output_path, "analytics.json") if args.analytics else None
+        # Con --no-video la salida principal es el primer archivo de landmarks (o las métricas)
+        primary = output_path if not args.no_video else (export_paths or [store_path or analytics_path])[0]
+        if os.path.abspath(output_path) == video_path:
+            print(f"⚠️ Omitido (la salida coincide con la entrada): {video_path}")
+        elif os.path.exists(primary) and not args.overwrite:
+            print(f"⚠️ Omitido (ya existe {primary}): {video_path}")
+        else:
+            jobs.append((video_path, output_path, store_path, export_paths, analytics_path))
+
+    parallel_units = len(jobs) * max(1, args.segments)
+    workers = max(1, min(args.workers, parallel_units))
+    color = SKELETON_COLORS[args.color]
+    analytics_options = AnalyticsOptions(args.bpm, args.first_beat_ms)
+    print(f"▶ Procesando {len(jobs)} videos con {workers} procesos")
+
+    total_frames = 0
+    failures = 0
+    start = time.perf_counter()
+    # "spawn" evita heredar el estado de MediaPipe de un fork
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=_init_worker,
+                             initargs=(args.model, args.confidence,
+                                       None if args.no_cache else args.cache_dir,
+                                       int(args.cache_max_gb * 1024 ** 3),
+                                       inference_options(args))) as executor:
+        if args.segments > 1:
+            # Los videos van de a uno; el paralelismo está dentro de cada video
+            results = (process_segmented(executor, video_path, output_path, color, store_path,
+                                         args.segments, args.warmup, export_paths, output_options,
+                                         analytics_path, analytics_options)
+                       for video_path, output_path, store_path, export_paths, analytics_path in jobs)
+        else:
+            results = (future.result() for future in as_completed(
+                [executor.submit(_process_one, video_path, output_path, color, store_path,
+                                 os.path.splitext(output_path)[0] + ".trace.json" if args.trace else None,
+                                 export_paths, not args.no_video, output_options, analytics_path,
+                                 analytics_options)
+                 for video_path, output_path, store_path, export_paths, analytics_path in jobs]))
+        try:
+            for video_path, output_path, frames, seconds, error in results:
+                name = os.path.basename(video_path)
+                if error:
+                    failures += 1
+                    print(f"❌ {name}: {error}")
+                else:
+                    total_frames += frames
+                    print(f"✅ {name}: {frames} frames en {seconds:.1f} s "
+                          f"({frames / seconds:.1f} fps) → {output_path}")
+        except KeyboardInterrupt:
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+
+    elapsed = time.perf_counter() - start
+    print(f"\nResumen: {len(jobs) - failures}/{len(jobs)} videos, {total_frames} frames "
+          f"en {elapsed:.1f} s → {total_frames / elapsed if elapsed else 0:.1f} fps agregados")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
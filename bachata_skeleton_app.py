@@ -1,15 +1,39 @@
-import cv2
-import mediapipe as mp
 import tkinter as tk
-from tkinter import ttk, filedialog, messagebox
-from PIL import Image, ImageTk
+from tkinter import ttk, filedialog, messagebox, simpledialog
 import threading
 import os
-import requests
 
-# MediaPipe Tasks API Imports
-from mediapipe.tasks import python
-from mediapipe.tasks.python import vision
+from autotune import autotune
+from landmark_cache import LandmarkCache
+from landmark_export import EXPORT_FORMATS
+from landmarker_pool import LandmarkerPool
+from live_stream import LiveSession
+from landmark_store import STORE_SUFFIX
+from perf_stats import PipelineStats, format_stats
+from preview import CanvasPreview, LatestFrameSlot
+from model_store import default_store
+from scrubber import Scrubber
+from video_output import CODECS, DEFAULT_CODEC, OutputOptions
+from skeleton_core import (DEFAULT_MODEL_VARIANT, MODEL_VARIANTS, create_landmarker, ensure_model,
+                           get_skeleton_color, inference_helpers, process_video_file)
+
+# Las salidas se llaman como el video de entrada más este sufijo
+OUTPUT_SUFFIX = "_esqueleto"
+# Tamaño del video de salida respecto del original
+OUTPUT_SCALES = {'100%': 1.0, '75%': 0.75, '50%': 0.5, '25%': 0.25}
+
+# Opciones de salto de inferencia: (cada N frames, adaptativo)
+INFERENCE_MODES = {
+    'cada frame': (1, False),
+    'cada 2 frames': (2, False),
+    'cada 3 frames': (3, False),
+    'cada 4 frames': (4, False),
+    'adaptativa': (1, True),
+}
+
+def format_time(seconds):
+    minutes, seconds = divmod(seconds, 60)
+    return f"{int(minutes):02d}:{seconds:04.1f}"
 
 class BachataSkeletonApp:
     def __init__(self, root):
@@ -20,53 +44,85 @@ class BachataSkeletonApp:
         
         # Variables
         self.video_path = None
-        self.cap = None
         self.is_playing = False
         self.is_paused = False
         self.output_path = None
-        self.video_writer = None
-        
-        # MediaPipe Tasks
-        self.landmarker = None
-        self.model_path = "pose_landmarker_full.task"
-        
-        # Conexiones del cuerpo (simplificado para bachata)
-        self.POSE_CONNECTIONS = frozenset([
-            (11, 12), (11, 13), (13, 15), (12, 14), (14, 16), (11, 23), (12, 24),
-            (23, 24), (23, 25), (24, 26), (25, 27), (26, 28), (27, 29), (28, 30),
-            (29, 31), (30, 32), (27, 31), (28, 32)
-        ])
+        self.store_path = None
+        self.export_path = None
+        self.analytics_path = None
+        self.trace_path = None
+        self.pipeline = None
+        # Sesión en vivo (cámara o stream) en curso
+        self.live_session = None
+        # Línea de tiempo: frames sueltos con el esqueleto, sin procesar todo el video
+        self.scrubber = None
+        # (estado, frame, total) escrito por el hilo de procesamiento y leído por la vista previa
+        self.progress_state = None
+        # Tiempos por etapa de la corrida actual (para el panel de rendimiento)
+        self.stats = None
+        
+        # MediaPipe Tasks: landmarkers precalentados y reutilizados entre videos
+        self.landmarker_pool = LandmarkerPool()
+        self.landmark_cache = LandmarkCache()
+        # Resultado de la calibración "auto" por (video, confianza)
+        self.autotune_results = {}
         
         # Configuración UI
         self.confidence = tk.DoubleVar(value=0.5)
-        self.complexity = tk.IntVar(value=1) # No usado directamente en Tasks API igual que en Legacy
+        self.model_variant = tk.StringVar(value=DEFAULT_MODEL_VARIANT)
         self.save_video = tk.BooleanVar(value=True)
+        self.output_codec = tk.StringVar(value=DEFAULT_CODEC)
+        self.output_scale = tk.StringVar(value='100%')
+        self.output_overlay = tk.BooleanVar(value=False)
+        self.save_landmarks = tk.BooleanVar(value=True)
+        self.use_roi = tk.BooleanVar(value=False)
+        self.smooth_landmarks = tk.BooleanVar(value=True)
+        self.detect_couple = tk.BooleanVar(value=False)
+        self.save_trace = tk.BooleanVar(value=False)
+        self.export_format = tk.StringVar(value="no")
+        self.save_analytics = tk.BooleanVar(value=False)
         self.color_esqueleto = tk.StringVar(value="default")
+        self.inference_mode = tk.StringVar(value="cada frame")
         
         self.create_widgets()
         
-        # Descargar modelo al inicio si no existe
-        threading.Thread(target=self.check_and_download_model, daemon=True).start()
+        # Vista previa: el procesamiento publica el último frame y Tk lo dibuja a su ritmo
+        self.preview_slot = LatestFrameSlot()
+        self.preview = CanvasPreview(self.root, self.canvas, self.preview_slot,
+                                     max_fps=30, on_frame=self.update_progress)
+        self.preview.start()
+        
+        # Obtener el modelo por defecto en segundo plano si todavía no está
+        if not default_store().is_ready(DEFAULT_MODEL_VARIANT):
+            threading.Thread(target=self.check_and_download_model, daemon=True).start()
+        else:
+            # Dejar que aparezca la ventana antes de importar MediaPipe y crear el landmarker
+            self.root.after(500, self.warm_landmarker)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+    
+    def warm_landmarker(self):
+        """Precalienta un landmarker con los ajustes actuales (desde el hilo de Tk)"""
+        variant = self.model_variant.get()
+        if variant != "auto" and default_store().is_ready(variant):
+            self.landmarker_pool.warm(default_store().path_for(variant), self.confidence.get(),
+                                      2 if self.detect_couple.get() else 1)
+    
+    def on_close(self):
+        self.stop_video()
+        self.close_scrubber()
+        self.landmarker_pool.close()
+        self.root.destroy()
     
     def check_and_download_model(self):
-        """Descargar el modelo de MediaPipe si no existe localmente"""
-        if not os.path.exists(self.model_path):
-            self.info_label.config(text="⏳ Descargando modelo de IA (primera vez)...")
-            url = "https://storage.googleapis.com/mediapipe-models/pose_landmarker/pose_landmarker_full/float16/1/pose_landmarker_full.task"
-            try:
-                response = requests.get(url, stream=True)
-                if response.status_code == 200:
-                    with open(self.model_path, 'wb') as f:
-                        for chunk in response.iter_content(chunk_size=8192):
-                            f.write(chunk)
-                    self.info_label.config(text="✅ Modelo descargado correctamente")
-                else:
-                    self.info_label.config(text=f"❌ Error descarga: {response.status_code}")
-                    if os.path.exists(self.model_path): os.remove(self.model_path)
-            except Exception as e:
-                self.info_label.config(text=f"❌ Error descargando modelo: {e}")
-                if os.path.exists(self.model_path): os.remove(self.model_path)
-                messagebox.showerror("Error", f"No se pudo descargar el modelo de IA:\n{e}")
+        """Obtiene el modelo por defecto sin bloquear la interfaz; sólo toca Tk vía `after`"""
+        try:
+            ensure_model(DEFAULT_MODEL_VARIANT, on_status=lambda text: self.set_info(f"⏳ {text}"))
+            self.set_info("✅ Modelo listo")
+            self.root.after(0, self.warm_landmarker)
+        except Exception as e:
+            self.set_info(f"❌ Error obteniendo el modelo: {e}")
+            self.root.after(0, lambda error=e: messagebox.showerror(
+                "Error", f"No se pudo obtener el modelo de IA:\n{error}"))
 
     def create_widgets(self):
         # ============ PANEL SUPERIOR ============
@@ -94,6 +150,13 @@ class BachataSkeletonApp:
                                  cursor='hand2', relief=tk.FLAT, padx=20, pady=10)
         self.btn_load.pack(pady=5, fill=tk.X, padx=20)
         
+        # Cámara o stream en vivo, como espejo
+        self.btn_live = tk.Button(left_frame, text="📷 En vivo", 
+                                 command=self.start_live, bg='#2b2b2b', 
+                                 fg='white', font=('Arial', 11, 'bold'),
+                                 cursor='hand2', relief=tk.FLAT, padx=20, pady=6)
+        self.btn_live.pack(pady=(0, 5), fill=tk.X, padx=20)
+        
         self.video_label = tk.Label(left_frame, text="Ningún video seleccionado", 
                                    bg='#1e1e1e', fg='#888888', wraplength=260)
         self.video_label.pack(pady=5)
@@ -115,6 +178,15 @@ class BachataSkeletonApp:
                                    troughcolor='#00ff88', length=240)
         confidence_scale.pack(padx=20, pady=5)
          
+        # Variante del modelo
+        tk.Label(left_frame, text="Modelo:", 
+                bg='#1e1e1e', fg='white').pack(anchor=tk.W, padx=20, pady=(10, 0))
+        
+        model_combo = ttk.Combobox(left_frame, textvariable=self.model_variant,
+                                  values=list(MODEL_VARIANTS) + ['auto'],
+                                  state='readonly', width=28)
+        model_combo.pack(padx=20, pady=5)
+        
         # Color del esqueleto
         tk.Label(left_frame, text="Color del esqueleto:", 
                 bg='#1e1e1e', fg='white').pack(anchor=tk.W, padx=20, pady=(10, 0))
@@ -124,11 +196,79 @@ class BachataSkeletonApp:
                                   state='readonly', width=28)
         color_combo.pack(padx=20, pady=5)
         
+        # Frecuencia de inferencia
+        tk.Label(left_frame, text="Inferencia:", 
+                bg='#1e1e1e', fg='white').pack(anchor=tk.W, padx=20, pady=(10, 0))
+        
+        inference_combo = ttk.Combobox(left_frame, textvariable=self.inference_mode,
+                                      values=list(INFERENCE_MODES),
+                                      state='readonly', width=28)
+        inference_combo.pack(padx=20, pady=5)
+        
+        # Pareja: dos esqueletos con ID y color propios
+        tk.Checkbutton(left_frame, text="Detectar pareja (2 bailarines)", 
+                      variable=self.detect_couple, bg='#1e1e1e', fg='white',
+                      selectcolor='#2b2b2b', activebackground='#1e1e1e',
+                      activeforeground='#00ff88').pack(pady=(5, 0))
+        
+        # Recorte alrededor de los bailarines
+        tk.Checkbutton(left_frame, text="Inferir sólo alrededor de los bailarines", 
+                      variable=self.use_roi, bg='#1e1e1e', fg='white',
+                      selectcolor='#2b2b2b', activebackground='#1e1e1e',
+                      activeforeground='#00ff88').pack(pady=(5, 0))
+        
+        # Suavizado temporal (One-Euro) contra el temblor del esqueleto
+        tk.Checkbutton(left_frame, text="Suavizar esqueleto", 
+                      variable=self.smooth_landmarks, bg='#1e1e1e', fg='white',
+                      selectcolor='#2b2b2b', activebackground='#1e1e1e',
+                      activeforeground='#00ff88').pack(pady=(5, 0))
+        
         # Guardar video
         tk.Checkbutton(left_frame, text="Guardar video procesado", 
                       variable=self.save_video, bg='#1e1e1e', fg='white',
                       selectcolor='#2b2b2b', activebackground='#1e1e1e',
-                      activeforeground='#00ff88').pack(pady=10)
+                      activeforeground='#00ff88').pack(pady=(10, 0))
+        
+        # Códec y tamaño del video de salida
+        output_frame = tk.Frame(left_frame, bg='#1e1e1e')
+        output_frame.pack(padx=20, pady=5)
+        ttk.Combobox(output_frame, textvariable=self.output_codec, values=list(CODECS),
+                     state='readonly', width=12).pack(side=tk.LEFT, padx=(0, 4))
+        ttk.Combobox(output_frame, textvariable=self.output_scale, values=list(OUTPUT_SCALES),
+                     state='readonly', width=12).pack(side=tk.LEFT)
+        
+        # Capa del esqueleto con transparencia, para componer en un editor
+        tk.Checkbutton(left_frame, text="Sólo el esqueleto (fondo transparente)", 
+                      variable=self.output_overlay, bg='#1e1e1e', fg='white',
+                      selectcolor='#2b2b2b', activebackground='#1e1e1e',
+                      activeforeground='#00ff88').pack(pady=(0, 0))
+        
+        # Guardar landmarks
+        tk.Checkbutton(left_frame, text="Guardar landmarks", 
+                      variable=self.save_landmarks, bg='#1e1e1e', fg='white',
+                      selectcolor='#2b2b2b', activebackground='#1e1e1e',
+                      activeforeground='#00ff88').pack(pady=(0, 0))
+        
+        # Exportar landmarks para análisis
+        tk.Label(left_frame, text="Exportar landmarks:", 
+                bg='#1e1e1e', fg='white').pack(anchor=tk.W, padx=20, pady=(5, 0))
+        
+        export_combo = ttk.Combobox(left_frame, textvariable=self.export_format,
+                                   values=['no'] + list(EXPORT_FORMATS),
+                                   state='readonly', width=28)
+        export_combo.pack(padx=20, pady=5)
+        
+        # Métricas de movimiento (pasos, vueltas, cadera...)
+        tk.Checkbutton(left_frame, text="Guardar métricas de movimiento", 
+                      variable=self.save_analytics, bg='#1e1e1e', fg='white',
+                      selectcolor='#2b2b2b', activebackground='#1e1e1e',
+                      activeforeground='#00ff88').pack(pady=(0, 0))
+        
+        # Guardar traza de rendimiento
+        tk.Checkbutton(left_frame, text="Guardar traza de rendimiento", 
+                      variable=self.save_trace, bg='#1e1e1e', fg='white',
+                      selectcolor='#2b2b2b', activebackground='#1e1e1e',
+                      activeforeground='#00ff88').pack(pady=(0, 10))
         
         # Separador
         ttk.Separator(left_frame, orient='horizontal').pack(fill=tk.X, pady=15)
@@ -174,6 +314,19 @@ class BachataSkeletonApp:
         center_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=10, pady=10)
         
         # Canvas para video
+        # Línea de tiempo (se empaqueta antes que el canvas para que éste no la tape)
+        timeline_frame = tk.Frame(center_frame, bg='#2b2b2b')
+        timeline_frame.pack(side=tk.BOTTOM, fill=tk.X, pady=(5, 0))
+        
+        self.timeline = tk.Scale(timeline_frame, from_=0, to=0, orient=tk.HORIZONTAL,
+                                 showvalue=False, command=self.on_scrub, state=tk.DISABLED,
+                                 bg='#2b2b2b', troughcolor='#1e1e1e', highlightthickness=0)
+        self.timeline.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        
+        self.position_label = tk.Label(timeline_frame, text="--:--", width=22,
+                                       bg='#2b2b2b', fg='#888888', font=('Consolas', 9))
+        self.position_label.pack(side=tk.RIGHT)
+        
         self.canvas = tk.Canvas(center_frame, bg='#000000', highlightthickness=0)
         self.canvas.pack(fill=tk.BOTH, expand=True)
         
@@ -191,7 +344,12 @@ class BachataSkeletonApp:
         self.info_label = tk.Label(bottom_frame, 
                                    text="ℹ️ Listo | MediaPipe Tasks API",
                                    bg='#1e1e1e', fg='#00ff88', font=('Arial', 10))
-        self.info_label.pack(pady=20)
+        self.info_label.pack(pady=(8, 0))
+        
+        # fps y milisegundos por etapa mientras se procesa
+        self.perf_label = tk.Label(bottom_frame, text="", 
+                                   bg='#1e1e1e', fg='#888888', font=('Consolas', 9))
+        self.perf_label.pack()
     
     def load_video(self):
         file_path = filedialog.askopenfilename(
@@ -205,176 +363,236 @@ class BachataSkeletonApp:
             self.video_label.config(text=f"📹 {filename}", fg='#00ff88')
             self.btn_process.config(state=tk.NORMAL)
             self.info_label.config(text=f"✅ Video cargado: {filename}")
+            self.warm_landmarker()
             
-            # Mostrar primer frame
-            self.show_first_frame()
+            # Mostrar el primer frame y habilitar la línea de tiempo
+            self.open_scrubber(0)
+    
+    # ---------- Línea de tiempo ----------
+    def open_scrubber(self, index=0):
+        """Abre la línea de tiempo del video actual en el frame `index` (desde el hilo de Tk)"""
+        self.close_scrubber()
+        confidence = self.confidence.get()
+        num_poses = 2 if self.detect_couple.get() else 1
+        model = self.scrub_model(confidence)
+        make_landmarker = None
+        if model is not None:
+            make_landmarker = lambda: create_landmarker(model[0], confidence, num_poses, running_mode="image")
+        try:
+            self.scrubber = Scrubber(self.video_path, self.get_skeleton_color(),
+                                     on_frame=lambda _, frame: self.preview_slot.publish(frame),
+                                     make_landmarker=make_landmarker)
+        except IOError as e:
+            self.info_label.config(text=f"❌ {e}")
+            return
+        self.scrubber.start()
+        
+        self.timeline.config(state=tk.NORMAL, to=max(0, self.scrubber.total_frames - 1))
+        self.timeline.set(index)
+        self.on_scrub(index)
+        
+        # Si el video ya se procesó con estos ajustes, dibujar con esos landmarks
+        if model is not None:
+            settings = (model[0], confidence, INFERENCE_MODES[self.inference_mode.get()],
+                        self.use_roi.get(), num_poses, model[1], self.smooth_landmarks.get())
+            threading.Thread(target=self.load_scrubber_landmarks, args=(self.scrubber, settings),
+                             daemon=True).start()
+    
+    def close_scrubber(self):
+        if self.scrubber is not None:
+            self.scrubber.close()
+            self.scrubber = None
+        self.timeline.config(state=tk.DISABLED)
+    
+    def scrub_model(self, confidence):
+        """(ruta, lado máximo) del modelo a usar en la línea de tiempo si ya está disponible, o None"""
+        variant = self.model_variant.get()
+        max_side = None
+        if variant == "auto":
+            tuned = self.autotune_results.get((self.video_path, confidence))
+            if tuned is None:
+                return None
+            variant, max_side = tuned["variant"], tuned["max_side"]
+        if not default_store().is_ready(variant):
+            return None
+        return default_store().path_for(variant), max_side
+    
+    def load_scrubber_landmarks(self, scrubber, settings):
+        """Busca en la caché los landmarks del video (en segundo plano)"""
+        try:
+            _, cache_key = self.inference_helpers(*settings)
+            store = self.landmark_cache.load(cache_key)
+        except OSError as e:
+            print(f"No se pudo consultar la caché de landmarks: {e}")
+            return
+        if store is not None:
+            scrubber.set_landmarks(store)
     
-    def show_first_frame(self):
-        cap = cv2.VideoCapture(self.video_path)
-        ret, frame = cap.read()
-        if ret:
-            self.display_frame(frame)
-        cap.release()
+    def on_scrub(self, value):
+        if self.scrubber is None:
+            return
+        index = int(float(value))
+        self.scrubber.request(index)
+        fps = self.scrubber.fps or 30
+        self.position_label.config(
+            text=f"{format_time(index / fps)} / {format_time(self.scrubber.total_frames / fps)}  #{index}")
     
     def process_video(self):
         if not self.video_path:
             messagebox.showwarning("Advertencia", "Por favor, selecciona un video primero")
             return
-            
-        if not os.path.exists(self.model_path):
-            messagebox.showwarning("Modelo no encontrado", "El modelo de IA aún se está descargando o faltante.")
-            return
+
+        output_options = None
+        if self.save_video.get():
+            try:
+                output_options = OutputOptions(self.output_codec.get(), OUTPUT_SCALES[self.output_scale.get()],
+                                               overlay=self.output_overlay.get())
+            except ValueError as e:
+                messagebox.showwarning("Advertencia", str(e))
+                return
+
+        # La vista previa pasa a mostrar el procesamiento
+        self.close_scrubber()
 
         self.btn_process.config(state=tk.DISABLED)
         self.btn_load.config(state=tk.DISABLED)
+        self.btn_live.config(state=tk.DISABLED)
         self.btn_pause.config(state=tk.NORMAL)
         self.btn_stop.config(state=tk.NORMAL)
         
         self.is_playing = True
         self.is_paused = False
-        threading.Thread(target=self.process_video_thread, daemon=True).start()
+        
+        # Leer las variables de Tk aquí, en el hilo de la interfaz
+        base = os.path.splitext(os.path.basename(self.video_path))[0] + OUTPUT_SUFFIX
+        self.output_path = base + output_options.extension if output_options else None
+        self.store_path = base + STORE_SUFFIX if self.save_landmarks.get() else None
+        export_format = self.export_format.get()
+        self.export_path = f"{base}.{export_format}" if export_format != "no" else None
+        self.analytics_path = base + ".analytics.json" if self.save_analytics.get() else None
+        self.trace_path = base + ".trace.json" if self.save_trace.get() else None
+        self.stats = PipelineStats(trace=self.trace_path is not None)
+        self.preview.stats = self.stats
+        threading.Thread(target=self.process_video_thread,
+                         args=(self.confidence.get(), self.get_skeleton_color(),
+                               INFERENCE_MODES[self.inference_mode.get()], self.use_roi.get(),
+                               2 if self.detect_couple.get() else 1, self.smooth_landmarks.get(),
+                               self.model_variant.get(), output_options),
+                         daemon=True).start()
     
-    def process_video_thread(self):
-        # Crear PoseLandmarker
-        base_options = python.BaseOptions(
-            model_asset_path=self.model_path,
-            delegate=python.BaseOptions.Delegate.CPU # Forzar CPU para estabilidad en Windows
-        )
-        options = vision.PoseLandmarkerOptions(
-            base_options=base_options,
-            running_mode=vision.RunningMode.VIDEO,
-            min_pose_detection_confidence=self.confidence.get(),
-            min_pose_presence_confidence=self.confidence.get(),
-            min_tracking_confidence=self.confidence.get()
-        )
+    def set_info(self, text):
+        """Actualiza el texto de estado desde cualquier hilo"""
+        self.root.after(0, lambda: self.info_label.config(text=text))
+    
+    def choose_model(self, variant, confidence):
+        """(ruta del modelo, lado máximo de inferencia) para la variante elegida"""
+        # Si el modelo todavía se está descargando, ensure_model espera a esa descarga
+        on_status = lambda text: self.set_info(f"⏳ {text}")
+        if variant != "auto":
+            return ensure_model(variant, on_status), None
+        
+        key = (self.video_path, confidence)
+        if key not in self.autotune_results:
+            self.autotune_results[key] = autotune(self.video_path, confidence=confidence,
+                                                  on_status=lambda text: self.set_info(f"⏳ {text}"))
+        tuned = self.autotune_results[key]
+        self.set_info(f"✅ Modelo {tuned['variant']} ({tuned['max_side'] or 'resolución original'}): "
+                      f"{tuned['fps']:.1f} fps de inferencia")
+        return ensure_model(tuned["variant"], on_status), tuned["max_side"]
+    
+    def inference_helpers(self, model_path, confidence, skip_settings, use_roi, num_poses, inference_max_side,
+                          smooth=False):
+        """(ayudantes para process_video_file, clave de caché) para estos ajustes de inferencia"""
+        infer_every, adaptive_skip = skip_settings
+        helpers, extra = inference_helpers(infer_every, adaptive_skip, num_poses, roi=use_roi,
+                                           inference_max_side=inference_max_side, smooth=smooth)
+        cache_key = self.landmark_cache.key_for(self.video_path, model_path, confidence, extra=extra)
+        return helpers, cache_key
+    
+    def process_video_thread(self, confidence, color, skip_settings, use_roi, num_poses, smooth, variant,
+                             output_options=None):
+        status = "⏳ Procesando..."
+        self.progress_state = None
+        
+        def on_start(pipeline, from_cache):
+            nonlocal status
+            if from_cache:
+                status = "⚡ Landmarks en caché"
+            self.pipeline = pipeline
+            if self.is_paused:
+                pipeline.pause()
+            if not self.is_playing:
+                pipeline.stop()
+        
+        def on_progress(frame_count, total_frames):
+            # Sin llamadas a Tk: la vista previa lo muestra en su próximo ciclo
+            self.progress_state = (status, frame_count, total_frames)
         
         try:
-            with vision.PoseLandmarker.create_from_options(options) as landmarker:
-                
-                self.cap = cv2.VideoCapture(self.video_path)
-                total_frames = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
-                fps = self.cap.get(cv2.CAP_PROP_FPS)
-                width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-                height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-                
-                if self.save_video.get():
-                    self.output_path = "bachata_esqueleto_output.mp4"
-                    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-                    self.video_writer = cv2.VideoWriter(self.output_path, fourcc, fps, (width, height))
-                
-                frame_count = 0
-                
-                while self.cap.isOpened() and self.is_playing:
-                    if not self.is_paused:
-                        ret, frame = self.cap.read()
-                        if not ret:
-                            break
-                        
-                        # Preparar imagen para MediaPipe
-                        image_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                        mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=image_rgb)
-                        
-                        # Calcular timestamp en ms
-                        timestamp_ms = int((frame_count * 1000) / fps)
-                        
-                        # Detectar
-                        detection_result = landmarker.detect_for_video(mp_image, timestamp_ms)
-                        
-                        # Dibujar (custom)
-                        if detection_result.pose_landmarks:
-                            frame = self.draw_custom_landmarks(frame, detection_result.pose_landmarks[0])
-                        
-                        if self.video_writer:
-                            self.video_writer.write(frame)
-                        
-                        self.display_frame(frame)
-                        
-                        frame_count += 1
-                        progress = (frame_count / total_frames) * 100
-                        self.progress['value'] = progress
-                        self.progress_label.config(text=f"{int(progress)}%")
-                        self.info_label.config(text=f"⏳ Procesando... Frame {frame_count}/{total_frames}")
+            model_path, inference_max_side = self.choose_model(variant, confidence)
+            
+            # Reutilizar landmarks ya calculados para este video con estos ajustes
+            self.set_info("⏳ Buscando landmarks en caché...")
+            helpers, cache_key = self.inference_helpers(
+                model_path, confidence, skip_settings, use_roi, num_poses, inference_max_side, smooth)
+            
+            # Decodificación, inferencia, dibujo/codificación y vista previa en hilos separados;
+            # el PoseLandmarker sólo se crea si los landmarks no están en caché
+            process_video_file(
+                self.video_path,
+                output_path=self.output_path,
+                color=color,
+                cache=self.landmark_cache,
+                cache_key=cache_key,
+                store_path=self.store_path,
+                make_landmarker=lambda: self.landmarker_pool.acquire(model_path, confidence, num_poses),
+                display=self.preview_slot.publish,
+                on_progress=on_progress,
+                on_start=on_start,
+                stats=self.stats,
+                export_paths=[self.export_path] if self.export_path else (),
+                output_options=output_options,
+                analytics_path=self.analytics_path,
+                **helpers
+            )
 
         except Exception as e:
             print(f"Error procesando video: {e}")
-            messagebox.showerror("Error", f"Ocurrió un error: {e}")
+            self.root.after(0, lambda error=e: messagebox.showerror("Error", f"Ocurrió un error: {error}"))
         finally:
-            self.finish_processing()
-
-    def draw_custom_landmarks(self, image, landmarks):
-        """Dibuja landmarks y conexiones manualmente sobre la imagen BGR"""
-        h, w, _ = image.shape
-        color = self.get_skeleton_color()
-        
-        # Dibujar líneas de conexión
-        for start_idx, end_idx in self.POSE_CONNECTIONS:
-            if start_idx < len(landmarks) and end_idx < len(landmarks):
-                start = landmarks[start_idx]
-                end = landmarks[end_idx]
-                
-                # Verificar visibilidad/presencia si es necesario, 
-                # pero en `pose_landmarks` generalmente están todos
-                
-                start_point = (int(start.x * w), int(start.y * h))
-                end_point = (int(end.x * w), int(end.y * h))
-                
-                cv2.line(image, start_point, end_point, color, 2)
-        
-        # Dibujar puntos
-        for idx, landmark in enumerate(landmarks):
-            # Filtrar si queremos solo el esqueleto principal (sin cara 0-10)
-            if idx < 11 and idx > 0: # Opcional: saltar cara
-               continue
-               
-            cx, cy = int(landmark.x * w), int(landmark.y * h)
-            cv2.circle(image, (cx, cy), 3, color, -1)
-            
-        return image
+            if self.trace_path:
+                self.stats.write_chrome_trace(self.trace_path)
+            # Terminar en el hilo de Tk
+            self.root.after(0, self.finish_processing)
 
     def get_skeleton_color(self):
-        colors = {
-            'default': (0, 255, 0),  # BGR: Verde
-            'azul': (255, 0, 0),     # BGR: Azul
-            'rojo': (0, 0, 255),     # BGR: Rojo
-            'verde': (0, 255, 0),
-            'amarillo': (0, 255, 255) # BGR: Amarillo
-        }
-        return colors.get(self.color_esqueleto.get(), (0, 255, 0))
+        return get_skeleton_color(self.color_esqueleto.get())
     
-    def display_frame(self, frame):
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        
-        # Dimensiones del canvas
-        canvas_width = self.canvas.winfo_width()
-        canvas_height = self.canvas.winfo_height()
-        
-        # Dimensiones originales del frame
-        frame_height, frame_width, _ = frame.shape
-        
-        if canvas_width > 1 and canvas_height > 1:
-            # Calcular escala para mantener relación de aspecto
-            scale_width = canvas_width / frame_width
-            scale_height = canvas_height / frame_height
-            scale = min(scale_width, scale_height)
-            
-            new_width = int(frame_width * scale)
-            new_height = int(frame_height * scale)
-            
-            # Redimensionar
-            frame_resized = cv2.resize(frame_rgb, (new_width, new_height))
-            image = Image.fromarray(frame_resized)
-            photo = ImageTk.PhotoImage(image=image)
-            
-            # Calcular posición centrada
-            x_pos = (canvas_width - new_width) // 2
-            y_pos = (canvas_height - new_height) // 2
-            
-            self.canvas.delete("all")
-            self.canvas.create_image(x_pos, y_pos, image=photo, anchor=tk.NW)
-            self.canvas.image = photo
+    def update_progress(self):
+        if self.live_session is not None and self.stats is not None:
+            self.perf_label.config(text=format_stats(*self.stats.rolling()))
+            return
+        if self.progress_state is None:
+            return
+        status, frame_count, total_frames = self.progress_state
+        if total_frames > 0:
+            progress = min(100.0, frame_count / total_frames * 100)
+            self.progress['value'] = progress
+            self.progress_label.config(text=f"{int(progress)}%")
+            self.info_label.config(text=f"{status} Frame {frame_count}/{total_frames}")
+        else:
+            # Duración desconocida (p. ej. algunos streams o contenedores sin índice)
+            self.info_label.config(text=f"{status} Frame {frame_count}")
+        if self.stats is not None:
+            self.perf_label.config(text=format_stats(*self.stats.rolling()))
     
     def toggle_pause(self):
         self.is_paused = not self.is_paused
+        if self.pipeline:
+            if self.is_paused:
+                self.pipeline.pause()
+            else:
+                self.pipeline.resume()
         if self.is_paused:
             self.btn_pause.config(text="▶ Reanudar", bg='#00ff88')
             self.info_label.config(text="⏸ Pausado")
@@ -384,21 +602,86 @@ class BachataSkeletonApp:
     
     def stop_video(self):
         self.is_playing = False
+        if self.pipeline:
+            self.pipeline.stop()
+        if self.live_session:
+            self.live_session.stop()
     
-    def finish_processing(self):
-        if self.cap: self.cap.release()
-        if self.video_writer: self.video_writer.release()
+    # ---------- En vivo ----------
+    def start_live(self):
+        source = simpledialog.askstring("En vivo", "Cámara (0, 1, ...), URL o archivo:",
+                                        initialvalue="0", parent=self.root)
+        if not source:
+            return
+        
+        self.close_scrubber()
+        self.btn_process.config(state=tk.DISABLED)
+        self.btn_load.config(state=tk.DISABLED)
+        self.btn_live.config(state=tk.DISABLED)
+        self.btn_stop.config(state=tk.NORMAL)
         
+        self.stats = PipelineStats()
+        self.preview.stats = self.stats
+        # En "auto" se usa lite: en vivo manda la latencia
+        variant = self.model_variant.get()
+        threading.Thread(target=self.live_thread,
+                         args=(source.strip(), variant if variant != "auto" else "lite",
+                               self.confidence.get(), self.get_skeleton_color(),
+                               2 if self.detect_couple.get() else 1, self.smooth_landmarks.get()),
+                         daemon=True).start()
+    
+    def live_thread(self, source, variant, confidence, color, num_poses, smooth):
+        try:
+            model_path = ensure_model(variant, on_status=lambda text: self.set_info(f"⏳ {text}"))
+            self.set_info(f"📷 En vivo: {source}")
+            self.live_session = LiveSession(source, model_path, confidence, num_poses, color,
+                                            display=self.preview_slot.publish, stats=self.stats,
+                                            smooth=smooth)
+            self.live_session.run()
+        except Exception as e:
+            print(f"Error en vivo: {e}")
+            self.root.after(0, lambda error=e: messagebox.showerror("Error", f"Ocurrió un error: {error}"))
+        finally:
+            self.root.after(0, self.finish_live)
+    
+    def finish_live(self):
+        self.live_session = None
+        self.preview.stats = None
+        self.btn_load.config(state=tk.NORMAL)
+        self.btn_live.config(state=tk.NORMAL)
+        self.btn_stop.config(state=tk.DISABLED)
+        
+        latency = self.stats.summary().get("latency") if self.stats is not None else None
+        if latency:
+            self.perf_label.config(text=f"Latencia p50 {latency['p50_ms']:.0f} ms | "
+                                        f"p95 {latency['p95_ms']:.0f} ms")
+        self.info_label.config(text="⏹ En vivo detenido")
+        if self.video_path:
+            self.btn_process.config(state=tk.NORMAL)
+            self.open_scrubber(self.timeline.get())
+    
+    def finish_processing(self):
+        self.pipeline = None
+        self.progress_state = None
+        self.preview.stats = None
+        if self.stats is not None and self.stats.frames:
+            self.perf_label.config(text=f"Promedio: {self.stats.fps:.1f} fps")
         self.btn_process.config(state=tk.NORMAL)
         self.btn_load.config(state=tk.NORMAL)
+        self.btn_live.config(state=tk.NORMAL)
         self.btn_pause.config(state=tk.DISABLED, text="⏸ Pausar", bg='#ff9500')
         self.btn_stop.config(state=tk.DISABLED)
         
         self.is_paused = False
-        
-        if self.save_video.get() and self.output_path and os.path.exists(self.output_path):
-            self.info_label.config(text=f"✅ Video guardado: {self.output_path}")
-            messagebox.showinfo("Éxito", f"Video procesado guardado en:\n{self.output_path}")
+        # Volver a la línea de tiempo, ahora con los landmarks recién calculados
+        self.open_scrubber(self.timeline.get())
+        
+        saved = [path for path in (self.output_path, self.store_path, self.export_path,
+                                   self.analytics_path, self.trace_path)
+                 if path and os.path.exists(path)]
+        if saved:
+            self.info_label.config(text=f"✅ Guardado: {', '.join(saved)}")
+            messagebox.showinfo("Éxito", "Resultados guardados en:\n" + "\n".join(saved))
         else:
             self.info_label.config(text="✅ Procesamiento finalizado (o detenido)")
 
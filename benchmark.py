@@ -0,0 +1,216 @@
+"""Benchmark de rendimiento del pipeline.
+
+Procesa clips sintéticos generados a varias resoluciones (y, opcionalmente,
+grabaciones locales) con cada combinación de modelo y cantidad de hilos de
+dibujo, y reporta fps de punta a punta y percentiles de latencia por etapa:
+decodificación, conversión de color, inferencia, dibujo, codificación y vista
+previa. La vista previa se simula sin ventana con el mismo escalado y
+conversión que hace la interfaz.
+
+    python benchmark.py --resolutions 640x360 1280x720 1920x1080 \\
+        --models lite full heavy \\
+        --draw-workers 1 2 --videos clase.mp4 -o bench.json
+
+Con `--baseline bench_anterior.json` compara contra una corrida previa y
+termina con código 1 si alguna configuración perdió más de `--tolerance`
+de fps.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import cv2
+import mediapipe as mp
+import numpy as np
+
+from perf_stats import STAGES, PipelineStats
+from skeleton_core import (DEFAULT_MODEL_VARIANT, MODEL_VARIANTS, SKELETON_COLORS, build_pipeline,
+                           create_landmarker, create_video_writer, ensure_model, open_video)
+from video_output import CODECS, DEFAULT_CODEC, OutputOptions, release_video_output
+
+DEFAULT_RESOLUTIONS = ("640x360", "1280x720", "1920x1080")
+# Tamaño del canvas de la interfaz para simular la vista previa
+PREVIEW_SIZE = (960, 540)
+
+
+def parse_resolution(text):
+    width, height = text.lower().split("x")
+    return int(width), int(height)
+
+
+def synthetic_clip(path, width, height, frames, fps=30):
+    """Genera un clip con fondo texturado y formas en movimiento.
+
+    El ruido fijo de fondo evita que el codificador y el decodificador tengan
+    un trabajo artificialmente fácil, como pasaría con frames negros.
+    """
+    rng = np.random.default_rng(0)
+    background = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+    background = cv2.GaussianBlur(background, (0, 0), 3)
+    writer = create_video_writer(path, fps, width, height)
+    try:
+        for i in range(frames):
+            frame = background.copy()
+            x = int(width * (0.2 + 0.6 * (i % fps) / fps))
+            y = height // 2
+            size = max(4, height // 6)
+            cv2.circle(frame, (x, y - size), size // 2, (40, 40, 200), -1)
+            cv2.rectangle(frame, (x - size // 2, y - size // 2), (x + size // 2, y + size * 2), (200, 60, 40), -1)
+            writer.write(frame)
+    finally:
+        writer.release()
+
+
+def preview_frame(frame):
+    """Mismo trabajo que la vista previa de Tk, sin ventana"""
+    height, width = frame.shape[:2]
+    scale = min(PREVIEW_SIZE[0] / width, PREVIEW_SIZE[1] / height)
+    resized = cv2.resize(frame, (max(1, int(width * scale)), max(1, int(height * scale))))
+    return cv2.cvtColor(resized, cv2.COLOR_BGR2RGB)
+
+
+def run_case(video_path, model_path, draw_workers, confidence, output_dir, output_options=None):
+    """Procesa un video completo y devuelve un dict con fps y tiempos por etapa"""
+    output_options = output_options or OutputOptions()
+    cap, total_frames, fps, width, height = open_video(video_path)
+    output_path = os.path.join(output_dir, "benchmark_output" + output_options.extension)
+    stats = PipelineStats()
+    video_writer = create_video_writer(output_path, fps, width, height, output_options, stats)
+    landmarker = create_landmarker(model_path, confidence)
+    completed = False
+    try:
+        pipeline = build_pipeline(cap, landmarker, fps, SKELETON_COLORS['default'],
+                                  video_writer=video_writer, display=preview_frame, stats=stats,
+                                  draw_workers=draw_workers, overlay=output_options.overlay)
+        pipeline.run()
+        completed = True
+    finally:
+        cap.release()
+        landmarker.close()
+        try:
+            release_video_output(video_writer, pipeline_failed=not completed)
+        finally:
+            if os.path.exists(output_path):
+                os.remove(output_path)
+
+    return {
+        "source": os.path.basename(video_path),
+        "resolution": f"{width}x{height}",
+        "model": os.path.basename(model_path),
+        "draw_workers": draw_workers,
+        "codec": output_options.codec,
+        "output_size": "x".join(map(str, output_options.output_size(width, height))),
+        "frames": stats.frames,
+        "seconds": stats.elapsed,
+        "fps": stats.fps,
+        "stages": stats.summary(),
+    }
+
+
+def case_key(result):
+    # Las corridas anteriores a la opción de códec escribían mp4v a tamaño completo
+    return (result["source"], result["resolution"], result["model"], result["draw_workers"],
+            result.get("codec", "mp4v"), result.get("output_size", result["resolution"]))
+
+
+def compare(results, baseline, tolerance):
+    """Configuraciones con menos fps que en `baseline` más allá de `tolerance`"""
+    previous = {case_key(result): result for result in baseline["results"]}
+    regressions = []
+    for result in results:
+        old = previous.get(case_key(result))
+        if old and old["fps"] and result["fps"] < old["fps"] * (1 - tolerance):
+            regressions.append((result, old))
+    return regressions
+
+
+def print_result(result):
+    stages = result["stages"]
+    columns = " | ".join(f"{stage} {stages[stage]['p50_ms']:.1f}/{stages[stage]['p95_ms']:.1f}"
+                         for stage in STAGES if stage in stages)
+    print(f"{result['source']:<24} {result['resolution']:>9} {result['model']:<28} "
+          f"w={result['draw_workers']} {result.get('codec', 'mp4v')} {result['fps']:7.1f} fps | {columns}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark del pipeline de esqueletos")
+    parser.add_argument("--resolutions", nargs="*", default=list(DEFAULT_RESOLUTIONS),
+                        help="Resoluciones de los clips sintéticos (ANCHOxALTO)")
+    parser.add_argument("--frames", type=int, default=150, help="Frames de cada clip sintético")
+    parser.add_argument("--videos", nargs="*", default=[], help="Grabaciones locales a incluir")
+    parser.add_argument("--models", nargs="+", default=[DEFAULT_MODEL_VARIANT],
+                        help="Variantes (lite, full, heavy) o modelos .task a comparar")
+    parser.add_argument("--draw-workers", nargs="+", type=int, default=[2],
+                        help="Cantidades de hilos de dibujo a comparar")
+    parser.add_argument("--confidence", type=float, default=0.5, help="Confianza de detección")
+    parser.add_argument("--codecs", nargs="+", default=[DEFAULT_CODEC], choices=sorted(CODECS),
+                        help="Códecs de salida a comparar")
+    parser.add_argument("--output-scale", type=float, default=1.0, help="Escala del video de salida")
+    parser.add_argument("-o", "--output", help="Guardar los resultados en este JSON")
+    parser.add_argument("--baseline", help="JSON de una corrida anterior para detectar regresiones")
+    parser.add_argument("--tolerance", type=float, default=0.1,
+                        help="Pérdida de fps tolerada frente a --baseline (0.1 = 10%%)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    missing = [model for model in args.models if model not in MODEL_VARIANTS and not os.path.exists(model)]
+    if missing:
+        print(f"❌ No se encontraron los modelos: {', '.join(missing)}")
+        return 1
+    models = [ensure_model(model) for model in args.models]
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="bachata_bench_") as work_dir:
+        videos = []
+        for resolution in args.resolutions:
+            width, height = parse_resolution(resolution)
+            path = os.path.join(work_dir, f"synthetic_{width}x{height}.mp4")
+            synthetic_clip(path, width, height, args.frames)
+            videos.append(path)
+        videos += args.videos
+
+        for video_path in videos:
+            for model_path in models:
+                for draw_workers in args.draw_workers:
+                    for codec in args.codecs:
+                        result = run_case(video_path, model_path, draw_workers, args.confidence, work_dir,
+                                          OutputOptions(codec, args.output_scale))
+                        results.append(result)
+                        print_result(result)
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "opencv": cv2.__version__,
+        "mediapipe": mp.__version__,
+        "cpu_count": os.cpu_count(),
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Resultados: {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        for result, old in regressions:
+            print(f"❌ Regresión: {' '.join(map(str, case_key(result)))}: "
+                  f"{old['fps']:.1f} → {result['fps']:.1f} fps")
+        if regressions:
+            return 1
+        print("✅ Sin regresiones frente a la corrida anterior")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,22 +2,11 @@ import mediapipe as mp
 from mediapipe.tasks import python
 from mediapipe.tasks.python import vision
 import numpy as np
-import os
-import requests
 
-MODEL_PATH = "pose_landmarker_full.task"
+from model_store import DEFAULT_MODEL_VARIANT, default_store
 
-# Ensure model exists
-if not os.path.exists(MODEL_PATH):
-    print("Downloading model...")
-    url = "https://storage.googleapis.com/mediapipe-models/pose_landmarker/pose_landmarker_full/float16/1/pose_landmarker_full.task"
-    response = requests.get(url)
-    if response.status_code == 200:
-        with open(MODEL_PATH, 'wb') as f:
-            f.write(response.content)
-        print("Model downloaded.")
-    else:
-        print(f"Failed to download model: {response.status_code}")
+# Ensure model exists (shared, verified model store)
+MODEL_PATH = default_store().ensure(DEFAULT_MODEL_VARIANT, on_status=print)
 
 def run_test():
     try:
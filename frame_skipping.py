@@ -0,0 +1,174 @@
+"""Inferencia cada N frames (fija o adaptativa) con interpolación de landmarks.
+
+En figuras lentas, correr el PoseLandmarker en todos los frames de un video a
+60 fps es trabajo desperdiciado. `FrameSkipper` decide qué frames pasan por
+inferencia y completa el resto interpolando linealmente entre los resultados
+vecinos, así el video de salida sigue teniendo esqueleto en cada frame.
+
+En modo adaptativo el salto crece mientras el esqueleto se mueve poco entre
+inferencias y vuelve a 1 en cuanto se mueve rápido o se pierde a la persona.
+
+Para medir cuánto se pierde en precisión, `evaluate_skipping` repite la
+política sobre un store con inferencia completa y compara:
+
+    python frame_skipping.py salida/clase_esqueleto.landmarks --every 3 --adaptive
+"""
+import argparse
+
+import numpy as np
+
+from landmark_store import LandmarkStore
+
+# Articulaciones del cuerpo (sin la cara) para medir movimiento
+_BODY = slice(11, None)
+
+
+def pose_motion(previous, current):
+    """Desplazamiento medio normalizado del cuerpo de las personas visibles en ambos, o None"""
+    count = min(len(previous), len(current))
+    delta = current[:count, _BODY, :2] - previous[:count, _BODY, :2]
+    distances = np.linalg.norm(delta, axis=-1)
+    distances = distances[~np.isnan(distances)]
+    return float(distances.mean()) if len(distances) else None
+
+
+class FrameSkipper:
+    """Política de salto de inferencia.
+
+    - every: salto fijo (o inicial, en modo adaptativo).
+    - adaptive: ajustar el salto entre 1 y `max_every` según el movimiento por
+      frame: se duplica por debajo de `motion_low` y se reduce a la mitad por
+      encima de `motion_high` (coordenadas normalizadas).
+    """
+
+    def __init__(self, every=1, adaptive=False, max_every=8, motion_low=0.002, motion_high=0.008):
+        self.every = max(1, every)
+        self.adaptive = adaptive
+        self.max_every = max(self.every, max_every)
+        self.motion_low = motion_low
+        self.motion_high = motion_high
+        self.stride = self.every
+        self.inferred = 0
+        self._last = None
+        self._next_index = 0
+
+    @property
+    def enabled(self):
+        return self.every > 1 or self.adaptive
+
+    def settings(self):
+        """Ajustes que cambian los landmarks resultantes (para la clave de caché)"""
+        return {"infer_every": self.every, "adaptive": self.adaptive, "max_every": self.max_every,
+                "motion_low": self.motion_low, "motion_high": self.motion_high}
+
+    def should_infer(self, index):
+        return self._last is None or index >= self._next_index
+
+    def observe(self, index, poses):
+        """Registra el resultado de una inferencia y programa la siguiente"""
+        self.inferred += 1
+        if self.adaptive:
+            motion = None
+            if self._last is not None:
+                last_index, last_poses = self._last
+                motion = pose_motion(last_poses, poses)
+                if motion is not None:
+                    motion /= max(1, index - last_index)
+
+            if motion is None:
+                # Sin persona (o recién empezando): inferir seguido hasta reengancharla
+                self.stride = 1 if not len(poses) else self.every
+            elif motion < self.motion_low:
+                self.stride = min(self.stride * 2, self.max_every)
+            elif motion > self.motion_high:
+                self.stride = max(1, self.stride // 2)
+
+        self._last = (index, poses)
+        self._next_index = index + self.stride
+
+    @staticmethod
+    def interpolate(previous, following, t):
+        """Landmarks en la fracción `t` (0..1) entre dos resultados de inferencia.
+
+        Si cambia el número de personas no hay correspondencia: se usa el más cercano.
+        """
+        if len(previous) and len(previous) == len(following):
+            return previous + (following - previous) * np.float32(t)
+        return previous if t < 0.5 else following
+
+
+def evaluate_skipping(poses_per_frame, skipper, width, height):
+    """Compara la política `skipper` contra inferencia completa.
+
+    `poses_per_frame` es la secuencia de referencia (p. ej. un LandmarkStore con
+    inferencia en todos los frames). Devuelve un dict con la fracción de frames
+    inferidos y el error en píxeles por frame del resultado (los frames
+    inferidos cuentan con error 0).
+    """
+    scale = np.array((width, height), dtype=np.float32)
+    estimated = [None] * len(poses_per_frame)
+    last_index = None
+    for index in range(len(poses_per_frame)):
+        if not skipper.should_infer(index):
+            continue
+        poses = poses_per_frame[index]
+        skipper.observe(index, poses)
+        estimated[index] = poses
+        if last_index is not None:
+            gap = index - last_index
+            for k in range(last_index + 1, index):
+                estimated[k] = skipper.interpolate(estimated[last_index], poses, (k - last_index) / gap)
+        last_index = index
+    # Cola sin inferencia final: mantener el último resultado
+    for k in range((last_index or 0) + 1, len(poses_per_frame)):
+        estimated[k] = estimated[last_index]
+
+    errors = []
+    mismatched = 0
+    for index, reference in enumerate(poses_per_frame):
+        guess = estimated[index]
+        seen = len(reference) > 0 and not np.isnan(reference[0, 0, 0])
+        if guess is None or seen != (len(guess) > 0 and not np.isnan(guess[0, 0, 0])):
+            mismatched += 1
+        elif seen:
+            distance = np.linalg.norm((guess[0, :, :2] - reference[0, :, :2]) * scale, axis=1)
+            errors.append(float(distance.mean()))
+
+    frames = len(poses_per_frame)
+    errors = np.array(errors) if errors else np.zeros(1)
+    return {
+        "frames": frames,
+        "inferred_frames": skipper.inferred,
+        "inference_ratio": skipper.inferred / frames if frames else 0.0,
+        "mean_error_px": float(errors.mean()),
+        "p95_error_px": float(np.percentile(errors, 95)),
+        "max_error_px": float(errors.max()),
+        "presence_mismatches": mismatched,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mide el costo en precisión de saltar inferencias")
+    parser.add_argument("store", help="Store de landmarks con inferencia en todos los frames")
+    parser.add_argument("--every", type=int, default=2, help="Inferir cada N frames")
+    parser.add_argument("--adaptive", action="store_true", help="Salto adaptativo según el movimiento")
+    parser.add_argument("--max-every", type=int, default=8, help="Salto máximo en modo adaptativo")
+    parser.add_argument("--width", type=int, help="Ancho del video (por defecto, el del store)")
+    parser.add_argument("--height", type=int, help="Alto del video (por defecto, el del store)")
+    args = parser.parse_args(argv)
+
+    store = LandmarkStore(args.store)
+    width = args.width or store.meta.get("width") or 1920
+    height = args.height or store.meta.get("height") or 1080
+    skipper = FrameSkipper(args.every, args.adaptive, args.max_every)
+    report = evaluate_skipping(store, skipper, width, height)
+
+    print(f"Frames: {report['frames']} | inferidos: {report['inferred_frames']} "
+          f"({report['inference_ratio']:.0%})")
+    print(f"Error por frame ({width}x{height}): medio {report['mean_error_px']:.1f} px | "
+          f"p95 {report['p95_error_px']:.1f} px | máx {report['max_error_px']:.1f} px")
+    print(f"Frames con detección distinta: {report['presence_mismatches']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""Caché persistente de landmarks por video.
+
+Cada entrada es un store de landmarks (ver landmark_store.py) con todos los
+frames de un video para una combinación de modelo y umbrales de confianza.
+La clave combina un hash del contenido del video con esos ajustes, así que
+cambiar el color o volver a exportar reutiliza la inferencia ya hecha. El
+tamaño total está acotado y se eliminan primero las entradas usadas hace más
+tiempo (LRU por mtime).
+"""
+import hashlib
+import json
+import os
+import shutil
+import threading
+
+from landmark_store import STORE_SUFFIX, LandmarkStore, LandmarkStoreWriter
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "bachata_skeleton", "landmarks")
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+
+# Índice de hashes ya calculados para no releer videos que no cambiaron
+_HASH_INDEX = "hashes.json"
+_TMP_MARKER = ".tmp-"
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class LandmarkCache:
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    # ---------- Claves ----------
+    def video_hash(self, video_path):
+        """Hash del contenido del video, memorizado por (ruta, tamaño, mtime)"""
+        stat = os.stat(video_path)
+        path = os.path.abspath(video_path)
+        index_path = os.path.join(self.cache_dir, _HASH_INDEX)
+
+        with self._lock:
+            index = self._read_hash_index(index_path)
+            known = index.get(path)
+            if known and known["size"] == stat.st_size and known["mtime_ns"] == stat.st_mtime_ns:
+                return known["sha256"]
+
+        sha = file_sha256(video_path)
+        with self._lock:
+            index = self._read_hash_index(index_path)
+            index[path] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": sha}
+            self._atomic_write_json(index_path, index)
+        return sha
+
+    def key_for(self, video_path, model_path, confidence, extra=None):
+        """Clave de caché; `extra` agrega otros ajustes que cambian los landmarks"""
+        settings = {
+            "video": self.video_hash(video_path),
+            "model": os.path.basename(model_path),
+            "min_pose_detection_confidence": round(confidence, 4),
+            "min_pose_presence_confidence": round(confidence, 4),
+            "min_tracking_confidence": round(confidence, 4),
+        }
+        settings.update(extra or {})
+        return hashlib.sha256(json.dumps(settings, sort_keys=True).encode()).hexdigest()
+
+    # ---------- Entradas ----------
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, key + STORE_SUFFIX)
+
+    def load(self, key):
+        """Devuelve la entrada como LandmarkStore (memmap) o None si no está en caché"""
+        path = self._entry_path(key)
+        try:
+            store = LandmarkStore(path)
+        except (OSError, KeyError, ValueError):
+            return None
+
+        # Marcar como usada recientemente; si otro proceso la acaba de desalojar, es un miss
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return store
+
+    def writer(self, key, **store_options):
+        """Abre una entrada nueva en un directorio temporal.
+
+        Se publica con `commit()` sólo si el video se procesó completo; si no,
+        se descarta con `discard()`.
+        """
+        tmp_path = f"{self._entry_path(key)}{_TMP_MARKER}{os.getpid()}-{threading.get_ident()}"
+        return LandmarkStoreWriter(tmp_path, **store_options)
+
+    def commit(self, key, writer):
+        writer.close()
+        path = self._entry_path(key)
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(writer.path, path)
+        self.evict()
+
+    def discard(self, writer):
+        writer.close()
+        shutil.rmtree(writer.path, ignore_errors=True)
+
+    def evict(self):
+        """Elimina las entradas menos usadas hasta quedar bajo `max_bytes`"""
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.cache_dir):
+                if name == _HASH_INDEX or _TMP_MARKER in name:
+                    continue
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    entries.append((os.stat(path).st_mtime, self._disk_usage(path), path))
+                except FileNotFoundError:
+                    continue  # la desalojó otro proceso (los workers comparten el directorio)
+
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                if os.path.isdir(path):
+                    shutil.rmtree(path, ignore_errors=True)
+                else:
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+                total -= size
+
+    # ---------- Utilidades ----------
+    @staticmethod
+    def _disk_usage(path):
+        if not os.path.isdir(path):
+            return os.path.getsize(path)
+        total = 0
+        for name in os.listdir(path):
+            try:
+                total += os.path.getsize(os.path.join(path, name))
+            except FileNotFoundError:
+                pass
+        return total
+
+    @staticmethod
+    def _read_hash_index(index_path):
+        try:
+            with open(index_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def _atomic_write_json(path, data):
+        tmp_path = f"{path}{_TMP_MARKER}{os.getpid()}"
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
@@ -0,0 +1,217 @@
+"""Exportación de landmarks a JSON Lines, CSV y Parquet.
+
+Una fila por persona detectada en cada frame: `frame`, `timestamp_ms`,
+`person` (el ID del tracker, o 0) y las 5 columnas de cada uno de los 33
+landmarks (`nose_x`, `nose_y`, ..., `right_foot_index_presence`). En JSON
+Lines los landmarks van como lista `[[x, y, z, visibility, presence], ...]`.
+
+Los exportadores tienen la misma interfaz que `LandmarkStoreWriter`
+(`append`, `extend`, `close`), así que se escriben mientras se procesa el
+video: los frames se acumulan en un buffer fijo de `batch_frames` y se
+escriben de a bloques (un row group por bloque en Parquet), de modo que la
+memoria no depende de la duración del video.
+
+Parquet necesita pyarrow (`pip install pyarrow`), que se importa sólo al usarlo.
+
+Ejemplo (exportar un store ya procesado):
+    python landmark_export.py salida/clase_esqueleto.landmarks clase.parquet
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+
+from landmark_store import LANDMARK_FIELDS, NUM_LANDMARKS, LandmarkStore
+
+EXPORT_FORMATS = ("jsonl", "csv", "parquet")
+
+# Nombres de los landmarks del PoseLandmarker, en orden
+POSE_LANDMARK_NAMES = (
+    "nose", "left_eye_inner", "left_eye", "left_eye_outer", "right_eye_inner", "right_eye",
+    "right_eye_outer", "left_ear", "right_ear", "mouth_left", "mouth_right",
+    "left_shoulder", "right_shoulder", "left_elbow", "right_elbow", "left_wrist", "right_wrist",
+    "left_pinky", "right_pinky", "left_index", "right_index", "left_thumb", "right_thumb",
+    "left_hip", "right_hip", "left_knee", "right_knee", "left_ankle", "right_ankle",
+    "left_heel", "right_heel", "left_foot_index", "right_foot_index",
+)
+LANDMARK_COLUMNS = tuple(f"{name}_{field}" for name in POSE_LANDMARK_NAMES for field in LANDMARK_FIELDS)
+
+
+def export_path_for(output_path, fmt):
+    """`video.mp4` → `video.<fmt>`"""
+    return os.path.splitext(output_path)[0] + "." + fmt
+
+
+def format_for_path(path):
+    """Formato según la extensión del archivo"""
+    fmt = os.path.splitext(path)[1].lstrip(".").lower()
+    if fmt == "ndjson":
+        fmt = "jsonl"
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Formato de exportación desconocido: {path} (usar {', '.join(EXPORT_FORMATS)})")
+    return fmt
+
+
+class _BatchedExporter:
+    """Base: acumula frames y escribe las filas de las personas presentes por bloques"""
+
+    def __init__(self, path, num_people=1, fps=None, batch_frames=256):
+        self.path = path
+        self.num_people = num_people
+        self.fps = fps
+        self.frames = 0
+        self.rows = 0
+        self._buffer = np.full((batch_frames, num_people, NUM_LANDMARKS, len(LANDMARK_FIELDS)),
+                               np.nan, dtype=np.float32)
+        self._timestamps = np.zeros(batch_frames, dtype=np.int64)
+        self._buffered = 0
+        self._closed = False
+        self._open()
+
+    def append(self, timestamp_ms, poses):
+        """Agrega un frame; `poses` es un array (personas, 33, 5), la fila i es el ID i"""
+        row = self._buffer[self._buffered]
+        count = min(len(poses), self.num_people)
+        row[:count] = poses[:count]
+        row[count:] = np.nan
+        self._timestamps[self._buffered] = timestamp_ms
+        self._buffered += 1
+        if self._buffered == len(self._buffer):
+            self.flush()
+
+    def extend(self, timestamps, landmarks):
+        """Agrega varios frames ya en forma (frames, `num_people`, 33, 5)"""
+        self.flush()
+        for start in range(0, len(landmarks), len(self._buffer)):
+            end = start + len(self._buffer)
+            self._write_block(np.asarray(timestamps[start:end], dtype=np.int64),
+                              np.asarray(landmarks[start:end], dtype=np.float32))
+
+    def flush(self):
+        if self._buffered:
+            self._write_block(self._timestamps[:self._buffered], self._buffer[:self._buffered])
+            self._buffered = 0
+
+    def _write_block(self, timestamps, landmarks):
+        frame_offsets, people = np.nonzero(~np.isnan(landmarks[:, :, 0, 0]))
+        if len(people):
+            self._write_rows(self.frames + frame_offsets, timestamps[frame_offsets], people,
+                             landmarks[frame_offsets, people].reshape(len(people), -1))
+            self.rows += len(people)
+        self.frames += len(landmarks)
+
+    def close(self):
+        if self._closed:
+            return
+        self.flush()
+        self._close()
+        self._closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # Implementadas por cada formato
+    def _open(self):
+        raise NotImplementedError
+
+    def _write_rows(self, frames, timestamps, people, values):
+        raise NotImplementedError
+
+    def _close(self):
+        raise NotImplementedError
+
+
+class JsonlExporter(_BatchedExporter):
+    def _open(self):
+        self._file = open(self.path, 'w')
+
+    def _write_rows(self, frames, timestamps, people, values):
+        values = np.round(values.astype(np.float64), 6).reshape(len(people), NUM_LANDMARKS, -1)
+        landmarks = values.tolist()
+        if np.isnan(values).any():
+            # JSON no tiene NaN
+            landmarks = [[[None if v != v else v for v in point] for point in person] for person in landmarks]
+        lines = [json.dumps({"frame": frame, "timestamp_ms": timestamp, "person": person, "landmarks": points})
+                 for frame, timestamp, person, points
+                 in zip(frames.tolist(), timestamps.tolist(), people.tolist(), landmarks)]
+        self._file.write("\n".join(lines) + "\n")
+
+    def _close(self):
+        self._file.close()
+
+
+class CsvExporter(_BatchedExporter):
+    def _open(self):
+        self._file = open(self.path, 'w', newline='')
+        self._file.write(",".join(("frame", "timestamp_ms", "person") + LANDMARK_COLUMNS) + "\n")
+        self._fmt = ["%d", "%d", "%d"] + ["%.6g"] * len(LANDMARK_COLUMNS)
+
+    def _write_rows(self, frames, timestamps, people, values):
+        table = np.column_stack((frames, timestamps, people, values.astype(np.float64)))
+        # NaN queda como "nan", que pandas y la mayoría de lectores CSV reconocen
+        np.savetxt(self._file, table, fmt=self._fmt, delimiter=",")
+
+    def _close(self):
+        self._file.close()
+
+
+class ParquetExporter(_BatchedExporter):
+    def _open(self):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Exportar a Parquet requiere pyarrow (pip install pyarrow)") from e
+        self._pa = pa
+        fields = [pa.field("frame", pa.int64()), pa.field("timestamp_ms", pa.int64()),
+                  pa.field("person", pa.int16())]
+        fields += [pa.field(name, pa.float32()) for name in LANDMARK_COLUMNS]
+        metadata = {"fps": json.dumps(self.fps), "num_people": str(self.num_people)}
+        self._schema = pa.schema(fields, metadata=metadata)
+        self._writer = pq.ParquetWriter(self.path, self._schema)
+
+    def _write_rows(self, frames, timestamps, people, values):
+        pa = self._pa
+        columns = [pa.array(frames, pa.int64()), pa.array(timestamps, pa.int64()),
+                   pa.array(people.astype(np.int16), pa.int16())]
+        values = np.ascontiguousarray(values.T)
+        columns += [pa.array(column, pa.float32(), from_pandas=True) for column in values]
+        self._writer.write_table(pa.Table.from_arrays(columns, schema=self._schema))
+
+    def _close(self):
+        self._writer.close()
+
+
+_EXPORTERS = {"jsonl": JsonlExporter, "csv": CsvExporter, "parquet": ParquetExporter}
+
+
+def open_exporter(path, num_people=1, fps=None, batch_frames=256, fmt=None):
+    """Exportador para `path`; el formato sale de la extensión si no se indica"""
+    return _EXPORTERS[fmt or format_for_path(path)](path, num_people, fps, batch_frames)
+
+
+def export_store(store, path, fmt=None, batch_frames=256):
+    """Exporta un LandmarkStore completo; devuelve la cantidad de filas escritas"""
+    with open_exporter(path, store.num_people, store.fps, batch_frames, fmt) as exporter:
+        exporter.extend(store.timestamps_ms, store.landmarks)
+    return exporter.rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Exporta un store de landmarks a JSON Lines, CSV o Parquet")
+    parser.add_argument("store", help="Store de landmarks (<video>.landmarks)")
+    parser.add_argument("output", help="Archivo de salida (.jsonl, .csv o .parquet)")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, help="Formato (por defecto, según la extensión)")
+    args = parser.parse_args(argv)
+
+    store = LandmarkStore(args.store)
+    rows = export_store(store, args.output, args.format)
+    print(f"✅ {len(store)} frames, {rows} filas → {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""Suavizado temporal de landmarks con el filtro One-Euro.
+
+El modelo lite tiembla de un frame a otro aunque el bailarín esté quieto.
+`OneEuroSmoother` filtra la secuencia de landmarks antes de dibujarla y
+guardarla: un pasabajos cuya frecuencia de corte sube con la velocidad, así
+que en las poses quietas elimina el temblor y en los movimientos rápidos
+(vueltas, juego de pies) casi no agrega retraso. No mira frames futuros: sirve
+también en vivo.
+
+El filtro corre con NumPy sobre todas las personas y los 33 landmarks a la
+vez, con parámetros propios por landmark (`DEFAULT_MIN_CUTOFF` y
+`DEFAULT_BETA`: las manos y los pies se suavizan menos que el tronco y la
+cara porque se mueven más rápido). Sólo se filtran x, y, z; visibility y
+presence pasan sin cambios.
+
+Para medir el efecto sobre un store con inferencia completa:
+
+    python landmark_smoothing.py salida/clase_esqueleto.landmarks --beta 20
+"""
+import argparse
+
+import numpy as np
+
+from landmark_store import LANDMARK_FIELDS, NUM_LANDMARKS, LandmarkStore
+
+# Frecuencia de corte mínima (Hz) y respuesta a la velocidad por landmark
+DEFAULT_MIN_CUTOFF = np.full(NUM_LANDMARKS, 1.0)
+DEFAULT_MIN_CUTOFF[:11] = 0.8                 # cara
+DEFAULT_MIN_CUTOFF[15:23] = 1.5               # muñecas y manos
+DEFAULT_MIN_CUTOFF[27:] = 1.5                 # tobillos y pies
+DEFAULT_BETA = np.full(NUM_LANDMARKS, 40.0)
+DEFAULT_BETA[15:23] = 80.0
+DEFAULT_BETA[27:] = 80.0
+
+# Coordenadas que se filtran (x, y, z)
+_COORDS = slice(0, 3)
+
+
+def _alpha(cutoff, dt):
+    """Factor de suavizado exponencial para una frecuencia de corte y un intervalo"""
+    tau = 1.0 / (2 * np.pi * cutoff)
+    return 1.0 / (1.0 + tau / dt)
+
+
+class OneEuroSmoother:
+    """Filtro One-Euro por persona y landmark.
+
+    - num_people: IDs a filtrar (la fila i de `poses` es siempre el ID i).
+    - min_cutoff: frecuencia de corte (Hz) con el landmark quieto; menor =
+      más suave. Un número o un array de 33 valores.
+    - beta: cuánto sube la frecuencia de corte con la velocidad (coordenadas
+      normalizadas por segundo); mayor = menos retraso en movimientos rápidos.
+    - d_cutoff: frecuencia de corte de la estimación de velocidad.
+
+    Si una persona desaparece se olvida su estado, para no arrastrar su
+    esqueleto viejo hacia donde reaparece.
+    """
+
+    def __init__(self, num_people=1, min_cutoff=None, beta=None, d_cutoff=1.0):
+        self.num_people = num_people
+        self.min_cutoff = np.broadcast_to(DEFAULT_MIN_CUTOFF if min_cutoff is None else min_cutoff,
+                                          (NUM_LANDMARKS,)).astype(np.float64)
+        self.beta = np.broadcast_to(DEFAULT_BETA if beta is None else beta, (NUM_LANDMARKS,)).astype(np.float64)
+        self.d_cutoff = d_cutoff
+        self.reset()
+
+    def settings(self):
+        """Ajustes que cambian los landmarks resultantes (para la clave de caché)"""
+        return {"smooth_min_cutoff": np.round(self.min_cutoff, 4).tolist(),
+                "smooth_beta": np.round(self.beta, 4).tolist(), "smooth_d_cutoff": self.d_cutoff}
+
+    def reset(self):
+        shape = (self.num_people, NUM_LANDMARKS, 3)
+        self._value = np.full(shape, np.nan)
+        self._speed = np.zeros(shape)
+        self._last_ms = np.full(self.num_people, np.nan)
+
+    def update(self, timestamp_ms, poses):
+        """Filtra un frame; `poses` es (ids, 33, 5) y se devuelve un array nuevo de la misma forma"""
+        count = min(len(poses), self.num_people)
+        smoothed = np.array(poses, dtype=np.float32)
+        values = smoothed[:count, :, _COORDS].astype(np.float64)
+        seen = ~np.isnan(values[:, :, 0]).all(axis=1)
+
+        # Personas que no aparecen en este frame: olvidar su estado
+        self._last_ms[count:] = np.nan
+        self._last_ms[:count][~seen] = np.nan
+        tracked = seen & ~np.isnan(self._last_ms[:count])
+
+        if tracked.any():
+            rows = np.flatnonzero(tracked)
+            dt = np.maximum((timestamp_ms - self._last_ms[rows]) / 1000.0, 1e-3)[:, np.newaxis, np.newaxis]
+            previous = self._value[rows]
+            speed_alpha = _alpha(self.d_cutoff, dt)
+            speed = speed_alpha * (values[rows] - previous) / dt + (1 - speed_alpha) * self._speed[rows]
+            # Frecuencia de corte por landmark según la rapidez en el plano de la imagen
+            rapidity = np.linalg.norm(speed[:, :, :2], axis=-1, keepdims=True)
+            cutoff = self.min_cutoff[:, np.newaxis] + self.beta[:, np.newaxis] * rapidity
+            alpha = _alpha(cutoff, dt)
+            filtered = alpha * values[rows] + (1 - alpha) * previous
+            # Landmarks sin estado previo (o sin valor nuevo) toman el valor crudo
+            filtered = np.where(np.isnan(filtered), values[rows], filtered)
+            self._value[rows] = filtered
+            self._speed[rows] = np.nan_to_num(speed)
+            values[rows] = filtered
+
+        fresh = np.flatnonzero(seen & ~tracked)
+        self._value[fresh] = values[fresh]
+        self._speed[fresh] = 0.0
+        self._last_ms[:count][seen] = timestamp_ms
+
+        smoothed[:count, :, _COORDS] = values
+        return smoothed
+
+    def smooth(self, timestamps, landmarks):
+        """Filtra una secuencia completa (frames, personas, 33, 5); devuelve un array nuevo"""
+        result = np.empty((len(landmarks), self.num_people, NUM_LANDMARKS, len(LANDMARK_FIELDS)),
+                          dtype=np.float32)
+        for index, (timestamp_ms, poses) in enumerate(zip(timestamps, landmarks)):
+            result[index] = self.update(float(timestamp_ms), poses[:self.num_people])
+        return result
+
+
+def jitter(landmarks):
+    """Temblor medio: norma de la segunda diferencia de x, y por landmark y frame"""
+    points = np.asarray(landmarks[..., :2], dtype=np.float64)
+    if len(points) < 3:
+        return 0.0
+    accel = np.linalg.norm(points[2:] - 2 * points[1:-1] + points[:-2], axis=-1)
+    accel = accel[~np.isnan(accel)]
+    return float(accel.mean()) if len(accel) else 0.0
+
+
+def evaluate_smoothing(store, smoother):
+    """Compara el temblor y el desvío medio respecto de los landmarks originales"""
+    landmarks = np.asarray(store.landmarks)
+    smoothed = smoother.smooth(store.timestamps_ms, landmarks)
+    deviation = np.linalg.norm(smoothed[..., :2] - landmarks[..., :2], axis=-1)
+    deviation = deviation[~np.isnan(deviation)]
+    return {
+        "frames": len(landmarks),
+        "jitter_before": jitter(landmarks),
+        "jitter_after": jitter(smoothed),
+        "mean_deviation": float(deviation.mean()) if len(deviation) else 0.0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mide el efecto del suavizado One-Euro sobre un store")
+    parser.add_argument("store", help="Store de landmarks con inferencia en todos los frames")
+    parser.add_argument("--min-cutoff", type=float, help="Frecuencia de corte mínima (Hz) para todos los landmarks")
+    parser.add_argument("--beta", type=float, help="Respuesta a la velocidad para todos los landmarks")
+    args = parser.parse_args(argv)
+
+    store = LandmarkStore(args.store)
+    result = evaluate_smoothing(store, OneEuroSmoother(store.num_people, args.min_cutoff, args.beta))
+    reduction = 1 - result["jitter_after"] / result["jitter_before"] if result["jitter_before"] else 0.0
+    print(f"Frames: {result['frames']}")
+    print(f"Temblor: {result['jitter_before']:.5f} → {result['jitter_after']:.5f} ({reduction:.0%} menos)")
+    print(f"Desvío medio respecto del original: {result['mean_deviation']:.5f} (coordenadas normalizadas)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""Almacenamiento columnar compacto de landmarks.
+
+Un store es un directorio `<nombre>.landmarks/` con:
+
+- landmarks.f32: float32 crudo de forma (frames, personas, 33, 5) con las
+  columnas x, y, z, visibility, presence; NaN donde no hubo detección.
+- timestamps.i64: timestamp en ms de cada frame (int64).
+- meta.json: forma, fps, tamaño del video y columnas.
+
+Se escribe de forma incremental mientras se procesa el video y se lee con
+`np.memmap`, así que abrir un archivo de varias horas no carga nada en memoria
+hasta que se accede a los frames.
+"""
+import json
+import os
+
+import numpy as np
+
+# Landmarks por persona y columnas de cada uno
+NUM_LANDMARKS = 33
+LANDMARK_FIELDS = ("x", "y", "z", "visibility", "presence")
+
+STORE_SUFFIX = ".landmarks"
+_LANDMARKS_FILE = "landmarks.f32"
+_TIMESTAMPS_FILE = "timestamps.i64"
+_META_FILE = "meta.json"
+_FORMAT_VERSION = 1
+
+
+def store_path_for(output_path):
+    """`video.mp4` → `video.landmarks`"""
+    return os.path.splitext(output_path)[0] + STORE_SUFFIX
+
+
+class LandmarkStoreWriter:
+    """Escribe frames a un store en bloques de `flush_every` frames"""
+
+    def __init__(self, path, num_people=1, fps=None, width=None, height=None, flush_every=256):
+        self.path = path
+        self.num_people = num_people
+        self.fps = fps
+        self.width = width
+        self.height = height
+        self.frames = 0
+        os.makedirs(path, exist_ok=True)
+
+        self._buffer = np.full((flush_every, num_people, NUM_LANDMARKS, len(LANDMARK_FIELDS)),
+                               np.nan, dtype=np.float32)
+        self._timestamps = np.zeros(flush_every, dtype=np.int64)
+        self._buffered = 0
+        self._landmarks_file = open(os.path.join(path, _LANDMARKS_FILE), 'wb')
+        self._timestamps_file = open(os.path.join(path, _TIMESTAMPS_FILE), 'wb')
+        self._write_meta()
+
+    def append(self, timestamp_ms, poses):
+        """Agrega un frame; `poses` es un array (personas, 33, 5), se recorta o rellena con NaN"""
+        row = self._buffer[self._buffered]
+        count = min(len(poses), self.num_people)
+        row[:count] = poses[:count]
+        row[count:] = np.nan
+        self._timestamps[self._buffered] = timestamp_ms
+        self._buffered += 1
+        if self._buffered == len(self._buffer):
+            self.flush()
+
+    def extend(self, timestamps, landmarks):
+        """Agrega varios frames ya en forma (frames, `num_people`, 33, 5)"""
+        self.flush()
+        np.ascontiguousarray(landmarks, dtype=np.float32).tofile(self._landmarks_file)
+        np.ascontiguousarray(timestamps, dtype=np.int64).tofile(self._timestamps_file)
+        self.frames += len(landmarks)
+
+    def flush(self):
+        if self._buffered:
+            self._buffer[:self._buffered].tofile(self._landmarks_file)
+            self._timestamps[:self._buffered].tofile(self._timestamps_file)
+            self.frames += self._buffered
+            self._buffered = 0
+        self._landmarks_file.flush()
+        self._timestamps_file.flush()
+
+    def close(self):
+        if self._landmarks_file.closed:
+            return
+        self.flush()
+        self._landmarks_file.close()
+        self._timestamps_file.close()
+        self._write_meta()
+
+    def _write_meta(self):
+        meta = {
+            "version": _FORMAT_VERSION,
+            "frames": self.frames,
+            "num_people": self.num_people,
+            "num_landmarks": NUM_LANDMARKS,
+            "fields": list(LANDMARK_FIELDS),
+            "dtype": "float32",
+            "fps": self.fps,
+            "width": self.width,
+            "height": self.height,
+        }
+        with open(os.path.join(self.path, _META_FILE), 'w') as f:
+            json.dump(meta, f, indent=2)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class LandmarkStore:
+    """Lectura con acceso aleatorio sin copias de un store.
+
+    `landmarks` y `timestamps_ms` son `np.memmap` de sólo lectura. Indexar el
+    store (`store[i]`) devuelve las personas del frame i como array
+    (personas, 33, 5), igual que el pipeline: la fila j es la persona con ID j,
+    hasta la última detectada (NaN para IDs que no se ven en ese frame).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, _META_FILE)) as f:
+            self.meta = json.load(f)
+        self.num_people = self.meta["num_people"]
+        self.fps = self.meta.get("fps")
+
+        frame_shape = (self.num_people, self.meta["num_landmarks"], len(self.meta["fields"]))
+        landmarks_path = os.path.join(path, _LANDMARKS_FILE)
+        # El tamaño del archivo manda: también sirve para stores que no se cerraron
+        frames = os.path.getsize(landmarks_path) // (np.prod(frame_shape) * 4)
+        frames = min(frames, os.path.getsize(os.path.join(path, _TIMESTAMPS_FILE)) // 8)
+
+        if frames:
+            self.landmarks = np.memmap(landmarks_path, dtype=np.float32, mode='r',
+                                       shape=(frames,) + frame_shape)
+            self.timestamps_ms = np.memmap(os.path.join(path, _TIMESTAMPS_FILE), dtype=np.int64,
+                                           mode='r', shape=(frames,))
+        else:
+            self.landmarks = np.empty((0,) + frame_shape, dtype=np.float32)
+            self.timestamps_ms = np.empty(0, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.timestamps_ms)
+
+    def __getitem__(self, index):
+        people = self.landmarks[index]
+        present = np.flatnonzero(~np.isnan(people[:, 0, 0]))
+        return people[:present[-1] + 1] if len(present) else people[:0]
+
+    def index_for_timestamp(self, timestamp_ms):
+        """Índice del último frame con timestamp <= `timestamp_ms`"""
+        return max(0, int(np.searchsorted(self.timestamps_ms, timestamp_ms, side='right')) - 1)
+
+    def close(self):
+        self.landmarks = None
+        self.timestamps_ms = None
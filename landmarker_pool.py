@@ -0,0 +1,130 @@
+"""PoseLandmarkers precalentados y reutilizados entre videos.
+
+Crear un PoseLandmarker (importar MediaPipe, inicializar el grafo y cargar el
+modelo) tarda segundos. `LandmarkerPool` los crea en segundo plano antes de
+que se necesiten (`warm`) y los guarda al terminar cada video para el
+siguiente que use los mismos ajustes.
+
+En modo VIDEO los timestamps de un landmarker tienen que crecer siempre, así
+que cada uno se entrega envuelto en un `PooledLandmarker` que suma un offset a
+los timestamps de cada video; al devolverlo (`close()`) el offset avanza más
+allá del último timestamp usado. Para el pipeline se comporta como un
+landmarker recién creado que empieza en 0.
+"""
+import threading
+from collections import OrderedDict
+
+from skeleton_core import create_landmarker
+
+# Separación entre videos consecutivos en el mismo landmarker
+_VIDEO_GAP_MS = 1000
+
+
+class PooledLandmarker:
+    """Landmarker prestado por el pool; `close()` lo devuelve en lugar de cerrarlo"""
+
+    def __init__(self, pool, key, landmarker, timestamp_offset_ms):
+        self._pool = pool
+        self._key = key
+        self._landmarker = landmarker
+        self.timestamp_offset_ms = timestamp_offset_ms
+        self._last_timestamp_ms = -1
+
+    def detect_for_video(self, image, timestamp_ms):
+        self._last_timestamp_ms = max(self._last_timestamp_ms, timestamp_ms)
+        return self._landmarker.detect_for_video(image, self.timestamp_offset_ms + timestamp_ms)
+
+    def close(self):
+        if self._landmarker is None:
+            return
+        next_offset = self.timestamp_offset_ms + self._last_timestamp_ms + _VIDEO_GAP_MS
+        self._pool._release(self._key, self._landmarker, next_offset)
+        self._landmarker = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class LandmarkerPool:
+    """Landmarkers libres por (modelo, confianza, num_poses).
+
+    - max_idle: cuántos landmarkers libres se conservan en total; al pasarse
+      se cierran los usados hace más tiempo.
+    - factory(model_path, confidence, num_poses): crea un landmarker nuevo.
+    """
+
+    def __init__(self, max_idle=2, factory=create_landmarker):
+        self.max_idle = max_idle
+        self.factory = factory
+        self._idle = OrderedDict()  # key -> [(landmarker, offset)]
+        self._warming = {}          # key -> threading.Event
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def warm(self, model_path, confidence, num_poses=1):
+        """Crea en segundo plano un landmarker con estos ajustes si no hay uno libre"""
+        key = (model_path, confidence, num_poses)
+        with self._lock:
+            if self._closed or self._idle.get(key) or key in self._warming:
+                return
+            done = self._warming[key] = threading.Event()
+
+        def build():
+            try:
+                landmarker = self.factory(*key)
+            except Exception as e:
+                # Se vuelve a intentar (y a reportar) en `acquire`
+                print(f"No se pudo precalentar el landmarker: {e}")
+            else:
+                self._release(key, landmarker, 0)
+            finally:
+                with self._lock:
+                    self._warming.pop(key, None)
+                done.set()
+
+        threading.Thread(target=build, name="landmarker-warmup", daemon=True).start()
+
+    def acquire(self, model_path, confidence, num_poses=1):
+        """Un `PooledLandmarker` con estos ajustes: uno libre, el que se está precalentando o uno nuevo"""
+        key = (model_path, confidence, num_poses)
+        with self._lock:
+            warming = self._warming.get(key)
+        if warming is not None:
+            warming.wait()
+
+        with self._lock:
+            free = self._idle.get(key)
+            if free:
+                landmarker, offset = free.pop()
+                if not free:
+                    del self._idle[key]
+                return PooledLandmarker(self, key, landmarker, offset)
+        return PooledLandmarker(self, key, self.factory(*key), 0)
+
+    def _release(self, key, landmarker, next_offset):
+        to_close = []
+        with self._lock:
+            if self._closed:
+                to_close.append(landmarker)
+            else:
+                self._idle.setdefault(key, []).append((landmarker, next_offset))
+                self._idle.move_to_end(key)
+                while sum(len(free) for free in self._idle.values()) > self.max_idle:
+                    oldest_key = next(iter(self._idle))
+                    to_close.append(self._idle[oldest_key].pop(0)[0])
+                    if not self._idle[oldest_key]:
+                        del self._idle[oldest_key]
+        for landmarker in to_close:
+            landmarker.close()
+
+    def close(self):
+        """Cierra los landmarkers libres; los prestados se cierran al devolverse"""
+        with self._lock:
+            self._closed = True
+            idle = [landmarker for free in self._idle.values() for landmarker, _ in free]
+            self._idle.clear()
+        for landmarker in idle:
+            landmarker.close()
@@ -0,0 +1,310 @@
+"""Esqueleto en vivo desde una cámara o un stream, con latencia acotada.
+
+Pensado como espejo en el estudio: lo que importa es ver el frame más
+reciente cuanto antes, no procesar todos. Por eso:
+
+- `LatestFrameGrabber` lee la fuente en su propio hilo y guarda sólo el último
+  frame; los que no alcanzaron a procesarse se descartan en lugar de encolarse.
+- `LiveSession` usa el PoseLandmarker en modo LIVE_STREAM (`detect_async`) con
+  un solo frame en vuelo: cuando llega el resultado por callback se dibuja, se
+  publica y recién entonces se envía el frame más nuevo disponible. Así la
+  latencia nunca supera la de capturar + inferir un frame.
+- Cada frame mostrado registra en `stats` la etapa `latency` (de la captura a
+  la publicación), además de `decode`, `inference`, `draw` y `preview`.
+
+La fuente puede ser el índice de una cámara ("0"), una URL (rtsp://, http://)
+o un archivo, que se reproduce a su velocidad real para probar sin cámara.
+
+Ejemplo:
+    python live_stream.py 0
+    python live_stream.py clase.mp4 --num-poses 2
+"""
+import argparse
+import os
+import threading
+import time
+
+import cv2
+
+from landmark_smoothing import OneEuroSmoother
+from perf_stats import PipelineStats, format_stats
+from pose_tracking import PoseTracker
+from preview import LatestFrameSlot
+from skeleton_core import (MODEL_VARIANTS, SKELETON_COLORS, SkeletonRenderer,
+                           create_landmarker, downscale, ensure_model, load_mediapipe, person_colors,
+                           poses_to_array)
+
+# Si un resultado no llega en este tiempo se da el frame por perdido
+_RESULT_TIMEOUT_S = 1.0
+
+
+def open_source(source):
+    """Abre una cámara (índice), una URL o un archivo; devuelve (cap, es_archivo)"""
+    if isinstance(source, int) or str(source).isdigit():
+        cap = cv2.VideoCapture(int(source))
+        is_file = False
+    else:
+        cap = cv2.VideoCapture(source)
+        is_file = os.path.isfile(source)
+    if not cap.isOpened():
+        raise IOError(f"No se pudo abrir la fuente: {source}")
+    if not is_file:
+        # Que el driver no acumule frames viejos (no todos los backends lo respetan)
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+    return cap, is_file
+
+
+class LatestFrameGrabber:
+    """Lee frames en un hilo y conserva sólo el último.
+
+    Con `realtime=True` (archivos) los frames se leen al ritmo de `fps`, como
+    si vinieran de una cámara.
+    """
+
+    def __init__(self, cap, fps=None, realtime=False, stats=None):
+        self.cap = cap
+        self.fps = fps or 30
+        self.realtime = realtime
+        self.stats = stats
+        self.captured = 0
+        self.dropped = 0
+        self.finished = False
+        self._latest = None  # (índice, momento de captura, frame)
+        self._taken = -1
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="live-capture", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def read(self, timeout=None):
+        """(índice, momento de captura, frame) más nuevo que el último leído, o None si terminó"""
+        with self._cond:
+            while not self.finished and (self._latest is None or self._latest[0] == self._taken):
+                if not self._cond.wait(timeout):
+                    return None
+            if self._latest is None or self._latest[0] == self._taken:
+                return None
+            self._taken = self._latest[0]
+            return self._latest
+
+    def _run(self):
+        start = time.perf_counter()
+        try:
+            while not self._stop.is_set():
+                if self.realtime:
+                    delay = start + self.captured / self.fps - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                read_start = time.perf_counter()
+                ret, frame = self.cap.read()
+                captured_at = time.perf_counter()
+                if not ret:
+                    break
+                if self.stats is not None:
+                    self.stats.record("decode", read_start, captured_at)
+                with self._cond:
+                    if self._latest is not None and self._latest[0] != self._taken:
+                        self.dropped += 1
+                    self._latest = (self.captured, captured_at, frame)
+                    self.captured += 1
+                    self._cond.notify()
+        finally:
+            with self._cond:
+                self.finished = True
+                self._cond.notify_all()
+
+
+class LiveSession:
+    """Detecta y dibuja esqueletos sobre una fuente en vivo.
+
+    - display(frame_bgr): recibe cada frame anotado (desde el hilo del callback).
+    - mirror: mostrar la imagen espejada, como un espejo del estudio.
+    - num_poses > 1 asigna IDs estables con PoseTracker.
+    - smooth: suavizar los landmarks con OneEuroSmoother (quita el temblor del
+      modelo lite sin agregar frames de retraso).
+    - realtime: leer archivos a su velocidad real (por defecto, sí para archivos).
+    """
+
+    def __init__(self, source, model_path, confidence=0.5, num_poses=1, color=SKELETON_COLORS['default'],
+                 display=None, mirror=True, stats=None, realtime=None, inference_max_side=None, smooth=True):
+        self.source = source
+        self.model_path = model_path
+        self.confidence = confidence
+        self.num_poses = num_poses
+        self.display = display
+        self.mirror = mirror
+        self.stats = stats
+        self.realtime = realtime
+        self.inference_max_side = inference_max_side
+        self.renderer = SkeletonRenderer(person_colors(color))
+        self.tracker = PoseTracker(num_poses) if num_poses > 1 else None
+        self.smoother = OneEuroSmoother(num_poses) if smooth else None
+        self.frames_shown = 0
+        self.grabber = None
+
+        self._in_flight = {}  # timestamp_ms -> (momento de captura, frame, momento de envío)
+        self._idle = threading.Event()
+        self._idle.set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._error = None
+
+    def stop(self):
+        self._stop.set()
+
+    def run(self):
+        """Procesa la fuente hasta `stop()` o hasta que se termine; devuelve los frames mostrados"""
+        mp = load_mediapipe()[0]
+        # El landmarker primero: crearlo tarda y la cámara ya estaría capturando
+        landmarker = create_landmarker(self.model_path, self.confidence, self.num_poses,
+                                       running_mode="live_stream", result_callback=self._on_result)
+        try:
+            cap, is_file = open_source(self.source)
+        except Exception:
+            landmarker.close()
+            raise
+        realtime = is_file if self.realtime is None else self.realtime
+        self.grabber = LatestFrameGrabber(cap, cap.get(cv2.CAP_PROP_FPS), realtime, self.stats)
+        if self.stats is not None:
+            self.stats.start()
+        self.grabber.start()
+        origin = time.perf_counter()
+        last_timestamp_ms = -1
+        try:
+            while not self._stop.is_set() and self._error is None:
+                # Un solo frame en vuelo: esperar el resultado antes de tomar el siguiente
+                if not self._idle.wait(timeout=_RESULT_TIMEOUT_S):
+                    with self._lock:
+                        self._in_flight.clear()
+                    self._idle.set()
+                item = self.grabber.read(timeout=0.1)
+                if item is None:
+                    if self.grabber.finished:
+                        break
+                    continue
+
+                _, captured_at, frame = item
+                # detect_async exige timestamps estrictamente crecientes
+                timestamp_ms = max(last_timestamp_ms + 1, int((captured_at - origin) * 1000))
+                last_timestamp_ms = timestamp_ms
+
+                image = downscale(self._timed("convert", cv2.cvtColor, frame, cv2.COLOR_BGR2RGB),
+                                  self.inference_max_side)
+                with self._lock:
+                    self._in_flight[timestamp_ms] = (captured_at, frame, time.perf_counter())
+                self._idle.clear()
+                landmarker.detect_async(mp.Image(image_format=mp.ImageFormat.SRGB, data=image), timestamp_ms)
+
+            # Esperar el último resultado antes de cerrar
+            self._idle.wait(timeout=_RESULT_TIMEOUT_S)
+        finally:
+            self.grabber.stop()
+            landmarker.close()
+            cap.release()
+            if self.stats is not None:
+                self.stats.stop()
+
+        if self._error is not None:
+            raise self._error
+        return self.frames_shown
+
+    def _on_result(self, result, _image, timestamp_ms):
+        # Corre en el hilo de MediaPipe: una excepción acá se perdería
+        try:
+            received = time.perf_counter()
+            with self._lock:
+                entry = self._in_flight.pop(timestamp_ms, None)
+            if entry is None:
+                return
+            captured_at, frame, sent = entry
+            if self.stats is not None:
+                self.stats.record("inference", sent, received)
+
+            poses = poses_to_array(result.pose_landmarks)
+            if self.tracker is not None:
+                poses = self.tracker.update(poses)
+            if self.smoother is not None:
+                poses = self.smoother.update(timestamp_ms, poses)
+            frame = self._timed("draw", self.renderer.draw, frame, poses)
+            if self.mirror:
+                frame = cv2.flip(frame, 1)
+            if self.display is not None:
+                self._timed("preview", self.display, frame)
+            self.frames_shown += 1
+            if self.stats is not None:
+                self.stats.record("latency", captured_at, time.perf_counter())
+                self.stats.frame_done()
+        except Exception as e:
+            self._error = e
+            self.stop()
+        finally:
+            self._idle.set()
+
+    def _timed(self, stage, func, *args):
+        if self.stats is None:
+            return func(*args)
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            self.stats.record(stage, start, time.perf_counter())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Esqueleto en vivo desde una cámara, un stream o un archivo")
+    parser.add_argument("source", nargs="?", default="0",
+                        help="Índice de cámara, URL (rtsp://...) o archivo reproducido en tiempo real")
+    parser.add_argument("--model-variant", default="lite", choices=MODEL_VARIANTS,
+                        help="Variante del modelo (lite tiene la menor latencia)")
+    parser.add_argument("--model", help="Ruta de un modelo .task propio (reemplaza --model-variant)")
+    parser.add_argument("--confidence", type=float, default=0.5, help="Confianza de detección")
+    parser.add_argument("--num-poses", type=int, default=1, help="Bailarines a detectar")
+    parser.add_argument("--inference-max-side", type=int,
+                        help="Reducir la imagen enviada a inferencia a este lado máximo (px)")
+    parser.add_argument("--color", default="default", choices=sorted(SKELETON_COLORS),
+                        help="Color del esqueleto")
+    parser.add_argument("--no-mirror", action="store_true", help="No espejar la imagen")
+    parser.add_argument("--no-smooth", action="store_true", help="No suavizar los landmarks")
+    args = parser.parse_args(argv)
+
+    model_path = args.model or ensure_model(args.model_variant, on_status=lambda text: print(f"⏳ {text}"))
+    slot = LatestFrameSlot()
+    stats = PipelineStats()
+    session = LiveSession(args.source, model_path, args.confidence, max(1, args.num_poses),
+                          SKELETON_COLORS[args.color], display=slot.publish, mirror=not args.no_mirror,
+                          stats=stats, inference_max_side=args.inference_max_side, smooth=not args.no_smooth)
+    worker = threading.Thread(target=session.run, name="live-session", daemon=True)
+    worker.start()
+    print("▶ En vivo (q o Esc para salir)")
+
+    # HighGUI sólo es seguro desde el hilo principal
+    last_report = time.perf_counter()
+    while worker.is_alive():
+        frame = slot.take()
+        if frame is not None:
+            cv2.imshow("Bachata en vivo", frame)
+        if cv2.waitKey(5) & 0xFF in (ord('q'), 27):
+            session.stop()
+            break
+        if time.perf_counter() - last_report >= 1.0:
+            print(f"\r{format_stats(*stats.rolling())}", end="", flush=True)
+            last_report = time.perf_counter()
+    worker.join()
+    cv2.destroyAllWindows()
+
+    latency = stats.summary().get("latency")
+    print(f"\n✅ {session.frames_shown} frames mostrados, {session.grabber.dropped if session.grabber else 0} "
+          f"descartados por llegar tarde")
+    if latency:
+        print(f"Latencia captura → pantalla: p50 {latency['p50_ms']:.1f} ms | p95 {latency['p95_ms']:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
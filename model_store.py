@@ -0,0 +1,376 @@
+"""Almacén local de modelos del PoseLandmarker.
+
+Los modelos se guardan una sola vez en un directorio compartido
+(`~/.cache/bachata_skeleton/models` o `$BACHATA_MODEL_DIR`), no en el
+directorio de trabajo, así que cualquier proceso o máquina que monte ese
+directorio los reutiliza.
+
+- Las descargas van a `<modelo>.part` y se reanudan con cabeceras Range si se
+  cortan; el archivo final aparece con un `os.replace` atómico sólo cuando el
+  tamaño y el checksum son correctos.
+- Se verifica el MD5 que publica Google Cloud Storage (`x-goog-hash`) o el
+  SHA-256 que acompaña al modelo en un mirror (`<modelo>.sha256`). El SHA-256
+  del archivo ya verificado se guarda al lado y se vuelve a comprobar si el
+  archivo cambia de tamaño o de fecha.
+- Un modelo copiado a mano en el directorio (sin ese registro) se adopta: se
+  comprueba contra `<modelo>.sha256` si está y se registra, sin usar la red.
+- Un `pose_landmarker_*.task` suelto en el directorio de trabajo (donde lo
+  dejaban versiones anteriores, quizá truncado) sólo se usa con red si
+  coincide con el MD5 publicado; si no, se descarga.
+- Un lock por archivo evita que dos procesos descarguen el mismo modelo: el
+  segundo espera al primero y usa su resultado.
+- `mirror` (o `$BACHATA_MODEL_MIRROR`) es un directorio precargado o una URL
+  base alternativa; con `offline=True` (o `$BACHATA_MODEL_OFFLINE=1`) nunca se
+  usa la red salvo un mirror HTTP explícito.
+"""
+import base64
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+
+# Variantes del PoseLandmarker, de la más rápida a la más precisa
+MODEL_VARIANTS = ("lite", "full", "heavy")
+DEFAULT_MODEL_VARIANT = "full"
+_MODEL_URL_TEMPLATE = ("https://storage.googleapis.com/mediapipe-models/pose_landmarker/"
+                       "pose_landmarker_{0}/float16/1/pose_landmarker_{0}.task")
+
+DEFAULT_MODEL_DIR = os.environ.get(
+    "BACHATA_MODEL_DIR", os.path.join(os.path.expanduser("~"), ".cache", "bachata_skeleton", "models"))
+
+_CHUNK_SIZE = 1024 * 1024
+_LOCK_STALE_S = 600
+
+
+def model_filename(variant):
+    return f"pose_landmarker_{variant}.task"
+
+
+def model_url(variant):
+    return _MODEL_URL_TEMPLATE.format(variant)
+
+
+def file_digest(path, algorithm="sha256"):
+    digest = hashlib.new(algorithm)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest
+
+
+def _goog_md5(headers):
+    """MD5 (hex) del objeto completo según la cabecera `x-goog-hash`, o None"""
+    for part in headers.get("x-goog-hash", "").split(","):
+        name, _, value = part.strip().partition("=")
+        if name == "md5" and value:
+            return base64.b64decode(value).hex()
+    return None
+
+
+def _remote_checksum(url):
+    """(md5, tamaño) del objeto según un HEAD; (None, None) si no se pudo consultar"""
+    import requests
+
+    try:
+        head = requests.head(url, allow_redirects=True, timeout=(10, 60))
+    except requests.RequestException:
+        return None, None
+    if not head.ok:
+        return None, None
+    size = head.headers.get("Content-Length")
+    return _goog_md5(head.headers), int(size) if size and size.isdigit() else None
+
+
+def _fetch_sha256(url):
+    """Primer campo de un `.sha256` publicado por HTTP, o None si no existe"""
+    import requests
+
+    response = requests.get(url, timeout=(10, 60))
+    if response.status_code == 404:
+        return None
+    response.raise_for_status()
+    fields = response.text.split()
+    return fields[0].lower() if fields else None
+
+
+def _read_sha256_file(path):
+    """Primer campo de un archivo estilo `sha256sum`, o None"""
+    try:
+        with open(path) as f:
+            return f.read().split()[0].lower()
+    except (OSError, IndexError):
+        return None
+
+
+class ModelStore:
+    """Descarga, verifica y entrega rutas locales de modelos.
+
+    - cache_dir: directorio compartido de modelos.
+    - mirror: directorio o URL base con los mismos nombres de archivo.
+    - offline: no descargar de internet.
+    - retries: reintentos (reanudando) ante cortes de red.
+    """
+
+    def __init__(self, cache_dir=None, mirror=None, offline=None, retries=5):
+        self.cache_dir = cache_dir or DEFAULT_MODEL_DIR
+        self.mirror = mirror if mirror is not None else os.environ.get("BACHATA_MODEL_MIRROR")
+        if offline is None:
+            offline = os.environ.get("BACHATA_MODEL_OFFLINE", "") not in ("", "0")
+        self.offline = offline
+        self.retries = retries
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def path_for(self, variant):
+        return os.path.join(self.cache_dir, model_filename(variant))
+
+    def is_ready(self, variant):
+        """True si el modelo ya está en el almacén y verificado (sin red)"""
+        return self._verified(self.path_for(variant))
+
+    def ensure(self, variant, on_status=None):
+        """Ruta local verificada de `variant`, descargándola o copiándola si hace falta"""
+        if variant not in MODEL_VARIANTS:
+            raise ValueError(f"Variante de modelo desconocida: {variant}")
+        path = self.path_for(variant)
+        if self._verified(path):
+            return path
+
+        with self._lock, self._file_lock(path):
+            # Otro hilo o proceso pudo terminarlo mientras esperábamos
+            if self._verified(path):
+                return path
+            self._fetch(variant, path, on_status)
+        return path
+
+    # ---------- Obtención ----------
+    def _fetch(self, variant, path, on_status):
+        filename = model_filename(variant)
+        sources = []
+        if not os.path.exists(self._record_path(path)):
+            # Con registro y checksum distinto el archivo se modificó: no adoptarlo
+            sources.append(("adopt", path))
+        if self.mirror and not self.mirror.startswith(("http://", "https://")):
+            sources.append(("copy", os.path.join(self.mirror, filename)))
+        # Modelo suelto en el directorio de trabajo (versiones anteriores lo descargaban ahí,
+        # sin escritura atómica: puede estar truncado)
+        sources.append(("legacy", os.path.abspath(filename)))
+        if self.mirror and self.mirror.startswith(("http://", "https://")):
+            sources.append(("download", self.mirror.rstrip("/") + "/" + filename))
+        if not self.offline:
+            sources.append(("download", model_url(variant)))
+
+        errors = []
+        missing = []
+        for kind, source in sources:
+            try:
+                if kind in ("adopt", "copy", "legacy") and not os.path.exists(source):
+                    missing.append(source)
+                elif kind == "adopt":
+                    self._adopt(path)
+                    return
+                elif kind == "copy":
+                    if os.path.abspath(source) != os.path.abspath(path):
+                        if on_status is not None:
+                            on_status(f"Copiando modelo {variant}...")
+                        self._copy(source, path)
+                        return
+                elif kind == "legacy":
+                    expected_md5 = None
+                    if not self.offline:
+                        # Sólo se usa si coincide con el MD5 publicado; si no, se descarga
+                        expected_md5, _ = _remote_checksum(model_url(variant))
+                        if expected_md5 is None:
+                            raise IOError("no se pudo verificar contra el checksum publicado")
+                    if on_status is not None:
+                        on_status(f"Copiando modelo {variant}...")
+                    self._copy(source, path, expected_md5)
+                    return
+                else:
+                    if on_status is not None:
+                        on_status(f"Descargando modelo {variant}...")
+                    checksum_url = source + ".sha256" if source != model_url(variant) else None
+                    self._download(source, path, checksum_url)
+                    return
+            except Exception as e:
+                errors.append(f"{source}: {e}")
+
+        if not errors:
+            errors.append(f"no está en {', '.join(dict.fromkeys(missing))}")
+        if self.offline:
+            errors.append("el modo offline está activo")
+        raise FileNotFoundError(f"No se pudo obtener el modelo {variant} ({'; '.join(errors)})")
+
+    def _adopt(self, path):
+        """Registra un modelo que ya está en `path` pero sin registro (p. ej. copiado a mano)"""
+        sha256 = file_digest(path).hexdigest()
+        expected = _read_sha256_file(path + ".sha256")
+        if expected and sha256 != expected:
+            raise IOError("El checksum SHA-256 del modelo no coincide con su .sha256")
+        self._write_record(path, sha256)
+
+    def _copy(self, source, path, expected_md5=None):
+        part = path + ".part"
+        shutil.copyfile(source, part)
+        expected = _read_sha256_file(source + ".sha256")
+        self._finish(part, path, expected_md5=expected_md5, expected_sha256=expected)
+
+    def _download(self, url, path, checksum_url=None):
+        import requests  # sólo hace falta si hay que descargar
+
+        part = path + ".part"
+        expected_md5 = None
+        total = None
+        # Un mirror HTTP publica el SHA-256 junto al modelo, como uno en disco
+        expected_sha256 = _fetch_sha256(checksum_url) if checksum_url else None
+        for attempt in range(self.retries + 1):
+            offset = os.path.getsize(part) if os.path.exists(part) else 0
+            headers = {"Range": f"bytes={offset}-"} if offset else {}
+            try:
+                with requests.get(url, stream=True, headers=headers, timeout=(10, 60)) as response:
+                    if response.status_code == 416 and offset:
+                        # El .part ya estaba completo: pedir tamaño y checksum sin volver a bajarlo
+                        md5, size = _remote_checksum(url)
+                        if md5 or size is not None:
+                            expected_md5, total = md5 or expected_md5, size
+                            break
+                        # Sin tamaño ni checksum no hay cómo confiar en el .part: bajarlo de cero
+                        os.remove(part)
+                        continue
+                    if response.status_code not in (200, 206):
+                        raise RuntimeError(f"Error descarga: {response.status_code}")
+                    if response.status_code == 200:
+                        offset = 0  # el servidor ignoró el Range: empezar de nuevo
+                        total = int(response.headers["Content-Length"]) \
+                            if "Content-Length" in response.headers else None
+                    else:
+                        content_range = response.headers.get("Content-Range", "")
+                        total = int(content_range.rsplit("/", 1)[-1]) \
+                            if content_range.rsplit("/", 1)[-1].isdigit() else None
+                    expected_md5 = _goog_md5(response.headers) or expected_md5
+
+                    with open(part, 'ab' if offset else 'wb') as f:
+                        for chunk in response.iter_content(chunk_size=_CHUNK_SIZE):
+                            f.write(chunk)
+                            # Mantener vivo el lock durante descargas largas
+                            _touch(path + ".lock")
+                        f.flush()
+                        os.fsync(f.fileno())
+                break
+            except (requests.ConnectionError, requests.Timeout,
+                    requests.exceptions.ChunkedEncodingError):
+                if attempt == self.retries:
+                    raise
+                time.sleep(min(2 ** attempt, 30))
+        else:
+            raise IOError("No se pudo verificar la descarga reanudada")
+
+        if total is not None and os.path.getsize(part) != total:
+            size = os.path.getsize(part)
+            if size > total:
+                os.remove(part)
+            raise IOError(f"Descarga incompleta: {size} de {total} bytes")
+        self._finish(part, path, expected_md5=expected_md5, expected_sha256=expected_sha256)
+
+    def _finish(self, part, path, expected_md5=None, expected_sha256=None):
+        """Verifica el archivo temporal y lo publica de forma atómica"""
+        if expected_md5 and file_digest(part, "md5").hexdigest() != expected_md5:
+            os.remove(part)
+            raise IOError("El checksum MD5 del modelo no coincide")
+        sha256 = file_digest(part).hexdigest()
+        if expected_sha256 and sha256 != expected_sha256:
+            os.remove(part)
+            raise IOError("El checksum SHA-256 del modelo no coincide")
+
+        os.replace(part, path)
+        self._write_record(path, sha256)
+
+    # ---------- Verificación ----------
+    def _record_path(self, path):
+        return path + ".json"
+
+    def _write_record(self, path, sha256):
+        stat = os.stat(path)
+        record = {"sha256": sha256, "size": stat.st_size, "mtime": stat.st_mtime}
+        tmp = self._record_path(path) + ".tmp"
+        with open(tmp, 'w') as f:
+            json.dump(record, f)
+        os.replace(tmp, self._record_path(path))
+
+    def _verified(self, path):
+        """Existe y coincide con su SHA-256 registrado (se recalcula sólo si cambió)"""
+        if not os.path.exists(path):
+            return False
+        try:
+            with open(self._record_path(path)) as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            return False
+        stat = os.stat(path)
+        if (stat.st_size, stat.st_mtime) == (record.get("size"), record.get("mtime")):
+            return True
+        if stat.st_size == record.get("size") and file_digest(path).hexdigest() == record.get("sha256"):
+            self._write_record(path, record["sha256"])
+            return True
+        return False
+
+    # ---------- Lock entre procesos ----------
+    def _file_lock(self, path):
+        return _FileLock(path + ".lock")
+
+
+def _touch(path):
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+class _FileLock:
+    """Lock exclusivo con un archivo creado con O_EXCL; se rompe si quedó abandonado"""
+
+    def __init__(self, path, poll_s=0.2):
+        self.path = path
+        self.poll_s = poll_s
+
+    def __enter__(self):
+        while True:
+            try:
+                fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                os.write(fd, str(os.getpid()).encode())
+                os.close(fd)
+                return self
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(self.path) > _LOCK_STALE_S:
+                        os.remove(self.path)
+                        continue
+                except OSError:
+                    continue
+                time.sleep(self.poll_s)
+
+    def __exit__(self, *exc):
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+_default_store = None
+
+
+def default_store():
+    """ModelStore compartido del proceso, configurado por variables de entorno"""
+    global _default_store
+    if _default_store is None:
+        _default_store = ModelStore()
+    return _default_store
+
+
+def configure(cache_dir=None, mirror=None, offline=None):
+    """Reemplaza el almacén por defecto (p. ej. con las opciones de la línea de comandos)"""
+    global _default_store
+    _default_store = ModelStore(cache_dir, mirror, offline)
+    return _default_store
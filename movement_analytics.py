@@ -0,0 +1,439 @@
+"""Métricas de bachata sobre series de landmarks.
+
+Todo se calcula con NumPy sobre arrays completos (frames × personas × 33 × 5),
+nunca frame a frame en Python:
+
+- `moving_average`, `velocities` y `joint_angles` son las operaciones básicas
+  (suavizado por ventana, derivadas en el tiempo y ángulos articulares).
+- `MovementAnalyzer` las combina en métricas por persona: pasos (cuando el
+  tobillo se frena tras moverse), cadencia, amplitud del balanceo de cadera,
+  vueltas (rotación acumulada de los hombros), histogramas de ángulos
+  articulares y distancia entre la pareja. Con `beats_ms` además mide el
+  desfase de cada paso respecto del tiempo más cercano.
+
+`MovementAnalyzer` tiene la interfaz de `LandmarkStoreWriter` (`append`,
+`extend`, `close`): puede recibir los frames mientras se procesa el video
+(ver `analytics_path` en `process_video_file`) o un store ya guardado.
+Procesa por bloques de `chunk_frames` conservando sólo el contexto que
+necesitan las ventanas, así que la memoria no depende de la duración y el
+resultado es el mismo que analizando el video entero de una vez.
+
+Para analizar stores ya procesados:
+    python movement_analytics.py salida/*.landmarks --bpm 128 -o temporada.json
+"""
+import argparse
+import glob
+import json
+
+import numpy as np
+
+from landmark_store import LANDMARK_FIELDS, NUM_LANDMARKS, LandmarkStore
+
+LEFT_SHOULDER, RIGHT_SHOULDER = 11, 12
+LEFT_HIP, RIGHT_HIP = 23, 24
+LEFT_ANKLE, RIGHT_ANKLE = 27, 28
+
+# Ángulo en la articulación del medio de cada terna (extremo, vértice, extremo)
+JOINT_ANGLES = {
+    "left_elbow": (11, 13, 15), "right_elbow": (12, 14, 16),
+    "left_shoulder": (13, 11, 23), "right_shoulder": (14, 12, 24),
+    "left_hip": (11, 23, 25), "right_hip": (12, 24, 26),
+    "left_knee": (23, 25, 27), "right_knee": (24, 26, 28),
+}
+ANGLE_BIN_DEG = 5
+_ANGLE_TRIPLES = np.array(list(JOINT_ANGLES.values()), dtype=np.intp)
+_NUM_BINS = 180 // ANGLE_BIN_DEG
+
+
+def moving_average(values, half_window):
+    """Media móvil centrada de 2·`half_window`+1 muestras sobre el eje 0, ignorando NaN.
+
+    En los bordes se promedian las muestras disponibles.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if half_window <= 0:
+        return values
+    valid = ~np.isnan(values)
+    zeros = np.zeros((1,) + values.shape[1:])
+    sums = np.concatenate([zeros, np.cumsum(np.where(valid, values, 0.0), axis=0)])
+    counts = np.concatenate([zeros, np.cumsum(valid, axis=0)])
+    index = np.arange(len(values))
+    hi = np.minimum(index + half_window + 1, len(values))
+    lo = np.maximum(index - half_window, 0)
+    total = counts[hi] - counts[lo]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(total > 0, (sums[hi] - sums[lo]) / total, np.nan)
+
+
+def velocities(values, timestamps_ms):
+    """Derivada temporal (unidades por segundo) sobre el eje 0"""
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) < 2:
+        return np.full_like(values, np.nan)
+    return np.gradient(values, np.asarray(timestamps_ms, dtype=np.float64) / 1000.0, axis=0)
+
+
+def joint_angles(points, triples=_ANGLE_TRIPLES):
+    """Ángulos (grados) en el vértice de cada terna; `points` es (..., 33, 2) en píxeles.
+
+    Devuelve (..., ternas).
+    """
+    first = points[..., triples[:, 0], :] - points[..., triples[:, 1], :]
+    second = points[..., triples[:, 2], :] - points[..., triples[:, 1], :]
+    cross = first[..., 0] * second[..., 1] - first[..., 1] * second[..., 0]
+    dot = (first * second).sum(axis=-1)
+    return np.degrees(np.arctan2(np.abs(cross), dot))
+
+
+def beat_grid(bpm, first_beat_ms=0.0, duration_ms=0.0):
+    """Tiempos (ms) de los tiempos musicales a `bpm` desde `first_beat_ms`"""
+    period = 60000.0 / bpm
+    return first_beat_ms + period * np.arange(int(max(0.0, duration_ms - first_beat_ms) // period) + 1)
+
+
+def beat_offsets(event_times_ms, beats_ms):
+    """Desfase (ms) de cada evento respecto del tiempo más cercano; positivo = tarde"""
+    events = np.asarray(event_times_ms, dtype=np.float64)
+    beats = np.asarray(beats_ms, dtype=np.float64)
+    if not len(events) or not len(beats):
+        return np.empty(0)
+    index = np.searchsorted(beats, events)
+    before = beats[np.clip(index - 1, 0, len(beats) - 1)]
+    after = beats[np.clip(index, 0, len(beats) - 1)]
+    return np.where(np.abs(events - before) <= np.abs(events - after), events - before, events - after)
+
+
+def _count_turns(angles, reference):
+    """Vueltas completas en una serie desenrollada, con histéresis de una vuelta entera.
+
+    Devuelve (vueltas, nueva referencia). Cada búsqueda es vectorizada; el bucle
+    sólo itera una vez por vuelta encontrada.
+    """
+    turns = 0
+    position = 0
+    while position < len(angles):
+        crossed = np.flatnonzero(np.abs(angles[position:] - reference) >= 2 * np.pi)
+        if not len(crossed):
+            break
+        position += crossed[0]
+        reference += 2 * np.pi * np.sign(angles[position] - reference)
+        turns += 1
+    return turns, reference
+
+
+class MovementAnalyzer:
+    """Métricas de movimiento de un video, calculadas por bloques.
+
+    - fps: para convertir las ventanas de segundos a frames.
+    - width, height: tamaño del video; los landmarks están normalizados y los
+      ángulos necesitan la proporción real.
+    - num_people: IDs a analizar (como en los stores).
+    - smooth_s: ventana de suavizado de posiciones.
+    - sway_s: ventana que separa el balanceo de cadera del desplazamiento.
+    - step_speed: velocidad del tobillo (largos de torso por segundo) a partir
+      de la cual el pie está en el aire; el paso se marca cuando vuelve a frenarse.
+    - min_step_ms: separación mínima entre dos pasos del mismo pie.
+    """
+
+    def __init__(self, fps=30.0, width=1, height=1, num_people=1, smooth_s=0.1, sway_s=1.0,
+                 step_speed=1.5, min_step_ms=150, chunk_frames=256):
+        self.fps = fps or 30.0
+        self.scale = np.array([width or 1, height or 1], dtype=np.float64)
+        self.num_people = num_people
+        self.step_speed = step_speed
+        self.min_step_ms = min_step_ms
+        self.chunk_frames = chunk_frames
+        self._smooth_half = int(round(smooth_s * self.fps / 2))
+        self._sway_half = int(round(sway_s * self.fps / 2))
+        # Frames de contexto que necesitan las ventanas a cada lado de un bloque: la
+        # tendencia del balanceo promedia caderas ya suavizadas, así que las ventanas se suman
+        self._margin = self._smooth_half + self._sway_half + 2
+
+        self._pending = []             # bloques (timestamps, landmarks) sin concatenar
+        self._buffer_ts = np.empty(0, dtype=np.int64)
+        self._buffer = np.empty((0, num_people, NUM_LANDMARKS, len(LANDMARK_FIELDS)), dtype=np.float32)
+        self._buffer_start = 0         # índice global del primer frame del buffer
+        self._next = 0                 # índice global del primer frame sin analizar
+        self._buffered = 0
+        self._closed = False
+
+        P, K = num_people, len(JOINT_ANGLES)
+        self.frames = 0
+        self.first_ms = None
+        self.last_ms = None
+        self._visible = np.zeros(P, dtype=np.int64)
+        self._angle_hist = np.zeros((P, K, _NUM_BINS), dtype=np.int64)
+        self._angle_sum = np.zeros((P, K))
+        self._angle_count = np.zeros((P, K), dtype=np.int64)
+        self._sway_sq = np.zeros(P)
+        self._sway_count = np.zeros(P, dtype=np.int64)
+        self._sway_peak = np.zeros(P)
+        self._steps = [[] for _ in range(P)]
+        self._last_step_ms = np.full((P, 2), -np.inf)
+        self._turns = np.zeros(P, dtype=np.int64)
+        self._facing_last = np.full(P, np.nan)
+        self._facing_reference = np.full(P, np.nan)
+        self._partner = [0.0, 0, np.inf, 0.0]  # suma, cantidad, mínimo, máximo
+
+    # ---------- Entrada ----------
+    def append(self, timestamp_ms, poses):
+        """Agrega un frame; `poses` es un array (personas, 33, 5), la fila i es el ID i"""
+        row = np.full((1, self.num_people, NUM_LANDMARKS, len(LANDMARK_FIELDS)), np.nan, dtype=np.float32)
+        count = min(len(poses), self.num_people)
+        row[0, :count] = poses[:count]
+        self._add(np.array([timestamp_ms], dtype=np.int64), row)
+
+    def extend(self, timestamps, landmarks):
+        """Agrega varios frames en forma (frames, personas, 33, 5), p. ej. un store completo"""
+        for start in range(0, len(landmarks), self.chunk_frames):
+            block = np.asarray(landmarks[start:start + self.chunk_frames], dtype=np.float32)
+            rows = np.full((len(block), self.num_people) + block.shape[2:], np.nan, dtype=np.float32)
+            count = min(block.shape[1], self.num_people)
+            rows[:, :count] = block[:, :count]
+            self._add(np.asarray(timestamps[start:start + self.chunk_frames], dtype=np.int64), rows)
+
+    def close(self):
+        """Analiza los frames que quedan; después de esto `report()` está completo"""
+        if not self._closed:
+            self._process(final=True)
+            self._closed = True
+
+    def _add(self, timestamps, rows):
+        self._pending.append((timestamps, rows))
+        self._buffered += len(rows)
+        if self._buffered >= self.chunk_frames:
+            self._process(final=False)
+
+    # ---------- Análisis por bloques ----------
+    def _process(self, final):
+        if self._pending:
+            self._buffer_ts = np.concatenate([self._buffer_ts] + [ts for ts, _ in self._pending])
+            self._buffer = np.concatenate([self._buffer] + [rows for _, rows in self._pending])
+            self._pending = []
+            self._buffered = 0
+
+        begin = self._next - self._buffer_start
+        end = len(self._buffer) if final else len(self._buffer) - self._margin
+        if end > begin:
+            self._analyze(self._buffer_ts, self._buffer, begin, end)
+            self._next = self._buffer_start + end
+
+        # Conservar sólo el contexto que necesita el próximo bloque
+        keep_from = max(0, min(end, len(self._buffer)) - self._margin)
+        self._buffer_ts = self._buffer_ts[keep_from:]
+        self._buffer = self._buffer[keep_from:]
+        self._buffer_start += keep_from
+
+    def _analyze(self, timestamps, landmarks, begin, end):
+        """Acumula las métricas de los frames [begin, end) del buffer usando todo el buffer como contexto"""
+        region = slice(begin, end)
+        ts = timestamps[region]
+        self.frames += end - begin
+        self.first_ms = int(ts[0]) if self.first_ms is None else self.first_ms
+        self.last_ms = int(ts[-1])
+
+        points = landmarks[..., :2] * self.scale                        # (F, P, 33, 2) en píxeles
+        smooth = moving_average(points, self._smooth_half)
+        shoulders = (smooth[:, :, LEFT_SHOULDER] + smooth[:, :, RIGHT_SHOULDER]) / 2
+        hips = (smooth[:, :, LEFT_HIP] + smooth[:, :, RIGHT_HIP]) / 2   # (F, P, 2)
+        torso = np.linalg.norm(shoulders - hips, axis=-1)               # (F, P)
+        visible = ~np.isnan(torso[region])
+        self._visible += visible.sum(axis=0)
+
+        self._accumulate_angles(joint_angles(smooth[region]))
+        self._accumulate_sway(hips, torso, region)
+        self._accumulate_steps(smooth, torso, timestamps, begin, end)
+        self._accumulate_turns(landmarks, region)
+        if self.num_people >= 2:
+            # En largos de torso (promedio de ambos) para no depender de la distancia a la cámara
+            distance = np.linalg.norm(hips[region, 0] - hips[region, 1], axis=-1)
+            distance = distance / ((torso[region, 0] + torso[region, 1]) / 2)
+            distance = distance[~np.isnan(distance)]
+            if len(distance):
+                self._partner[0] += float(distance.sum())
+                self._partner[1] += len(distance)
+                self._partner[2] = min(self._partner[2], float(distance.min()))
+                self._partner[3] = max(self._partner[3], float(distance.max()))
+
+    def _accumulate_angles(self, angles):
+        # angles: (F, P, K); histograma de todas las personas y articulaciones con un solo bincount
+        valid = ~np.isnan(angles)
+        frames, people, joints = np.nonzero(valid)
+        bins = np.minimum((angles[valid] // ANGLE_BIN_DEG).astype(np.intp), _NUM_BINS - 1)
+        flat = (people * len(JOINT_ANGLES) + joints) * _NUM_BINS + bins
+        self._angle_hist += np.bincount(flat, minlength=self._angle_hist.size).reshape(self._angle_hist.shape)
+        self._angle_sum += np.where(valid, angles, 0.0).sum(axis=0)
+        self._angle_count += valid.sum(axis=0)
+
+    def _accumulate_sway(self, hips, torso, region):
+        # Balanceo: posición lateral de la cadera menos su tendencia en una ventana larga
+        trend = moving_average(hips[..., 0], self._sway_half)
+        sway = ((hips[..., 0] - trend) / torso)[region]                 # (F, P) en largos de torso
+        valid = ~np.isnan(sway)
+        self._sway_sq += np.where(valid, sway ** 2, 0.0).sum(axis=0)
+        self._sway_count += valid.sum(axis=0)
+        peak = np.where(valid, np.abs(sway), 0.0).max(axis=0) if len(sway) else 0.0
+        self._sway_peak = np.maximum(self._sway_peak, peak)
+
+    def _accumulate_steps(self, smooth, torso, timestamps, begin, end):
+        ankles = smooth[:, :, [LEFT_ANKLE, RIGHT_ANKLE]]                # (F, P, 2, 2)
+        speed = np.linalg.norm(velocities(ankles, timestamps), axis=-1) / torso[..., np.newaxis]
+        moving = speed > self.step_speed
+        # El pie se frena: en movimiento en el frame anterior y quieto (y visible) en este
+        first = max(begin, 1)
+        landed = moving[first - 1:end - 1] & ~moving[first:end] & ~np.isnan(speed[first:end])
+        frames, people, feet = np.nonzero(landed)
+        for frame, person, foot in zip(frames + first, people, feet):
+            time_ms = float(timestamps[frame])
+            if time_ms - self._last_step_ms[person, foot] >= self.min_step_ms:
+                self._last_step_ms[person, foot] = time_ms
+                self._steps[person].append(time_ms)
+
+    def _accumulate_turns(self, landmarks, region):
+        # Orientación de los hombros en el plano horizontal (x, z), suavizada como seno y coseno
+        across = landmarks[:, :, RIGHT_SHOULDER, [0, 2]] - landmarks[:, :, LEFT_SHOULDER, [0, 2]]
+        facing = np.arctan2(across[..., 1], across[..., 0])
+        cos = moving_average(np.cos(facing), self._smooth_half)[region]
+        sin = moving_average(np.sin(facing), self._smooth_half)[region]
+        facing = np.arctan2(sin, cos)                                   # (F, P)
+        for person in range(self.num_people):
+            angles = facing[:, person]
+            angles = angles[~np.isnan(angles)]
+            if not len(angles):
+                continue
+            last = self._facing_last[person]
+            angles = np.unwrap(np.concatenate([[last], angles]))[1:] if not np.isnan(last) else np.unwrap(angles)
+            if np.isnan(self._facing_reference[person]):
+                self._facing_reference[person] = angles[0]
+            turns, self._facing_reference[person] = _count_turns(angles, self._facing_reference[person])
+            self._turns[person] += turns
+            self._facing_last[person] = angles[-1]
+
+    # ---------- Resultado ----------
+    def report(self, beats_ms=None, beat_tolerance_ms=80.0):
+        """Métricas acumuladas hasta ahora (todas si ya se llamó a `close()`).
+
+        Con `beats_ms` (p. ej. de `beat_grid`) cada persona incluye el desfase
+        de sus pasos respecto del tiempo más cercano.
+        """
+        duration_s = (self.last_ms - self.first_ms) / 1000.0 if self.frames > 1 else 0.0
+        people = []
+        for person in range(self.num_people):
+            if not self._visible[person]:
+                continue
+            steps = np.sort(np.array(self._steps[person]))
+            with np.errstate(invalid="ignore", divide="ignore"):
+                means = self._angle_sum[person] / self._angle_count[person]
+            row = {
+                "person": person,
+                "visible_frames": int(self._visible[person]),
+                "steps": len(steps),
+                "cadence_steps_per_min": len(steps) / duration_s * 60 if duration_s else 0.0,
+                "step_times_ms": steps.tolist(),
+                "hip_sway_rms": float(np.sqrt(self._sway_sq[person] / self._sway_count[person]))
+                if self._sway_count[person] else None,
+                "hip_sway_peak": float(self._sway_peak[person]),
+                "turns": int(self._turns[person]),
+                "joint_angles": {
+                    name: {"mean_deg": None if np.isnan(means[k]) else float(means[k]),
+                           "histogram": self._angle_hist[person, k].tolist()}
+                    for k, name in enumerate(JOINT_ANGLES)
+                },
+            }
+            if beats_ms is not None:
+                offsets = beat_offsets(steps, beats_ms)
+                row["beat"] = {
+                    "mean_offset_ms": float(offsets.mean()) if len(offsets) else None,
+                    "mean_abs_offset_ms": float(np.abs(offsets).mean()) if len(offsets) else None,
+                    "on_beat_ratio": float((np.abs(offsets) <= beat_tolerance_ms).mean()) if len(offsets) else None,
+                }
+            people.append(row)
+
+        partner = None
+        if self._partner[1]:
+            total, count, low, high = self._partner
+            partner = {"mean": total / count, "min": low, "max": high, "frames": count}
+        return {"frames": self.frames, "duration_s": duration_s, "angle_bin_deg": ANGLE_BIN_DEG,
+                "people": people, "partner_distance": partner}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class AnalyticsOptions:
+    """Métricas que se calculan al procesar un video.
+
+    - bpm, first_beat_ms: tempo de la música y momento del primer tiempo, para
+      medir los pasos contra el tiempo (sin bpm no se mide).
+    - step_speed: ver `MovementAnalyzer`.
+    """
+
+    def __init__(self, bpm=None, first_beat_ms=0.0, step_speed=1.5):
+        self.bpm = bpm
+        self.first_beat_ms = first_beat_ms
+        self.step_speed = step_speed
+
+    def analyzer(self, fps, width, height, num_people=1):
+        return MovementAnalyzer(fps, width, height, num_people, step_speed=self.step_speed)
+
+    def beats(self, duration_ms):
+        return beat_grid(self.bpm, self.first_beat_ms, duration_ms) if self.bpm else None
+
+
+def write_report(analyzer, path, options=None):
+    """Guarda en JSON el reporte de un analizador ya cerrado"""
+    options = options or AnalyticsOptions()
+    report = analyzer.report(options.beats(analyzer.last_ms or 0))
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+    return report
+
+
+def analyze_store(store, beats_ms=None, **options):
+    """Analiza un LandmarkStore completo (por bloques, sin cargarlo en memoria)"""
+    analyzer = MovementAnalyzer(store.fps, store.meta.get("width"), store.meta.get("height"),
+                                store.num_people, **options)
+    with analyzer:
+        analyzer.extend(store.timestamps_ms, store.landmarks)
+    return analyzer.report(beats_ms)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Métricas de movimiento de stores de landmarks")
+    parser.add_argument("stores", nargs="+", help="Stores de landmarks (<video>.landmarks) o patrones glob")
+    parser.add_argument("--bpm", type=float, help="Tempo de la música, para medir los pasos contra el tiempo")
+    parser.add_argument("--first-beat-ms", type=float, default=0.0, help="Momento del primer tiempo (ms)")
+    parser.add_argument("--step-speed", type=float, default=1.5,
+                        help="Velocidad del tobillo (largos de torso/s) que cuenta como pie en el aire")
+    parser.add_argument("-o", "--output", help="Guardar todas las métricas en este JSON")
+    args = parser.parse_args(argv)
+
+    options = AnalyticsOptions(args.bpm, args.first_beat_ms, args.step_speed)
+    paths = [match for pattern in args.stores for match in (sorted(glob.glob(pattern)) or [pattern])]
+    results = {}
+    for path in paths:
+        store = LandmarkStore(path)
+        beats = options.beats(float(store.timestamps_ms[-1]) if len(store) else 0.0)
+        report = analyze_store(store, beats, step_speed=args.step_speed)
+        results[path] = report
+        for person in report["people"]:
+            line = (f"{path} #{person['person']}: {person['steps']} pasos "
+                    f"({person['cadence_steps_per_min']:.0f}/min) | {person['turns']} vueltas | "
+                    f"cadera {person['hip_sway_rms'] or 0:.2f} torsos")
+            if "beat" in person and person["beat"]["mean_abs_offset_ms"] is not None:
+                line += f" | a tiempo {person['beat']['on_beat_ratio']:.0%} (±{person['beat']['mean_abs_offset_ms']:.0f} ms)"
+            print(line)
+        if report["partner_distance"]:
+            print(f"{path}: distancia media de la pareja {report['partner_distance']['mean']:.2f} torsos")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Métricas: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Tiempos por etapa del pipeline.
+
+`PipelineStats` se pasa a `VideoPipeline` (o a `build_pipeline`) y registra
+cuánto tarda cada etapa con cada frame: decodificación, conversión de color,
+inferencia, dibujo, codificación y vista previa (más el dibujo en la ventana
+de Tk, `render`, si la interfaz lo mide). En vivo (live_stream.py) se agrega
+`latency`: desde la captura del frame hasta que se publica en pantalla.
+Registrar una muestra es agregar un float a un array bajo un lock, así que el
+costo por frame es despreciable frente a cualquiera de las etapas.
+
+Además del resumen final (`summary`) ofrece valores móviles para mostrar en
+vivo (`rolling`) y, con `trace=True`, guarda cada ejecución como evento para
+exportarla en formato Chrome trace (chrome://tracing o https://ui.perfetto.dev).
+"""
+import json
+import os
+import threading
+import time
+from array import array
+from collections import deque
+
+import numpy as np
+
+# Etapas en el orden en que las atraviesa un frame
+STAGES = ("decode", "convert", "inference", "draw", "encode", "preview", "render", "latency")
+
+
+class PipelineStats:
+    """Duraciones por etapa (segundos) y frames terminados.
+
+    - window: cantidad de muestras recientes para los valores móviles.
+    - trace: guardar cada ejecución (hasta `max_events`) para `write_chrome_trace`.
+    """
+
+    def __init__(self, window=60, trace=False, max_events=1_000_000):
+        self._lock = threading.Lock()
+        self.samples = {stage: array('d') for stage in STAGES}
+        self._recent = {stage: deque(maxlen=window) for stage in STAGES}
+        self._frame_times = deque(maxlen=window)
+        self.frames = 0
+        self.started = None
+        self.finished = None
+
+        self.trace = trace
+        self.max_events = max_events
+        self.events = []
+        self.dropped_events = 0
+        self._thread_names = {}
+
+    def start(self):
+        self.started = time.perf_counter()
+
+    def stop(self):
+        self.finished = time.perf_counter()
+
+    def record(self, stage, start, end):
+        """Registra una ejecución de `stage` entre dos lecturas de `time.perf_counter()`"""
+        duration = end - start
+        with self._lock:
+            self.samples[stage].append(duration)
+            self._recent[stage].append(duration)
+            if self.trace:
+                if len(self.events) < self.max_events:
+                    thread = threading.current_thread()
+                    self._thread_names.setdefault(thread.ident, thread.name)
+                    self.events.append((stage, start, duration, thread.ident))
+                else:
+                    self.dropped_events += 1
+
+    def frame_done(self):
+        with self._lock:
+            self.frames += 1
+            self._frame_times.append(time.perf_counter())
+
+    @property
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.perf_counter()) - self.started
+
+    @property
+    def fps(self):
+        """Frames por segundo de punta a punta"""
+        return self.frames / self.elapsed if self.elapsed else 0.0
+
+    def rolling(self):
+        """(fps, {etapa: ms medios}) sobre las últimas muestras"""
+        with self._lock:
+            times = list(self._frame_times)
+            recent = {stage: sum(values) / len(values) * 1000
+                      for stage, values in self._recent.items() if values}
+        fps = (len(times) - 1) / (times[-1] - times[0]) if len(times) > 1 and times[-1] > times[0] else 0.0
+        return fps, recent
+
+    def summary(self, percentiles=(50, 95, 99)):
+        """{etapa: {"count", "mean_ms", "p50_ms", ...}} para las etapas con muestras"""
+        result = {}
+        with self._lock:
+            samples = {stage: np.array(values) * 1000 for stage, values in self.samples.items() if values}
+        for stage, values in samples.items():
+            row = {"count": len(values), "mean_ms": float(values.mean())}
+            for p in percentiles:
+                row[f"p{p}_ms"] = float(np.percentile(values, p))
+            result[stage] = row
+        return result
+
+    def write_chrome_trace(self, path):
+        """Guarda los eventos en formato Chrome trace (JSON) con un carril por hilo"""
+        pid = os.getpid()
+        origin = self.started if self.started is not None else 0.0
+        with self._lock:
+            events = list(self.events)
+            names = dict(self._thread_names)
+
+        trace_events = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+                        for tid, name in names.items()]
+        trace_events += [{"name": stage, "cat": "pipeline", "ph": "X", "pid": pid, "tid": tid,
+                          "ts": round((start - origin) * 1e6, 1), "dur": round(duration * 1e6, 1)}
+                         for stage, start, duration, tid in events]
+        trace = {
+            "traceEvents": trace_events,
+            "displayTimeUnit": "ms",
+            "otherData": {"frames": self.frames, "fps": self.fps, "dropped_events": self.dropped_events,
+                          "summary": self.summary()},
+        }
+        with open(path, 'w') as f:
+            json.dump(trace, f)
+
+
+def format_stats(fps, stage_ms):
+    """Texto compacto para la interfaz o la consola: '24.8 fps | inference 31.2 ms | ...'"""
+    parts = [f"{fps:.1f} fps"]
+    parts += [f"{stage} {stage_ms[stage]:.1f} ms" for stage in STAGES if stage in stage_ms]
+    return " | ".join(parts)
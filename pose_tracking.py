@@ -0,0 +1,86 @@
+"""IDs estables para varios bailarines.
+
+Con `num_poses` > 1 el PoseLandmarker devuelve las personas en cualquier orden,
+así que la guía y la seguidora pueden intercambiarse de un frame a otro.
+`PoseTracker` asigna cada detección a un lugar fijo (0, 1, ...) comparándola
+con el último esqueleto visto en cada lugar: la distancia es la media de los
+desplazamientos de las articulaciones del cuerpo, calculada para todas las
+parejas a la vez con NumPy, y la asignación es voraz de menor a mayor costo.
+Con pocas personas el costo por frame es prácticamente lineal.
+
+La fila i del array devuelto es siempre la persona con ID i (NaN si no se la
+vio en este frame); así el dibujo, la interpolación y los stores conservan los IDs.
+"""
+import numpy as np
+
+from landmark_store import LANDMARK_FIELDS, NUM_LANDMARKS
+
+# Articulaciones del cuerpo (sin la cara) para comparar esqueletos
+_BODY = slice(11, None)
+
+
+class PoseTracker:
+    """Asociación de detecciones entre frames.
+
+    - num_people: cantidad de IDs (lo mismo que `num_poses` del landmarker).
+    - max_distance: desplazamiento medio máximo (coordenadas normalizadas)
+      para considerar que una detección es la misma persona.
+    - max_missed: frames que se reserva el ID de alguien que no se ve
+      (p. ej. tapado por su pareja en una vuelta).
+    """
+
+    def __init__(self, num_people=2, max_distance=0.2, max_missed=15):
+        self.num_people = num_people
+        self.max_distance = max_distance
+        self.max_missed = max_missed
+        self._last = np.full((num_people, NUM_LANDMARKS, len(LANDMARK_FIELDS)), np.nan, dtype=np.float32)
+        self._missed = np.full(num_people, np.inf)
+
+    def settings(self):
+        """Ajustes que cambian los landmarks resultantes (para la clave de caché)"""
+        return {"num_poses": self.num_people, "track_max_distance": self.max_distance,
+                "track_max_missed": self.max_missed}
+
+    def update(self, poses):
+        """Ordena las detecciones de un frame por ID.
+
+        Devuelve un array (ids, 33, 5) hasta el mayor ID visto en el frame;
+        vacío si no hay nadie.
+        """
+        detections = poses[:self.num_people]
+        slot_for = np.full(len(detections), -1)
+
+        active = np.flatnonzero(self._missed <= self.max_missed)
+        if len(active) and len(detections):
+            # Costo (ids activos × detecciones) en una sola operación
+            delta = self._last[active, np.newaxis, _BODY, :2] - detections[np.newaxis, :, _BODY, :2]
+            cost = np.linalg.norm(delta, axis=-1).mean(axis=-1)
+            taken = set()
+            for flat in np.argsort(cost, axis=None):
+                row, det = divmod(int(flat), len(detections))
+                if cost[row, det] > self.max_distance:
+                    break
+                if slot_for[det] < 0 and row not in taken:
+                    slot_for[det] = active[row]
+                    taken.add(row)
+
+        # Personas nuevas, de izquierda a derecha, al ID libre (o el menos reciente)
+        unmatched = [det for det in np.argsort(detections[:, _BODY, 0].mean(axis=1)) if slot_for[det] < 0]
+        if unmatched:
+            used = set(slot_for[slot_for >= 0].tolist())
+            free = sorted((slot for slot in range(self.num_people) if slot not in used),
+                          key=lambda slot: (-self._missed[slot], slot))
+            for det, slot in zip(unmatched, free):
+                slot_for[det] = slot
+
+        self._missed += 1
+        tracked = np.full_like(self._last, np.nan)
+        for det, slot in enumerate(slot_for):
+            if slot < 0:
+                continue
+            tracked[slot] = detections[det]
+            self._last[slot] = detections[det]
+            self._missed[slot] = 0
+
+        present = np.flatnonzero(self._missed == 0)
+        return tracked[:present[-1] + 1] if len(present) else tracked[:0]
@@ -0,0 +1,110 @@
+"""Vista previa desacoplada del procesamiento.
+
+El hilo de procesamiento sólo publica el último frame en un `LatestFrameSlot`
+(una operación O(1) que nunca bloquea). El bucle de Tk lo recoge con `after()`
+a una tasa máxima y reutiliza el mismo item del canvas y el mismo PhotoImage;
+los frames que llegan mientras Tk está ocupado simplemente se reemplazan.
+"""
+import threading
+import time
+import tkinter as tk
+
+import cv2
+from PIL import Image, ImageTk
+
+
+class LatestFrameSlot:
+    """Buffer de un solo lugar: guarda el frame más reciente y descarta el anterior"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._frame = None
+        self._fresh = False
+        self.published = 0
+        self.dropped = 0
+
+    def publish(self, frame):
+        with self._lock:
+            if self._fresh:
+                self.dropped += 1
+            self._frame = frame
+            self._fresh = True
+            self.published += 1
+
+    def take(self):
+        """Devuelve el frame si hay uno nuevo desde la última llamada, o None"""
+        with self._lock:
+            if not self._fresh:
+                return None
+            self._fresh = False
+            return self._frame
+
+
+class CanvasPreview:
+    """Muestra en un canvas de Tk los frames publicados en un `LatestFrameSlot`.
+
+    Debe usarse sólo desde el hilo de Tk. `on_frame()` se llama tras cada
+    frame mostrado, por ejemplo para actualizar la barra de progreso. Si se
+    asigna `stats` (PipelineStats), cada frame dibujado se registra como `render`.
+    """
+
+    def __init__(self, root, canvas, slot, max_fps=30, on_frame=None):
+        self.root = root
+        self.canvas = canvas
+        self.slot = slot
+        self.interval_ms = max(1, int(1000 / max_fps))
+        self.on_frame = on_frame
+        self.stats = None
+        self._photo = None
+        self._image_item = None
+
+    def start(self):
+        self.root.after(self.interval_ms, self._tick)
+
+    def _tick(self):
+        try:
+            frame = self.slot.take()
+            if frame is not None:
+                start = time.perf_counter()
+                self.show(frame)
+                if self.stats is not None:
+                    self.stats.record("render", start, time.perf_counter())
+                if self.on_frame is not None:
+                    self.on_frame()
+        finally:
+            # Un error en un frame no debe detener la vista previa (Tk lo informa igual)
+            self.root.after(self.interval_ms, self._tick)
+
+    def show(self, frame):
+        """Dibuja un frame BGR escalado al canvas manteniendo la relación de aspecto"""
+        # Dimensiones del canvas
+        canvas_width = self.canvas.winfo_width()
+        canvas_height = self.canvas.winfo_height()
+        if canvas_width <= 1 or canvas_height <= 1:
+            return
+
+        # Calcular escala para mantener relación de aspecto
+        frame_height, frame_width = frame.shape[:2]
+        scale = min(canvas_width / frame_width, canvas_height / frame_height)
+        new_width = max(1, int(frame_width * scale))
+        new_height = max(1, int(frame_height * scale))
+
+        # Redimensionar antes de convertir a RGB: la conversión trabaja sobre menos píxeles
+        frame_resized = cv2.resize(frame, (new_width, new_height))
+        image = Image.fromarray(cv2.cvtColor(frame_resized, cv2.COLOR_BGR2RGB))
+
+        if self._photo is not None and (self._photo.width(), self._photo.height()) == (new_width, new_height):
+            self._photo.paste(image)
+        else:
+            self._photo = ImageTk.PhotoImage(image=image)
+
+        # Posición centrada
+        x_pos = (canvas_width - new_width) // 2
+        y_pos = (canvas_height - new_height) // 2
+
+        if self._image_item is None:
+            self.canvas.delete("all")
+            self._image_item = self.canvas.create_image(x_pos, y_pos, image=self._photo, anchor=tk.NW)
+        else:
+            self.canvas.itemconfig(self._image_item, image=self._photo)
+            self.canvas.coords(self._image_item, x_pos, y_pos)
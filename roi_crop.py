@@ -0,0 +1,98 @@
+"""Inferencia sobre un recorte alrededor de los bailarines.
+
+En una toma abierta del escenario, la pareja ocupa una parte chica del frame.
+Una vez que hay landmarks, `RoiCropper` recorta una caja con margen alrededor
+de ellos y sólo esa región se convierte a RGB y se manda al PoseLandmarker
+(reducida a `inference_max_side` como cualquier imagen de inferencia, ver
+build_pipeline). Los resultados se devuelven a coordenadas del frame completo.
+
+La caja se mantiene fija mientras el esqueleto quede dentro de su zona interior,
+así el recorte no salta de un frame a otro y el tracking del landmarker no se
+desengancha. Si se pierde a la persona, o cada `refresh_every` inferencias
+(para descubrir a alguien que entra a cuadro), se vuelve al frame completo.
+"""
+import cv2
+import numpy as np
+
+
+class RoiCropper:
+    """Recorte adaptativo para la etapa de inferencia.
+
+    - padding: margen alrededor de la caja de los landmarks, relativo a su tamaño.
+    - min_size: tamaño mínimo del recorte en píxeles.
+    - refresh_every: cada cuántas inferencias usar el frame completo (0 = nunca).
+    """
+
+    def __init__(self, padding=0.3, min_size=160, refresh_every=90):
+        self.padding = padding
+        self.min_size = min_size
+        self.refresh_every = refresh_every
+        self.roi = None
+        self._since_full = 0
+
+    def settings(self):
+        """Ajustes que cambian los landmarks resultantes (para la clave de caché)"""
+        return {"roi_padding": self.padding, "roi_min_size": self.min_size,
+                "roi_refresh_every": self.refresh_every}
+
+    def prepare(self, frame):
+        """Recorta y convierte a RGB el frame BGR.
+
+        Devuelve (image_rgb, transform), donde transform = (x0, y0, ancho, alto)
+        de la región usada en píxeles del frame completo.
+        """
+        h, w = frame.shape[:2]
+        full = self.roi is None or (self.refresh_every and self._since_full >= self.refresh_every)
+        if full:
+            x0, y0, x1, y1 = 0, 0, w, h
+            self._since_full = 0
+        else:
+            x0, y0, x1, y1 = self.roi
+            self._since_full += 1
+
+        crop = frame[y0:y1, x0:x1]
+        crop_h, crop_w = crop.shape[:2]
+
+        # cvtColor devuelve un array contiguo, como necesita mp.Image
+        return cv2.cvtColor(crop, cv2.COLOR_BGR2RGB), (x0, y0, crop_w, crop_h)
+
+    @staticmethod
+    def map_back(poses, transform, frame_width, frame_height):
+        """Pasa landmarks normalizados al recorte a coordenadas normalizadas del frame"""
+        x0, y0, crop_w, crop_h = transform
+        if not len(poses) or (x0, y0, crop_w, crop_h) == (0, 0, frame_width, frame_height):
+            return poses
+        mapped = poses.copy()
+        mapped[..., 0] = (poses[..., 0] * crop_w + x0) / frame_width
+        mapped[..., 1] = (poses[..., 1] * crop_h + y0) / frame_height
+        # z usa la misma escala que x
+        mapped[..., 2] = poses[..., 2] * crop_w / frame_width
+        return mapped
+
+    def update(self, poses, frame_width, frame_height):
+        """Ajusta la caja según los landmarks (en coordenadas del frame completo)"""
+        xs = poses[..., 0].ravel() * frame_width
+        ys = poses[..., 1].ravel() * frame_height
+        xs, ys = xs[~np.isnan(xs)], ys[~np.isnan(ys)]
+        if not len(xs):
+            self.roi = None
+            return
+
+        bx0, bx1 = float(np.min(xs)), float(np.max(xs))
+        by0, by1 = float(np.min(ys)), float(np.max(ys))
+
+        if self.roi is not None:
+            # Mantener la caja si el esqueleto sigue dentro de su zona interior
+            x0, y0, x1, y1 = self.roi
+            mx = (x1 - x0) * self.padding / (1 + 2 * self.padding) / 2
+            my = (y1 - y0) * self.padding / (1 + 2 * self.padding) / 2
+            if bx0 >= x0 + mx and bx1 <= x1 - mx and by0 >= y0 + my and by1 <= y1 - my:
+                return
+
+        pad_x = max((bx1 - bx0) * self.padding, (self.min_size - (bx1 - bx0)) / 2, 0)
+        pad_y = max((by1 - by0) * self.padding, (self.min_size - (by1 - by0)) / 2, 0)
+        x0 = max(0, int(bx0 - pad_x))
+        y0 = max(0, int(by0 - pad_y))
+        x1 = min(frame_width, int(np.ceil(bx1 + pad_x)))
+        y1 = min(frame_height, int(np.ceil(by1 + pad_y)))
+        self.roi = (x0, y0, x1, y1) if x1 - x0 > 1 and y1 - y0 > 1 else None
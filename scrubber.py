@@ -0,0 +1,264 @@
+"""Navegación por el video sin procesarlo entero.
+
+`FrameSeeker` lee cualquier frame de un archivo: con el índice de keyframes
+(calculado una vez por archivo con ffprobe) salta al keyframe anterior y
+decodifica hacia adelante sólo lo necesario, y si el frame pedido está poco
+más adelante que la posición actual sigue leyendo sin volver a buscar.
+
+`Scrubber` dibuja el esqueleto sobre el frame pedido con landmarks de la
+caché (o de un store) si los hay, o infiriendo sólo ese frame con un
+PoseLandmarker en modo IMAGE. Trabaja en su propio hilo, siempre sobre el
+último frame pedido (los pedidos intermedios se descartan), y mientras no hay
+pedidos nuevos prepara los frames vecinos en una caché LRU para que ir y
+volver alrededor del cursor sea instantáneo.
+"""
+import os
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
+
+import cv2
+
+from skeleton_core import SkeletonRenderer, load_mediapipe, open_video, person_colors, poses_to_array
+from video_segments import find_keyframes
+
+# Sin índice de keyframes: hasta cuántos frames avanzar leyendo antes de hacer un seek
+_MAX_FORWARD_FRAMES = 30
+
+# Índices de keyframes ya calculados: ruta -> (tamaño, mtime, keyframes)
+_keyframe_index = {}
+_keyframe_lock = threading.Lock()
+
+
+def _keyframe_key(video_path):
+    stat = os.stat(video_path)
+    return os.path.abspath(video_path), stat.st_size, stat.st_mtime_ns
+
+
+def known_keyframes(video_path):
+    """Keyframes ya indexados de `video_path`, o None si cambió o nunca se indexó"""
+    path, size, mtime_ns = _keyframe_key(video_path)
+    with _keyframe_lock:
+        known = _keyframe_index.get(path)
+    if known and known[:2] == (size, mtime_ns):
+        return known[2]
+    return None
+
+
+def index_keyframes(video_path, fps):
+    """Keyframes de `video_path`, memorizados por (ruta, tamaño, mtime)"""
+    keyframes = known_keyframes(video_path)
+    if keyframes is None:
+        path, size, mtime_ns = _keyframe_key(video_path)
+        keyframes = find_keyframes(video_path, fps) or []
+        with _keyframe_lock:
+            _keyframe_index[path] = (size, mtime_ns, keyframes)
+    return keyframes
+
+
+class FrameSeeker:
+    """Acceso aleatorio a los frames de un video (usar desde un solo hilo)"""
+
+    def __init__(self, video_path, keyframes=None):
+        self.cap, self.total_frames, self.fps, self.width, self.height = open_video(video_path)
+        self.keyframes = keyframes or None
+        self._next = 0  # índice del frame que devolvería `cap.read()`
+
+    def read(self, index):
+        """Frame BGR `index`, o None si está fuera del video"""
+        if not 0 <= index < self.total_frames:
+            return None
+        if not self._can_read_forward(index):
+            self._seek(index)
+        while self._next < index:
+            if not self.cap.grab():
+                return None
+            self._next += 1
+        ret, frame = self.cap.read()
+        self._next += 1
+        return frame if ret else None
+
+    def _can_read_forward(self, index):
+        if index < self._next:
+            return False
+        keyframes = self.keyframes
+        if keyframes:
+            # Conviene seguir leyendo si no hay un keyframe entre la posición actual y el objetivo
+            return keyframes[max(0, bisect_right(keyframes, index) - 1)] <= self._next
+        return index - self._next <= _MAX_FORWARD_FRAMES
+
+    def _seek(self, index):
+        keyframes = self.keyframes
+        target = keyframes[max(0, bisect_right(keyframes, index) - 1)] if keyframes else index
+        self.cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+        self._next = target
+
+    def close(self):
+        self.cap.release()
+
+
+class FrameCache:
+    """LRU de frames acotada por bytes"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._frames = OrderedDict()
+        self._bytes = 0
+
+    def get(self, index):
+        frame = self._frames.get(index)
+        if frame is not None:
+            self._frames.move_to_end(index)
+        return frame
+
+    def put(self, index, frame, keep=None):
+        """Guarda `frame`; al liberar espacio nunca descarta `index` ni `keep`"""
+        if index in self._frames:
+            return
+        self._frames[index] = frame
+        self._bytes += frame.nbytes
+        while self._bytes > self.max_bytes:
+            victim = next((i for i in self._frames if i not in (index, keep)), None)
+            if victim is None:
+                break
+            self._bytes -= self._frames.pop(victim).nbytes
+
+    def __contains__(self, index):
+        return index in self._frames
+
+    def clear(self):
+        self._frames.clear()
+        self._bytes = 0
+
+
+class Scrubber:
+    """Frames anotados a pedido para una línea de tiempo.
+
+    - on_frame(index, frame_bgr): se llama desde el hilo del scrubber con cada
+      frame pedido (no con los precargados).
+    - landmarks: store con los landmarks del video (p. ej. de la caché), o None.
+    - make_landmarker(): crea un PoseLandmarker en modo IMAGE para los frames
+      sin landmarks guardados; None = mostrar sólo el video.
+    - prefetch: cuántos frames vecinos preparar hacia adelante (y la mitad hacia
+      atrás), sin pasar de los que entran en `cache_bytes` junto al frame en pantalla.
+    """
+
+    def __init__(self, video_path, color, on_frame, landmarks=None, make_landmarker=None,
+                 cache_bytes=256 * 1024 ** 2, prefetch=8):
+        self.video_path = video_path
+        self.on_frame = on_frame
+        self.make_landmarker = make_landmarker
+        self.prefetch = prefetch
+        self.renderer = SkeletonRenderer(person_colors(color))
+        self.seeker = FrameSeeker(video_path, known_keyframes(video_path))
+        self.total_frames = self.seeker.total_frames
+        self.fps = self.seeker.fps
+
+        self._landmarks = landmarks
+        self._landmarker = None
+        self._cache = FrameCache(cache_bytes)
+        self._unreadable = set()
+        self._generation = 0  # cambia con los landmarks; descarta frames dibujados con los anteriores
+        self._target = None
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="scrubber", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        if self.seeker.keyframes is None:
+            threading.Thread(target=self._index_keyframes, name="scrubber-keyframes", daemon=True).start()
+        return self
+
+    def request(self, index):
+        """Pide mostrar el frame `index` (desde cualquier hilo, no bloquea)"""
+        with self._cond:
+            self._target = max(0, min(int(index), self.total_frames - 1))
+            self._cond.notify()
+
+    def set_landmarks(self, landmarks):
+        """Usa `landmarks` (un store) de ahora en adelante y vuelve a dibujar"""
+        with self._cond:
+            self._landmarks = landmarks
+            self._generation += 1
+            self._cache.clear()
+            self._cond.notify()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+
+    # ---------- Hilo de trabajo ----------
+    def _index_keyframes(self):
+        keyframes = index_keyframes(self.video_path, self.fps)
+        if keyframes:
+            self.seeker.keyframes = keyframes
+
+    def _run(self):
+        shown = shown_generation = None
+        pending = []  # vecinos de `shown` que faltan preparar (una sola pasada por frame pedido)
+        try:
+            while True:
+                with self._cond:
+                    while not self._closed and (self._target is None or (
+                            self._target == shown and self._generation == shown_generation and not pending)):
+                        self._cond.wait()
+                    if self._closed:
+                        return
+                    target, generation = self._target, self._generation
+                    stale = target != shown or generation != shown_generation
+
+                if stale:
+                    frame = self._render(target, keep=target)
+                    shown, shown_generation = target, generation
+                    pending = self._neighbours(target, frame.nbytes) if frame is not None else []
+                    if frame is not None:
+                        self.on_frame(target, frame)
+                    continue
+
+                # Sin pedidos nuevos: preparar un vecino por vuelta
+                self._render(pending.pop(0), keep=shown)
+        finally:
+            self.seeker.close()
+            if self._landmarker is not None:
+                self._landmarker.close()
+
+    def _neighbours(self, index, frame_bytes):
+        # Sólo los que entran en la caché junto al frame en pantalla, o se desalojarían entre sí
+        room = max(0, self._cache.max_bytes // max(1, frame_bytes) - 1)
+        num_behind = min(self.prefetch // 2, room // 3)
+        num_ahead = min(self.prefetch, room - num_behind)
+        ahead = range(index + 1, min(self.total_frames, index + 1 + num_ahead))
+        behind = range(index - 1, max(-1, index - 1 - num_behind), -1)
+        return list(ahead) + list(behind)
+
+    def _render(self, index, keep=None):
+        with self._cond:
+            frame = self._cache.get(index)
+        if frame is not None or index in self._unreadable:
+            return frame
+        frame = self.seeker.read(index)
+        if frame is None:
+            self._unreadable.add(index)
+            return None
+        with self._cond:
+            landmarks, generation = self._landmarks, self._generation
+        poses = self._poses(index, frame, landmarks)
+        if poses is not None:
+            self.renderer.draw(frame, poses)
+        with self._cond:
+            if generation == self._generation:
+                self._cache.put(index, frame, keep)
+        return frame
+
+    def _poses(self, index, frame, landmarks):
+        if landmarks is not None and index < len(landmarks):
+            return landmarks[index]
+        if self.make_landmarker is None:
+            return None
+        if self._landmarker is None:
+            self._landmarker = self.make_landmarker()
+        mp = load_mediapipe()[0]
+        image = mp.Image(image_format=mp.ImageFormat.SRGB, data=cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        return poses_to_array(self._landmarker.detect(image).pose_landmarks)
@@ -0,0 +1,389 @@
+"""Lógica de detección y dibujo compartida entre la GUI y la línea de comandos.
+
+No depende de Tkinter, así que puede usarse en servidores sin pantalla.
+MediaPipe se importa recién cuando hace falta (`load_mediapipe`): tarda casi
+un segundo y no se necesita para abrir la interfaz ni para leer landmarks en caché.
+"""
+import os
+
+import cv2
+import numpy as np
+
+from frame_skipping import FrameSkipper
+from landmark_export import open_exporter
+from landmark_smoothing import OneEuroSmoother
+from landmark_store import LANDMARK_FIELDS, NUM_LANDMARKS, LandmarkStoreWriter
+from model_store import DEFAULT_MODEL_VARIANT, MODEL_VARIANTS, default_store
+from movement_analytics import AnalyticsOptions, write_report
+from pose_tracking import PoseTracker
+from roi_crop import RoiCropper
+from video_output import open_video_output, overlay_canvas, release_video_output
+from video_pipeline import VideoPipeline
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv")
+
+# Conexiones del cuerpo (simplificado para bachata)
+POSE_CONNECTIONS = frozenset([
+    (11, 12), (11, 13), (13, 15), (12, 14), (14, 16), (11, 23), (12, 24),
+    (23, 24), (23, 25), (24, 26), (25, 27), (26, 28), (27, 29), (28, 30),
+    (29, 31), (30, 32), (27, 31), (28, 32)
+])
+
+SKELETON_COLORS = {
+    'default': (0, 255, 0),  # BGR: Verde
+    'azul': (255, 0, 0),     # BGR: Azul
+    'rojo': (0, 0, 255),     # BGR: Rojo
+    'verde': (0, 255, 0),
+    'amarillo': (0, 255, 255) # BGR: Amarillo
+}
+
+
+def get_skeleton_color(name):
+    return SKELETON_COLORS.get(name, (0, 255, 0))
+
+
+def person_colors(color):
+    """Colores por ID de persona: primero `color`, luego el resto de la paleta"""
+    colors = [color]
+    for other in SKELETON_COLORS.values():
+        if other not in colors:
+            colors.append(other)
+    return colors
+
+
+def ensure_model(model, on_status=None):
+    """Ruta del modelo, obteniéndolo (ver model_store.py) si es una variante que todavía no está"""
+    if model in MODEL_VARIANTS:
+        return default_store().ensure(model, on_status)
+    if not os.path.exists(model):
+        raise FileNotFoundError(f"No existe el modelo: {model}")
+    return model
+
+
+def downscale(image, max_side):
+    """Reduce `image` para que su lado mayor no pase de `max_side` (None = sin cambios)"""
+    height, width = image.shape[:2]
+    if not max_side or max(width, height) <= max_side:
+        return image
+    scale = max_side / max(width, height)
+    return cv2.resize(image, (max(1, int(width * scale)), max(1, int(height * scale))),
+                      interpolation=cv2.INTER_AREA)
+
+
+def load_mediapipe():
+    """Importa MediaPipe y la Tasks API la primera vez; devuelve (mp, python, vision)"""
+    import mediapipe as mp
+    from mediapipe.tasks import python
+    from mediapipe.tasks.python import vision
+    return mp, python, vision
+
+
+def create_landmarker(model_path, confidence, num_poses=1, running_mode="video", result_callback=None):
+    """Crea un PoseLandmarker que detecta hasta `num_poses` personas.
+
+    `running_mode` es "video" (`detect_for_video`, con tracking entre frames),
+    "image" (`detect`, frames sueltos en cualquier orden) o "live_stream"
+    (`detect_async`; los resultados llegan a
+    `result_callback(resultado, imagen, timestamp_ms)`).
+    """
+    _, python, vision = load_mediapipe()
+    modes = {"video": vision.RunningMode.VIDEO, "image": vision.RunningMode.IMAGE,
+             "live_stream": vision.RunningMode.LIVE_STREAM}
+    base_options = python.BaseOptions(
+        model_asset_path=model_path,
+        delegate=python.BaseOptions.Delegate.CPU # Forzar CPU para estabilidad en Windows
+    )
+    options = vision.PoseLandmarkerOptions(
+        base_options=base_options,
+        running_mode=modes[running_mode],
+        num_poses=num_poses,
+        min_pose_detection_confidence=confidence,
+        min_pose_presence_confidence=confidence,
+        min_tracking_confidence=confidence,
+        result_callback=result_callback
+    )
+    return vision.PoseLandmarker.create_from_options(options)
+
+
+def poses_to_array(pose_landmarks):
+    """Convierte `detection_result.pose_landmarks` en un array (personas, 33, 5) float32"""
+    poses = np.empty((len(pose_landmarks), NUM_LANDMARKS, len(LANDMARK_FIELDS)), dtype=np.float32)
+    for p, landmarks in enumerate(pose_landmarks):
+        poses[p] = [(lm.x, lm.y, lm.z,
+                     lm.visibility if lm.visibility is not None else 0.0,
+                     lm.presence if lm.presence is not None else 0.0)
+                    for lm in landmarks]
+    return poses
+
+
+def empty_landmarks():
+    """Fila (33, 5) de NaN para frames sin persona detectada"""
+    return np.full((NUM_LANDMARKS, len(LANDMARK_FIELDS)), np.nan, dtype=np.float32)
+
+
+# Índices precalculados para dibujar todas las conexiones y puntos de una vez
+CONNECTION_INDEX = np.array(sorted(POSE_CONNECTIONS), dtype=np.intp)
+# Puntos dibujados: nariz y cuerpo (sin el resto de la cara 1-10)
+POINT_INDEX = np.array([0] + list(range(11, NUM_LANDMARKS)), dtype=np.intp)
+
+
+class SkeletonRenderer:
+    """Dibuja esqueletos con operaciones vectorizadas de NumPy.
+
+    Todas las conexiones de una persona se dibujan con una sola llamada a
+    `cv2.polylines`, y todos sus puntos con otra (segmentos de largo cero con
+    grosor 2×radio, que OpenCV rellena igual que `cv2.circle`). La persona i se
+    dibuja con `colors[i % len(colors)]`; las filas NaN (IDs que no se ven en
+    el frame) se saltan.
+    """
+
+    def __init__(self, colors, line_thickness=2, point_radius=3):
+        self.colors = [tuple(int(c) for c in color) for color in colors]
+        self.line_thickness = line_thickness
+        self.point_thickness = 2 * point_radius
+
+    def draw(self, image, poses):
+        """Dibuja `poses` (personas, 33, 5) con coordenadas normalizadas sobre la imagen BGR"""
+        if not len(poses):
+            return image
+
+        h, w = image.shape[:2]
+        # (personas, 33, 2) en píxeles
+        pixels = np.nan_to_num(poses[:, :, :2] * np.array((w, h), dtype=np.float32)).astype(np.int32)
+
+        present = ~np.isnan(poses[:, 0, 0])
+        for p, person in enumerate(pixels):
+            if not present[p]:
+                continue
+            color = self.colors[p % len(self.colors)]
+            segments = person[CONNECTION_INDEX]                        # (conexiones, 2, 2)
+            points = np.repeat(person[POINT_INDEX, np.newaxis], 2, axis=1)  # (puntos, 2, 2)
+            cv2.polylines(image, segments, False, color, self.line_thickness)
+            cv2.polylines(image, points, False, color, self.point_thickness)
+        return image
+
+
+def open_video(video_path):
+    """Abre un video y devuelve (cap, total_frames, fps, width, height)"""
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise IOError(f"No se pudo abrir el video: {video_path}")
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    return cap, total_frames, fps, width, height
+
+
+def create_video_writer(output_path, fps, width, height, options=None, stats=None):
+    """Writer en su propio hilo; `options` (OutputOptions) elige códec, escala y overlay.
+
+    Con `stats` (PipelineStats) el hilo del writer mide la etapa `encode`.
+    """
+    return open_video_output(output_path, fps, width, height, options, stats)
+
+
+def inference_helpers(infer_every=1, adaptive_skip=False, num_poses=1, roi=False, roi_padding=0.3,
+                      inference_max_side=None, smooth=False):
+    """Ayudantes de inferencia nuevos para un video y el `extra` de su clave de caché.
+
+    Devuelve (helpers, extra): `helpers` son los argumentos skipper, roi,
+    tracker, smoother e inference_max_side de `process_video_file`, y `extra`
+    los ajustes que cambian los landmarks (ver LandmarkCache.key_for). La GUI
+    y el modo lote pasan por aquí para que los mismos ajustes den la misma clave.
+    """
+    helpers = {
+        "skipper": FrameSkipper(infer_every, adaptive_skip),
+        "roi": RoiCropper(roi_padding) if roi else None,
+        "tracker": PoseTracker(num_poses) if num_poses > 1 else None,
+        "smoother": OneEuroSmoother(num_poses) if smooth else None,
+        "inference_max_side": inference_max_side,
+    }
+    extra = {}
+    if inference_max_side:
+        extra["inference_max_side"] = inference_max_side
+    if helpers["skipper"].enabled:
+        extra.update(helpers["skipper"].settings())
+    for name in ("roi", "tracker", "smoother"):
+        if helpers[name] is not None:
+            extra.update(helpers[name].settings())
+    return helpers, extra
+
+
+def build_pipeline(cap, landmarker, fps, color, video_writer=None, display=None,
+                   on_progress=None, timestamp_offset_ms=0, on_landmarks=None,
+                   start_index=0, max_frames=None, cached_poses=None, skipper=None, roi=None,
+                   tracker=None, stats=None, draw_workers=2, inference_max_side=None, overlay=False,
+                   smoother=None):
+    """Arma el pipeline detección → dibujo → escritura para un video abierto.
+
+    `timestamp_offset_ms` permite reutilizar un mismo landmarker para varios
+    videos seguidos: `detect_for_video` exige timestamps siempre crecientes.
+    `on_landmarks(timestamp_ms, poses)` recibe en orden el array de cada frame.
+    Con `cached_poses` (un array por frame, p. ej. un LandmarkStore) no se
+    ejecuta inferencia y `landmarker` puede ser None. `skipper` (FrameSkipper)
+    salta inferencias e interpola los frames intermedios. `roi` (RoiCropper)
+    infiere sobre un recorte alrededor de las personas. `tracker` (PoseTracker)
+    ordena las personas por ID antes de interpolar y dibujar; la persona i se
+    dibuja con `person_colors(color)[i]`. `smoother` (OneEuroSmoother) quita el
+    temblor de los landmarks inferidos antes de dibujarlos y guardarlos.
+    `stats` (PipelineStats) mide cada etapa y `draw_workers` es la cantidad de
+    hilos de dibujo. `inference_max_side` reduce la imagen que recibe el
+    landmarker (los landmarks son normalizados, así que no hace falta
+    corregirlos). Sin `video_writer` ni `display` no se dibuja nada: sólo se
+    producen landmarks. Con `overlay` el esqueleto se dibuja sobre un lienzo
+    negro en lugar del frame (ver video_output).
+    """
+    if cached_poses is None:
+        mp = load_mediapipe()[0]
+    else:
+        cached = (cached_poses[i] for i in range(start_index, len(cached_poses)))
+        no_poses = np.empty((0, NUM_LANDMARKS, len(LANDMARK_FIELDS)), dtype=np.float32)
+
+    def detect(image, timestamp_ms):
+        if cached_poses is not None:
+            return next(cached, no_poses)
+
+        if roi is not None:
+            # `image` es el frame BGR completo: recortar y convertir sólo la región
+            frame_height, frame_width = image.shape[:2]
+            image, transform = roi.prepare(image)
+
+        image = downscale(image, inference_max_side)
+        mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=image)
+        detection_result = landmarker.detect_for_video(mp_image, timestamp_offset_ms + timestamp_ms)
+        poses = poses_to_array(detection_result.pose_landmarks)
+
+        if roi is not None:
+            poses = roi.map_back(poses, transform, frame_width, frame_height)
+            roi.update(poses, frame_width, frame_height)
+        if tracker is not None:
+            poses = tracker.update(poses)
+        if smoother is not None:
+            poses = smoother.update(timestamp_ms, poses)
+        return poses
+
+    renderer = SkeletonRenderer(person_colors(color))
+    draw = renderer.draw
+    if overlay:
+        draw = lambda frame, poses: renderer.draw(overlay_canvas(frame), poses)
+
+    return VideoPipeline(
+        cap, detect, fps, draw=draw if video_writer or display else None,
+        write=video_writer.write if video_writer else None,
+        display=display,
+        on_progress=on_progress,
+        start_index=start_index,
+        max_frames=max_frames,
+        convert_rgb=cached_poses is None and roi is None,
+        on_result=on_landmarks,
+        skipper=skipper if cached_poses is None else None,
+        stats=stats,
+        draw_workers=draw_workers
+    )
+
+
+def process_video_file(video_path, landmarker=None, output_path=None, color=SKELETON_COLORS['default'],
+                       timestamp_offset_ms=0, cache=None, cache_key=None, store_path=None,
+                       make_landmarker=None, display=None, on_progress=None, on_start=None,
+                       skipper=None, roi=None, tracker=None, stats=None, inference_max_side=None,
+                       export_paths=(), output_options=None, analytics_path=None, analytics_options=None,
+                       smoother=None):
+    """Procesa un video completo.
+
+    - `landmarker` se reutiliza tal cual; si es None y hace falta inferencia se
+      crea con `make_landmarker()` y se cierra al terminar.
+    - Con `cache` (LandmarkCache) y `cache_key` se reutilizan los landmarks
+      guardados, o se guardan los nuevos si el video se procesó completo.
+    - `store_path`: store de landmarks que se escribe mientras se procesa.
+    - `output_options` (OutputOptions): códec, escala y modo overlay de `output_path`.
+    - `export_paths`: archivos .jsonl/.csv/.parquet que se escriben mientras se
+      procesa (ver landmark_export). Sin `output_path` ni `display` el video no
+      se dibuja ni se codifica.
+    - `analytics_path`: JSON con las métricas de movimiento (ver
+      movement_analytics), calculadas mientras se procesa según `analytics_options`.
+    - `skipper` (FrameSkipper): inferir sólo algunos frames e interpolar el resto.
+    - `roi` (RoiCropper): inferir sobre un recorte alrededor de las personas.
+    - `tracker` (PoseTracker): IDs estables para varias personas; los stores
+      guardan una fila por ID. El landmarker debe detectar `tracker.num_people`.
+    - `smoother` (OneEuroSmoother): suavizado temporal de los landmarks.
+    - Si se usa caché, los ajustes de `skipper`, `roi`, `tracker` y `smoother`
+      deben formar parte de `cache_key`.
+    - `stats` (PipelineStats): tiempos por etapa.
+    - `inference_max_side`: lado máximo de la imagen que recibe el landmarker;
+      también debe formar parte de `cache_key`.
+    - `display`, `on_progress(frame, total)` y `on_start(pipeline, desde_cache)`
+      son ganchos para la interfaz gráfica.
+
+    Devuelve (frames_procesados, duración_del_video_ms, desde_cache).
+    """
+    cached = cache.load(cache_key) if cache is not None else None
+    cap, total_frames, fps, width, height = open_video(video_path)
+    video_writer = (create_video_writer(output_path, fps, width, height, output_options, stats)
+                    if output_path else None)
+    stores = []
+    cache_writer = None
+    analyzer = None
+    own_landmarker = None
+    num_people = tracker.num_people if tracker is not None else 1
+    pipeline = None
+    frames = None
+    try:
+        if store_path:
+            stores.append(LandmarkStoreWriter(store_path, num_people=num_people,
+                                              fps=fps, width=width, height=height))
+        for path in export_paths:
+            stores.append(open_exporter(path, num_people=num_people, fps=fps))
+        if analytics_path:
+            analytics_options = analytics_options or AnalyticsOptions()
+            analyzer = analytics_options.analyzer(fps, width, height, num_people)
+            stores.append(analyzer)
+        if cache is not None and cached is None:
+            cache_writer = cache.writer(cache_key, num_people=num_people,
+                                        fps=fps, width=width, height=height)
+            stores.append(cache_writer)
+        if cached is None and landmarker is None:
+            landmarker = own_landmarker = make_landmarker()
+
+        def on_landmarks(timestamp_ms, poses):
+            for store in stores:
+                store.append(timestamp_ms, poses)
+
+        pipeline = build_pipeline(
+            cap, landmarker, fps, color, video_writer=video_writer,
+            display=display,
+            on_progress=(lambda frame_count: on_progress(frame_count, total_frames)) if on_progress else None,
+            timestamp_offset_ms=timestamp_offset_ms,
+            on_landmarks=on_landmarks if stores else None,
+            cached_poses=cached,
+            skipper=skipper,
+            roi=roi,
+            tracker=tracker,
+            stats=stats,
+            inference_max_side=inference_max_side,
+            overlay=output_options is not None and output_options.overlay,
+            smoother=smoother
+        )
+        if on_start is not None:
+            on_start(pipeline, cached is not None)
+        frames = pipeline.run()
+    finally:
+        cap.release()
+        if own_landmarker: own_landmarker.close()
+        for store in stores:
+            store.close()
+        if cache_writer is not None:
+            if pipeline is not None and pipeline.completed:
+                cache.commit(cache_key, cache_writer)
+            else:
+                cache.discard(cache_writer)
+        if cached is not None:
+            cached.close()
+        # Al final: un error del codificador no debe saltarse la limpieza anterior
+        if video_writer: release_video_output(video_writer, pipeline_failed=frames is None)
+
+    if analyzer is not None:
+        write_report(analyzer, analytics_path, analytics_options)
+    # Con caché no se usó el landmarker: no avanza su reloj
+    duration_ms = 0 if cached is not None else int((frames * 1000) / fps)
+    return frames, duration_ms, cached is not None
@@ -0,0 +1,224 @@
+"""Codificación configurable del video de salida.
+
+`open_video_output` devuelve un objeto con la interfaz de `cv2.VideoWriter`
+(`write(frame)` y `release()`) que codifica en su propio hilo: `write` sólo
+encola el frame en una cola acotada, así que la etapa de codificación del
+pipeline ya no espera al codificador (y si el codificador no da abasto, la
+cola llena frena al pipeline en lugar de acumular frames en memoria). Con
+`stats` el hilo de escritura registra la etapa `encode` con el costo real de
+escalar y codificar cada frame.
+
+Detrás hay dos backends según el códec (`CODECS`):
+
+- "opencv": `cv2.VideoWriter` con un fourcc (mp4v, como hasta ahora, MJPG, avc1).
+- "ffmpeg": los frames crudos se envían por un pipe a un proceso ffmpeg, que
+  codifica en paralelo con sus propios hilos (libx264, libx265, NVENC, VP9,
+  ProRes 4444...). Necesita `ffmpeg` en el PATH.
+
+`OutputOptions` elige además una escala de salida (los frames se reducen
+antes de codificarlos, lo que abarata mucho la salida 4K) y el modo `overlay`:
+sólo el esqueleto sobre fondo transparente, para componerlo luego sobre el
+video original en un editor (requiere un códec con canal alfa).
+"""
+import queue
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+
+import cv2
+import numpy as np
+
+# códec -> (backend, extensión, soporta alfa, parámetros)
+CODECS = {
+    "mp4v": ("opencv", ".mp4", False, "mp4v"),
+    "mjpg": ("opencv", ".avi", False, "MJPG"),
+    "avc1": ("opencv", ".mp4", False, "avc1"),
+    "h264": ("ffmpeg", ".mp4", False, ["-c:v", "libx264", "-preset", "veryfast", "-crf", "20",
+                                       "-pix_fmt", "yuv420p", "-movflags", "+faststart"]),
+    "hevc": ("ffmpeg", ".mp4", False, ["-c:v", "libx265", "-preset", "fast", "-crf", "24",
+                                       "-pix_fmt", "yuv420p", "-tag:v", "hvc1"]),
+    "h264_nvenc": ("ffmpeg", ".mp4", False, ["-c:v", "h264_nvenc", "-preset", "p4", "-cq", "21",
+                                             "-pix_fmt", "yuv420p"]),
+    "vp9": ("ffmpeg", ".webm", True, ["-c:v", "libvpx-vp9", "-deadline", "realtime", "-cpu-used", "8",
+                                      "-row-mt", "1", "-b:v", "0", "-crf", "32"]),
+    "prores": ("ffmpeg", ".mov", True, ["-c:v", "prores_ks", "-profile:v", "4444"]),
+}
+DEFAULT_CODEC = "mp4v"
+
+# Formato de píxel con alfa que ffmpeg debe producir para cada códec en modo overlay
+_ALPHA_PIX_FMT = {"vp9": "yuva420p", "prores": "yuva444p10le"}
+
+
+class OutputOptions:
+    """Cómo se escribe el video de salida.
+
+    - codec: clave de `CODECS`.
+    - scale: factor de tamaño de la salida (0.5 = mitad de ancho y alto).
+    - max_side: lado máximo de la salida en px (se aplica después de `scale`).
+    - overlay: escribir sólo el esqueleto sobre fondo transparente.
+    - queue_size: frames que pueden esperar al codificador.
+    """
+
+    def __init__(self, codec=DEFAULT_CODEC, scale=1.0, max_side=None, overlay=False, queue_size=16):
+        if codec not in CODECS:
+            raise ValueError(f"Códec desconocido: {codec} (opciones: {', '.join(CODECS)})")
+        if overlay and not CODECS[codec][2]:
+            alpha_codecs = [name for name, spec in CODECS.items() if spec[2]]
+            raise ValueError(f"El modo overlay necesita un códec con transparencia: {', '.join(alpha_codecs)}")
+        self.codec = codec
+        self.scale = scale
+        self.max_side = max_side
+        self.overlay = overlay
+        self.queue_size = queue_size
+
+    @property
+    def extension(self):
+        return CODECS[self.codec][1]
+
+    def output_size(self, width, height):
+        """Tamaño de salida para un video de `width`×`height` (siempre par, como piden los códecs YUV 4:2:0)"""
+        scale = self.scale or 1.0
+        if self.max_side and max(width, height) * scale > self.max_side:
+            scale = self.max_side / max(width, height)
+        if scale == 1.0:
+            return width, height
+        return max(2, int(width * scale) // 2 * 2), max(2, int(height * scale) // 2 * 2)
+
+
+def overlay_canvas(frame):
+    """Lienzo negro del tamaño de `frame` para dibujar sólo el esqueleto"""
+    return np.zeros_like(frame)
+
+
+def _alpha_frame(canvas):
+    """BGRA con alfa opaco donde se dibujó algo y transparente en el resto"""
+    bgra = cv2.cvtColor(canvas, cv2.COLOR_BGR2BGRA)
+    bgra[:, :, 3] = np.where(canvas.any(axis=2), 255, 0)
+    return bgra
+
+
+class _OpenCVEncoder:
+    def __init__(self, path, fps, size, options):
+        self._writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*CODECS[options.codec][3]), fps, size)
+        if not self._writer.isOpened():
+            raise IOError(f"OpenCV no puede escribir {options.codec} en {path}")
+
+    def write(self, frame):
+        self._writer.write(frame)
+
+    def close(self):
+        self._writer.release()
+
+
+class _FFmpegEncoder:
+    def __init__(self, path, fps, size, options):
+        ffmpeg = shutil.which("ffmpeg")
+        if not ffmpeg:
+            raise FileNotFoundError(f"El códec {options.codec} necesita ffmpeg en el PATH")
+        pix_fmt = "bgra" if options.overlay else "bgr24"
+        cmd = [ffmpeg, "-y", "-v", "error",
+               "-f", "rawvideo", "-pix_fmt", pix_fmt, "-s", f"{size[0]}x{size[1]}", "-r", str(fps or 30),
+               "-i", "-", *CODECS[options.codec][3]]
+        if options.overlay:
+            cmd += ["-pix_fmt", _ALPHA_PIX_FMT[options.codec]]
+        cmd.append(path)
+        # stderr a un archivo: con un pipe que nadie lee, ffmpeg podría bloquearse
+        self._stderr = tempfile.TemporaryFile()
+        self._process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=self._stderr)
+
+    def write(self, frame):
+        try:
+            self._process.stdin.write(memoryview(np.ascontiguousarray(frame)).cast("B"))
+        except BrokenPipeError:
+            self.close()
+
+    def close(self):
+        if self._process.stdin and not self._process.stdin.closed:
+            try:
+                self._process.stdin.close()
+            except BrokenPipeError:
+                pass
+        returncode = self._process.wait()
+        if self._stderr.closed:
+            return
+        self._stderr.seek(0)
+        detail = self._stderr.read().decode(errors="replace").strip()
+        self._stderr.close()
+        if returncode != 0:
+            raise RuntimeError(f"ffmpeg terminó con código {returncode}: {detail[-500:]}")
+
+
+# Marca de fin para el hilo de escritura
+_END = object()
+
+
+class ThreadedVideoWriter:
+    """Escala, convierte y codifica en un hilo propio con una cola acotada"""
+
+    def __init__(self, encoder, size, overlay=False, queue_size=16, stats=None):
+        self.encoder = encoder
+        self.size = size
+        self.overlay = overlay
+        self.stats = stats
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._error = None
+        self._thread = threading.Thread(target=self._run, name="video-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, frame):
+        if self._error is not None:
+            raise self._error
+        self._queue.put(frame)
+
+    def release(self):
+        if self._thread.is_alive():
+            self._queue.put(_END)
+            self._thread.join()
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def _run(self):
+        try:
+            while True:
+                frame = self._queue.get()
+                if frame is _END:
+                    break
+                start = time.perf_counter()
+                if (frame.shape[1], frame.shape[0]) != self.size:
+                    frame = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+                if self.overlay:
+                    frame = _alpha_frame(frame)
+                self.encoder.write(frame)
+                if self.stats is not None:
+                    self.stats.record("encode", start, time.perf_counter())
+        except Exception as e:
+            self._error = e
+            # Seguir consumiendo hasta el fin para que `write` y `release` no se bloqueen
+            while self._queue.get() is not _END:
+                pass
+        finally:
+            try:
+                self.encoder.close()
+            except Exception as e:
+                self._error = self._error or e
+
+
+def release_video_output(writer, pipeline_failed=False):
+    """Cierra el writer; si el pipeline ya falló, un error del codificador no tapa el original"""
+    try:
+        writer.release()
+    except Exception:
+        if not pipeline_failed:
+            raise
+
+
+def open_video_output(path, fps, width, height, options=None, stats=None):
+    """Writer (interfaz de `cv2.VideoWriter`) para frames de `width`×`height` según `options`"""
+    options = options or OutputOptions()
+    size = options.output_size(width, height)
+    backend = CODECS[options.codec][0]
+    encoder = (_FFmpegEncoder if backend == "ffmpeg" else _OpenCVEncoder)(path, fps, size, options)
+    return ThreadedVideoWriter(encoder, size, options.overlay, options.queue_size, stats)
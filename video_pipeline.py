@@ -0,0 +1,288 @@
+"""Pipeline por etapas para procesar video.
+
+decodificación → inferencia → dibujo → codificación → vista previa
+
+Cada etapa corre en su propio hilo y se comunica con la siguiente mediante colas
+acotadas: la decodificación y el dibujo se solapan con la inferencia, y una etapa
+lenta frena a las anteriores (backpressure) en lugar de acumular frames en memoria.
+El dibujo puede repartirse entre varios hilos; la etapa de codificación reordena
+los frames por índice antes de escribirlos.
+"""
+import queue
+import threading
+import time
+
+import cv2
+
+# Marca de fin de stream que cada etapa reenvía a la siguiente
+_FIN = object()
+
+
+class FramePacket:
+    """Un frame en tránsito por el pipeline"""
+    __slots__ = ("index", "timestamp_ms", "frame", "image_rgb", "result")
+
+    def __init__(self, index, timestamp_ms, frame, image_rgb):
+        self.index = index
+        self.timestamp_ms = timestamp_ms
+        self.frame = frame
+        self.image_rgb = image_rgb
+        self.result = None
+
+
+class VideoPipeline:
+    """Procesa un `cv2.VideoCapture` en etapas concurrentes.
+
+    - detect(image_rgb, timestamp_ms) -> resultado: se llama siempre desde un
+      único hilo y en orden, como exige `detect_for_video`.
+    - on_result(timestamp_ms, resultado): se llama en orden para cada frame,
+      incluidos los interpolados.
+    - draw(frame_bgr, resultado) -> frame_bgr: puede llamarse desde varios hilos.
+    - write(frame_bgr): recibe los frames en orden.
+    - display(frame_bgr) y on_progress(frames_procesados): última etapa.
+
+    `start_index` es el índice del primer frame que entrega `cap` (si ya se
+    posicionó con un seek) y `max_frames` limita cuántos frames se leen. Con
+    `convert_rgb=False` el decodificador no convierte el frame y `detect`
+    recibe el frame BGR original, que no debe modificar (por ejemplo, cuando
+    los landmarks vienen de la caché o cuando se infiere sobre un recorte).
+
+    Con `skipper` (ver frame_skipping.FrameSkipper) sólo se llama a `detect`
+    en los frames que elige la política; el resto espera en la etapa de
+    inferencia hasta el siguiente resultado y se interpola.
+
+    Con `stats` (ver perf_stats.PipelineStats) se mide cada etapa por frame.
+    """
+
+    def __init__(self, cap, detect, fps, draw=None, write=None, display=None,
+                 on_progress=None, queue_size=8, draw_workers=2, start_index=0,
+                 max_frames=None, convert_rgb=True, on_result=None, skipper=None, stats=None):
+        self.cap = cap
+        self.detect = detect
+        self.fps = fps
+        self.draw = draw
+        self.write = write
+        self.display = display
+        self.on_progress = on_progress
+        self.draw_workers = max(1, draw_workers)
+        self.start_index = start_index
+        self.max_frames = max_frames
+        self.convert_rgb = convert_rgb
+        self.on_result = on_result
+        self.skipper = skipper if skipper is not None and skipper.enabled else None
+        self.stats = stats
+        self.frames_done = 0
+
+        self._decoded = queue.Queue(maxsize=queue_size)
+        self._detected = queue.Queue(maxsize=queue_size)
+        self._drawn = queue.Queue(maxsize=queue_size)
+        self._encoded = queue.Queue(maxsize=queue_size)
+
+        self._stop = threading.Event()
+        self._resume = threading.Event()
+        self._resume.set()
+        self._error = None
+        self._error_lock = threading.Lock()
+
+    # ---------- Control ----------
+    def pause(self):
+        self._resume.clear()
+
+    def resume(self):
+        self._resume.set()
+
+    def stop(self):
+        self._stop.set()
+        self._resume.set()
+
+    @property
+    def is_paused(self):
+        return not self._resume.is_set()
+
+    @property
+    def completed(self):
+        """True si el último `run()` llegó al final del video sin `stop()` ni errores"""
+        return not self._stop.is_set()
+
+    def run(self):
+        """Ejecuta el pipeline hasta agotar el video o hasta `stop()`.
+
+        Bloquea al llamador; relanza la primera excepción de cualquier etapa.
+        Devuelve el número de frames que llegaron a la última etapa.
+        """
+        # Nombres por etapa: se ven en las trazas de rendimiento
+        threads = [threading.Thread(target=self._guard, args=(self._decode_stage,),
+                                    name="pipeline-decode", daemon=True),
+                   threading.Thread(target=self._guard, args=(self._detect_stage,),
+                                    name="pipeline-detect", daemon=True),
+                   threading.Thread(target=self._guard, args=(self._encode_stage,),
+                                    name="pipeline-encode", daemon=True),
+                   threading.Thread(target=self._guard, args=(self._display_stage,),
+                                    name="pipeline-display", daemon=True)]
+        threads += [threading.Thread(target=self._guard, args=(self._draw_stage,),
+                                     name=f"pipeline-draw-{i}", daemon=True)
+                    for i in range(self.draw_workers)]
+        if self.stats is not None:
+            self.stats.start()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        if self.stats is not None:
+            self.stats.stop()
+
+        if self._error is not None:
+            raise self._error
+        return self.frames_done
+
+    # ---------- Utilidades de colas ----------
+    def _guard(self, stage):
+        try:
+            stage()
+        except Exception as e:
+            with self._error_lock:
+                if self._error is None:
+                    self._error = e
+            self.stop()
+
+    def _timed(self, stage, func, *args):
+        """Llama a `func(*args)` y registra su duración en `stats` como `stage`"""
+        if self.stats is None:
+            return func(*args)
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            self.stats.record(stage, start, time.perf_counter())
+
+    def _put(self, q, item):
+        """Encola respetando el backpressure; devuelve False si se detuvo el pipeline"""
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _get(self, q):
+        """Desencola; devuelve `_FIN` si se detuvo el pipeline"""
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        return _FIN
+
+    # ---------- Etapas ----------
+    def _decode_stage(self):
+        index = self.start_index
+        end_index = None if self.max_frames is None else self.start_index + self.max_frames
+        try:
+            while not self._stop.is_set() and index != end_index:
+                if not self._resume.wait(timeout=0.1):
+                    continue
+
+                ret, frame = self._timed("decode", self.cap.read)
+                if not ret:
+                    break
+
+                image_rgb = self._timed("convert", cv2.cvtColor, frame, cv2.COLOR_BGR2RGB) \
+                    if self.convert_rgb else None
+                timestamp_ms = int((index * 1000) / self.fps)
+                if not self._put(self._decoded, FramePacket(index, timestamp_ms, frame, image_rgb)):
+                    return
+                index += 1
+        finally:
+            self._put(self._decoded, _FIN)
+
+    def _detect_stage(self):
+        # Frames sin inferencia que esperan el próximo resultado para interpolarse
+        pending = []
+        last = None
+        while True:
+            packet = self._get(self._decoded)
+            if packet is _FIN:
+                # Al final no hay resultado siguiente: mantener el último
+                for waiting in pending:
+                    waiting.result = last.result
+                    if not self._emit(waiting):
+                        return
+                for _ in range(self.draw_workers):
+                    self._put(self._detected, _FIN)
+                return
+
+            if self.skipper is not None and not self.skipper.should_infer(packet.index):
+                packet.image_rgb = None
+                pending.append(packet)
+                continue
+
+            image = packet.image_rgb if self.convert_rgb else packet.frame
+            packet.result = self._timed("inference", self.detect, image, packet.timestamp_ms)
+            packet.image_rgb = None
+            if self.skipper is not None:
+                self.skipper.observe(packet.index, packet.result)
+                for waiting in pending:
+                    t = (waiting.index - last.index) / (packet.index - last.index)
+                    waiting.result = self.skipper.interpolate(last.result, packet.result, t)
+                    if not self._emit(waiting):
+                        return
+                pending = []
+                last = packet
+            if not self._emit(packet):
+                return
+
+    def _emit(self, packet):
+        if self.on_result is not None:
+            self.on_result(packet.timestamp_ms, packet.result)
+        return self._put(self._detected, packet)
+
+    def _draw_stage(self):
+        while True:
+            packet = self._get(self._detected)
+            if packet is _FIN:
+                self._put(self._drawn, _FIN)
+                return
+
+            if self.draw is not None:
+                packet.frame = self._timed("draw", self.draw, packet.frame, packet.result)
+            if not self._put(self._drawn, packet):
+                return
+
+    def _encode_stage(self):
+        # Los hilos de dibujo terminan en cualquier orden: reensamblar por índice
+        pending = {}
+        next_index = self.start_index
+        finished = 0
+        try:
+            while finished < self.draw_workers:
+                packet = self._get(self._drawn)
+                if packet is _FIN:
+                    finished += 1
+                    continue
+
+                pending[packet.index] = packet
+                while next_index in pending:
+                    ready = pending.pop(next_index)
+                    next_index += 1
+                    # La etapa `encode` la mide el writer (ver video_output): `write` sólo encola
+                    if self.write is not None:
+                        self.write(ready.frame)
+                    if not self._put(self._encoded, ready):
+                        return
+        finally:
+            self._put(self._encoded, _FIN)
+
+    def _display_stage(self):
+        while True:
+            packet = self._get(self._encoded)
+            if packet is _FIN:
+                return
+
+            if self.display is not None:
+                self._timed("preview", self.display, packet.frame)
+            self.frames_done += 1
+            if self.stats is not None:
+                self.stats.frame_done()
+            if self.on_progress is not None:
+                self.on_progress(self.frames_done)
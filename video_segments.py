@@ -0,0 +1,177 @@
+"""Paralelismo dentro de un mismo video.
+
+Un video largo se divide en segmentos que empiezan en keyframes (para que el
+seek sea barato y exacto). Cada segmento procesa primero unos frames de
+calentamiento, que no se escriben, para que el tracker del PoseLandmarker ya
+esté enganchado cuando empieza la parte que sí se guarda. Luego los segmentos
+anotados y sus landmarks se vuelven a unir en orden.
+"""
+import os
+import shutil
+import subprocess
+import tempfile
+from bisect import bisect_right
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+from skeleton_core import build_pipeline, create_video_writer, empty_landmarks, open_video
+from video_output import DEFAULT_CODEC, OutputOptions, release_video_output
+
+# Frames [seek_frame, start_frame) son de calentamiento; se guardan [start_frame, end_frame)
+# (end_frame es None en el último: hasta el final real del video)
+Segment = namedtuple("Segment", "index seek_frame start_frame end_frame")
+
+
+def find_keyframes(video_path, fps):
+    """Índices de frame de los keyframes según ffprobe, o None si no está disponible"""
+    ffprobe = shutil.which("ffprobe")
+    if not ffprobe or not fps:
+        return None
+
+    cmd = [ffprobe, "-v", "error", "-select_streams", "v:0", "-skip_frame", "nokey",
+           "-show_entries", "frame=pts_time", "-of", "csv=p=0", video_path]
+    result = subprocess.run(cmd, capture_output=True, text=True, check=False)
+    if result.returncode != 0:
+        return None
+
+    times = []
+    for line in result.stdout.split():
+        value = line.strip().strip(",")
+        if value and value != "N/A":
+            times.append(float(value))
+    if not times:
+        return None
+
+    # pts_time es relativo al inicio del stream, que no siempre es 0
+    first = min(times)
+    return sorted({int(round((t - first) * fps)) for t in times})
+
+
+def plan_segments(total_frames, num_segments, warmup_frames, keyframes=None):
+    """Divide [0, total_frames) en hasta `num_segments` segmentos.
+
+    Con keyframes, cada segmento (salvo el primero) hace seek a un keyframe y
+    arranca a guardar `warmup_frames` después; sin ellos, los cortes son uniformes.
+    `total_frames` es la estimación del contenedor, así que el último segmento
+    no tiene fin fijo y lee hasta que se acaba el video.
+    """
+    num_segments = max(1, min(num_segments, total_frames))
+    seeks = [0]
+    for i in range(1, num_segments):
+        target = round(i * total_frames / num_segments) - warmup_frames
+        if keyframes:
+            pos = bisect_right(keyframes, target) - 1
+            target = keyframes[max(0, pos)]
+        if target > seeks[-1] and target + warmup_frames < total_frames:
+            seeks.append(target)
+
+    starts = [0] + [seek + warmup_frames for seek in seeks[1:]]
+    ends = starts[1:] + [None]
+    return [Segment(i, seek, start, end)
+            for i, (seek, start, end) in enumerate(zip(seeks, starts, ends))]
+
+
+class _WarmupWriter:
+    """Descarta los frames de calentamiento antes de pasarlos al VideoWriter"""
+
+    def __init__(self, writer, skip):
+        self.writer = writer
+        self.skip = skip
+
+    def write(self, frame):
+        if self.skip:
+            self.skip -= 1
+            return
+        self.writer.write(frame)
+
+
+def process_segment(video_path, segment, landmarker, output_path, color, timestamp_offset_ms=0,
+                    skipper=None, roi=None, tracker=None, inference_max_side=None, output_options=None,
+                    smoother=None):
+    """Procesa un segmento y escribe sólo sus frames propios en `output_path`.
+
+    Devuelve (landmarks, timestamps_ms): las personas de cada frame (array
+    frames×personas×33×5, una fila por ID de `tracker` o sólo la primera
+    persona sin él; NaN si no hubo detección) y los timestamps absolutos.
+    """
+    cap, _, fps, width, height = open_video(video_path)
+    video_writer = create_video_writer(output_path, fps, width, height, output_options)
+    warmup = segment.start_frame - segment.seek_frame
+    max_frames = segment.end_frame - segment.seek_frame if segment.end_frame is not None else None
+    stream = []
+    completed = False
+    try:
+        if segment.seek_frame:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, segment.seek_frame)
+
+        pipeline = build_pipeline(
+            cap, landmarker, fps, color,
+            video_writer=_WarmupWriter(video_writer, warmup),
+            timestamp_offset_ms=timestamp_offset_ms,
+            on_landmarks=lambda ts, poses: stream.append((ts, poses)),
+            start_index=segment.seek_frame,
+            max_frames=max_frames,
+            skipper=skipper,
+            roi=roi,
+            tracker=tracker,
+            inference_max_side=inference_max_side,
+            overlay=output_options is not None and output_options.overlay,
+            smoother=smoother
+        )
+        pipeline.run()
+        completed = True
+    finally:
+        cap.release()
+        release_video_output(video_writer, pipeline_failed=not completed)
+
+    stream = stream[warmup:]
+    num_people = tracker.num_people if tracker is not None else 1
+    landmarks = np.full((len(stream), num_people) + empty_landmarks().shape, np.nan, dtype=np.float32)
+    for row, (_, poses) in zip(landmarks, stream):
+        count = min(len(poses), num_people)
+        row[:count] = poses[:count]
+    timestamps = np.array([ts for ts, _ in stream], dtype=np.int64)
+    return landmarks, timestamps
+
+
+def stitch_segments(segment_paths, output_path, fps, width, height, output_options=None):
+    """Une los segmentos anotados en un único video.
+
+    Usa el demuxer concat de ffmpeg sin recodificar cuando está disponible; si no,
+    copia frame a frame con OpenCV, recodificando con el códec de `output_options`
+    (los segmentos ya tienen el tamaño de salida).
+    """
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg:
+        with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as f:
+            for path in segment_paths:
+                escaped = os.path.abspath(path).replace("'", "'\\''")
+                f.write(f"file '{escaped}'\n")
+            list_path = f.name
+        try:
+            cmd = [ffmpeg, "-y", "-v", "error", "-f", "concat", "-safe", "0",
+                   "-i", list_path, "-c", "copy", output_path]
+            if subprocess.run(cmd, check=False).returncode == 0:
+                return
+        finally:
+            os.remove(list_path)
+
+    codec = output_options.codec if output_options is not None else DEFAULT_CODEC
+    video_writer = None
+    try:
+        for path in segment_paths:
+            cap = cv2.VideoCapture(path)
+            while True:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                if video_writer is None:
+                    video_writer = create_video_writer(output_path, fps, frame.shape[1], frame.shape[0],
+                                                       OutputOptions(codec))
+                video_writer.write(frame)
+            cap.release()
+    finally:
+        if video_writer is not None:
+            video_writer.release()